@@ -2,27 +2,30 @@ import argparse
 import json
 import math
 import multiprocessing
+import shlex
 import signal
 import time
-from multiprocessing import Pool
 import uuid
 import threading
 
-import pm4py
-
 import utils.congestion as Congestion
-import utils.extractor as extractor
 import utils.fairness as Fairness
 import utils.frames as frames
+import utils.logReader as logReader
+import utils.logCache as LogCache
+import utils.sharedLog as sharedLog
+from utils.sweep import Sweep
 import utils.optimization as Optimization
 from utils.network.client import Client
 from utils.network.enums import Callbacks as ClientCallbacks
 from predictor.predictor import PredictorService
 from simulation.objects.enums import Callbacks as SIM_Callbacks
-from simulation.objects.enums import OptimizationModes, SchedulingBehaviour
+from simulation.objects.enums import OptimizationModes, SchedulingBehaviour, SolverBackends
 from simulation.objects.enums import SimulationModes as SIM_Modes
+from simulation.objects.enums import SimulationEngines as SIM_Engines
 from simulation.objects.enums import TimestampModes
 from simulation.simulator import Simulator
+from simulation.objects.traceExtractor import ExtractTraces, ExtractActivityResourceMapping
 from utils.activityDuration import EventDurationsByMinPossibleTime
 import pickle
 import traceback
@@ -30,6 +33,16 @@ import traceback
 G_KnownActivityDurations = {}
 scriptArgs = None
 simulator  = None
+fairnessAccumulator = None
+congestionTracker   = None
+solverBackend = SolverBackends.NETWORK_FLOW
+incrementalAssignment = None
+componentPool = None
+solverBudget  = None
+scheduleCache = None
+logCache      = None
+sharedLogs    = {} # {log key: handle} - Logs published in shared memory by the parent of the MultiSimulation workers
+attachedLogs  = {} # {log key: (columns, store)}
 predictor  = None
 predClient = None
 predClientLocks = {}
@@ -54,28 +67,53 @@ def kernel_panic(signum, frame):
 signal.signal(signal.SIGINT, kernel_panic)
 
 
-def argsParse(cmdParameterLine = None): 
+def argsParse(cmdParameterLine = None, updateGlobals = True): 
+    """The arguments of the command line or of a MultiSim.cfg line. With 'updateGlobals' they become the arguments of this process (scriptArgs),
+    otherwise a line is only inspected (e.g. by the parent of the MultiSimulation workers)"""
     global scriptArgs   
     
     parser = argparse.ArgumentParser()
-    parser.add_argument('-l', '--log', default='logs/log.xes', type=str, help="The path to the event-log to be loaded")
-    parser.add_argument('-o', '--out', default='logs/simLog.xes', type=str, help="The path to which the simulated event-log will be exported")
+    parser.add_argument('-l', '--log', default='logs/log.xes', type=str, help="The path to the event-log to be loaded (XES or CSV, gzipped if ending in .gz, Parquet or Feather)")
+    parser.add_argument('--LogColumns', default=None, nargs='+', type=str, help="Columns of a CSV/Parquet/Feather log as <attribute>=<column> with the attributes case, act, res, ts and lc (default: pm4py names, e.g. case:concept:name)")
+    parser.add_argument('--LogTimestampFormat', default=None, type=str, help="strftime format of the timestamps in a CSV/Parquet/Feather log (default: ISO 8601), numeric timestamps are taken as seconds since epoch")
+    parser.add_argument('-o', '--out', default='logs/simLog.xes', type=str, help="The path to which the simulated event-log will be exported (XES or CSV by the file ending, gzipped if ending in .gz, or columnar as .parquet/.feather with integer start and end timestamps), cases are written as soon as they are completed")
 
+    parser.add_argument('--LogCache', default=None, type=str, help="Directory in which the parsed log, its windows and event durations are cached, keyed by the hash of the log file's content")
     parser.add_argument('--actDurations', default=None, type=str, help="A dictionary of activities and their duration \'{\'A\': 1}\'")
     parser.add_argument('--SimMode', default='known_future',choices=['known_future','prediction'], type=str, help="")
     parser.add_argument('--SchedulingBehaviour', default='clear',choices=['clear','keep'], type=str, help="Specify whether scheduling assignments that could not be carried out before the next scheduling callback should be kept or cleared")
+    parser.add_argument('--Engine', default='loop',choices=['loop','event'], type=str, help="loop: Visit every active trace in each simulated timestep / event: Only process traces whose activities end or start (identical results)")
+    parser.add_argument('--WindowStrategy', default='width',choices=['width','count','load'], type=str, help="width: Windows of equal duration / count: Windows with the same number of events / load: Windows of equal duration, split if they hold more than --WindowMaxEvents events")
+    parser.add_argument('--WindowMaxEvents', default=None, type=int, help="Maximum number of events per window for --WindowStrategy load (default: the mean number of events per window)")
+    parser.add_argument('--NoFastForward', default=False, action='store_true', help="Step through every window, also those in which no trace is waiting (the scheduler and the fairness/congestion callbacks are called in each window)")
+    parser.add_argument('--Solver', default='flow',choices=['flow','assignment','incremental','greedy'], type=str, help="flow: Solve the scheduling network with networkx max_flow_min_cost (default) / assignment: Solve it as bipartite matching where possible (same objective value) / incremental: Like assignment, warm-started from the previous window / greedy: Assign in order of the weights (not optimal)")
+    parser.add_argument('--SolverTopK', default=None, type=int, help="Only add the k best resource edges of each waiting case to the scheduling network (and those needed to assign as many cases as possible)")
+    parser.add_argument('--SolverBudget', default=None, type=float, help="Time budget of the scheduling solver per window in seconds, a greedy assignment is used if it is expected or turns out to take longer")
+    parser.add_argument('--ScheduleCache', default=None, type=int, help="Number of solved scheduling networks to keep in a LRU cache, such that recurring queue states are not solved again")
+    parser.add_argument('--ScheduleCacheQuantum', default=1, type=int, help="Edge weights (100000 * ratio) are divided by this number for the cache key, values above 1 allow hits for nearly identical ratios")
+    parser.add_argument('--PlanningHorizon', default=1, type=int, help="Number of windows planned by one scheduling call, resources can be assigned to as many cases as they are expected to finish in this time")
+    parser.add_argument('--ReplanThreshold', default=0.25, type=float, help="Share of waiting cases missed by the current plan (new arrivals, ended activities) above which the scheduler is called before the horizon ends")
+    parser.add_argument('--SolverWorkers', default=1, type=int, help="If larger than 1, independent components of the scheduling network are solved separately, large ones in parallel by this number of workers")
             
     # Fairness parameters
     parser.add_argument('-F', '--Fair', default=None, choices=['W','T'], type=str, help="W: Amount of work / T: Time spent working")
     parser.add_argument('--FairnessBacklogN', default=50, type=int, help="Number of passed windows to consider for fairness calculations")
+    parser.add_argument('--FairnessCoefficient', default=0.5, type=float, help="Weight of the normalized fairness ratio if both fairness and congestion are optimized")
+    parser.add_argument('--FairnessFullScan', default=False, action='store_true', help="Recalculate fairness from the history of all traces in each window instead of updating it incrementally (reference implementation)")
     
     # Congestion parameters
     parser.add_argument('-C', '--Congestion', default=None, choices=['N','T'], type=str, help="N: Number of cases in segment / T: Time spent in segment")
     parser.add_argument('--CongestionBacklogN', default=50, type=int, help="Number of passed windows to consider for calculations")
+    parser.add_argument('--CongestionCoefficient', default=0.5, type=float, help="Weight of the normalized congestion ratio if both fairness and congestion are optimized")
+    parser.add_argument('--CongestionFullScan', default=False, action='store_true', help="Recalculate congestion from the history of all traces in each window instead of updating it incrementally (reference implementation)")
     
     # Multi-Simulation mode
     parser.add_argument('-M', '--MultiSimulation', default=None, type=str, help="Path to config file for running multiple simulations in parallel, containing commandline parameters with each line being one experiment")
     parser.add_argument('--MultiSimCores', default=int(multiprocessing.cpu_count() / 2), type=int, help="Amount of cores/processes to use for computation - Python can behave weird if the number is close to the amount of available logical cores")
+    parser.add_argument('--SweepDir', default=None, type=str, help="Directory of the manifest and completion records of a multi-simulation, experiments recorded as done are skipped when it is restarted (default: <config file>.sweep)")
+    parser.add_argument('--SweepTimeout', default=None, type=float, help="Wall-clock limit of each experiment of a multi-simulation in seconds")
+    parser.add_argument('--SweepMaxRSS', default=None, type=float, help="Memory limit of each experiment of a multi-simulation in MB (resident memory without the shared logs)")
+    parser.add_argument('--SweepRetries', default=0, type=int, help="How often an experiment of a multi-simulation that crashed is started again")
 
     # Predictor parameters
     parser.add_argument('--PredictorPort', default=5050, type=int, help="Port of the server handling predictions")
@@ -91,27 +129,29 @@ def argsParse(cmdParameterLine = None):
     if cmdParameterLine is None:
         argData = parser.parse_args()
     else:
-        argData = parser.parse_args(cmdParameterLine.split())
+        argData = parser.parse_args(shlex.split(cmdParameterLine))
 
     
+    if argData.SolverBudget is not None and argData.SolverBudget < 0:
+        parser.error(f'argument --SolverBudget: must not be negative ({argData.SolverBudget})')
+    
     # Check for pre-defined activity durations
-    if argData.actDurations is not None:
+    if argData.actDurations is not None and updateGlobals:
         print(argData.actDurations)
         global G_KnownActivityDurations
         G_KnownActivityDurations = json.loads(argData.actDurations)
     
-    # Ensure proper multiprocessing safety (Python seems to act odd on too many simultaneous processes)
-    if argData.MultiSimCores > int(multiprocessing.cpu_count() / 2):
-        descision = input('Using more than half of the virtual cores available might lead to instability due to the nature of python multiprocessing! Continue [y/n]?')
-        if descision not in ['y','Y','yes','Yes']:
-            exit(0)
+    # Ensure proper multiprocessing safety (Python seems to act odd on too many simultaneous processes) - Only warn, sweeps run unattended
+    if cmdParameterLine is None and argData.MultiSimulation is not None and argData.MultiSimCores > int(multiprocessing.cpu_count() / 2):
+        print('WARNING: Using more than half of the virtual cores available might lead to instability due to the nature of python multiprocessing!')
 
     # Check whether a model is specified if predictions are to be used
     if (argData.PredictorModelNextAct is None or argData.PredictorModelActDur is None) and (argData.SimMode == 'prediction' or argData.PredictorStandalone):
         print('NO MODEL SPECIFIED! - You specified to use prediction mode or want to start a standalone predictor, make sure to provide a prediction model via --PredictorModelNextAct and --PredictorModelActDur')
         exit(0)
             
-    scriptArgs = argData
+    if updateGlobals:
+        scriptArgs = argData
     return argData
 
 def ConvertArguments(args):
@@ -139,7 +179,25 @@ def ConvertArguments(args):
     else:
         raise('No simulation mode specified!')
     
-    return simMode, optMode, schedBehaviour
+    if args.Engine == 'loop':
+        engine = SIM_Engines.TIMESTEP_LOOP
+    elif args.Engine == 'event':
+        engine = SIM_Engines.EVENT_DRIVEN
+    else:
+        raise('No simulation engine specified!')
+    
+    if args.Solver == 'flow':
+        solver = SolverBackends.NETWORK_FLOW
+    elif args.Solver == 'assignment':
+        solver = SolverBackends.ASSIGNMENT
+    elif args.Solver == 'incremental':
+        solver = SolverBackends.INCREMENTAL
+    elif args.Solver == 'greedy':
+        solver = SolverBackends.GREEDY
+    else:
+        raise('No solver backend specified!')
+    
+    return simMode, optMode, schedBehaviour, engine, solver
 
 
 
@@ -147,23 +205,65 @@ def ConvertArguments(args):
 
 def SimulatorFairness_Callback(simulatorState):
     global scriptArgs       
+    global fairnessAccumulator
         
-    if scriptArgs.Fair == "W":
+    if fairnessAccumulator is not None:
+        if scriptArgs.Fair == "W":
+            return fairnessAccumulator.Fair_WORK(simulatorState)
+        elif scriptArgs.Fair == "T":
+            return fairnessAccumulator.Fair_TIME(simulatorState)
+    elif scriptArgs.Fair == "W":
         return Fairness.FairnessBacklogFair_WORK(simulatorState, BACKLOG_N=scriptArgs.FairnessBacklogN)
     elif scriptArgs.Fair == "T":
         return Fairness.FairnessBacklogFair_TIME(simulatorState, BACKLOG_N=scriptArgs.FairnessBacklogN)
 
 def SimulatorCongestion_Callback(simulatorState):
     global scriptArgs
-
-    if scriptArgs.Congestion == "N":
+    global congestionTracker
+
+    if congestionTracker is not None:
+        if scriptArgs.Congestion == "N":
+            return congestionTracker.GetProgressByWaitingNumber(simulatorState)
+        elif scriptArgs.Congestion == "T":
+            return congestionTracker.GetProgressByWaitingTime(simulatorState)
+    elif scriptArgs.Congestion == "N":
         return Congestion.GetProgressByWaitingNumberInFrontOfActivity(simulatorState, scriptArgs.CongestionBacklogN)
     elif scriptArgs.Congestion == "T":
         return Congestion.GetProgressByWaitingTimeInFrontOfActivity(simulatorState, scriptArgs.CongestionBacklogN)
 
+def SimulatorCaseArrived_Callback(trace, currentWindow):
+    if congestionTracker is not None:
+        congestionTracker.CaseArrived(trace, currentWindow)
+
+def SimulatorActivityStarted_Callback(trace, currentWindow):
+    if congestionTracker is not None:
+        congestionTracker.ActivityStarted(trace, currentWindow)
+
+def SimulatorActivityEnded_Callback(trace, currentWindow):
+    if fairnessAccumulator is not None:
+        fairnessAccumulator.ActivityEnded(trace, currentWindow)
+    if congestionTracker is not None:
+        congestionTracker.ActivityEnded(trace, currentWindow)
+
+def SimulatorEventDurations_Callback(R, traces):
+    """Durations are calculated on the event store shared by all traces, hence they can be taken from the log cache"""
+    store = traces[0].store if len(traces) > 0 else None
+    if store is not None and not store.durations.flags.writeable:
+        return # Shared log, calculated by the parent process
+    if logCache is None or store is None or any([x.store is not store for x in traces]):
+        return EventDurationsByMinPossibleTime(R, traces)
+    
+    durations = logCache.Durations('minPossibleTime')
+    if durations is not None and len(durations) == len(store):
+        store.durations[:] = durations
+    else:
+        EventDurationsByMinPossibleTime(R, traces)
+        logCache.StoreDurations('minPossibleTime', store.durations)
+
 def SimulatorWindowStartScheduling_Callback(simulatorState, schedulingReadyResources, fRatio, cRatio):
     #return Optimization.SimulatorTestScheduling(activeTraces, A, P_AtoR, availableResources, simTime, windowDuration, fRatio, cRatio, optimizationMode)
-    return Optimization.OptimizeActiveTraces(simulatorState, schedulingReadyResources, fRatio, cRatio)
+    return Optimization.OptimizeActiveTraces(simulatorState, schedulingReadyResources, fRatio, cRatio, solver=solverBackend, warmStart=incrementalAssignment, pool=componentPool, topK=scriptArgs.SolverTopK, budget=solverBudget, cache=scheduleCache,
+                                             fairnessCoefficient=scriptArgs.FairnessCoefficient, congestionCoefficient=scriptArgs.CongestionCoefficient)
 
 
 
@@ -214,6 +314,55 @@ def PredictorAnswer_Callback(msg):
 
 
 
+def LoadLog(args):
+    """Single pass over the log file (XES, CSV, Parquet) into event columns {'cid', 'act', 'res', 'ts', 'lc'}, used for the windows and the traces of the simulator"""
+    global logCache
+    columns = LogColumns(args)
+    variant = json.dumps([columns, args.LogTimestampFormat]) if columns is not None or args.LogTimestampFormat is not None else None
+    logCache = LogCache.LogCache(args.LogCache, args.log, args.verbose, variant) if args.LogCache is not None else None
+    log = logCache.Columns() if logCache is not None else None
+    if log is None:
+        log = logReader.ReadEventColumns(args.log, columns, args.LogTimestampFormat)
+        if logCache is not None:
+            logCache.StoreColumns(log)
+    return log
+
+def LogColumns(args):
+    """{attribute: column} of --LogColumns, None if not given"""
+    return dict([x.split('=', 1) for x in args.LogColumns]) if args.LogColumns is not None else None
+
+def LogKey(args):
+    """Identifies a loaded log: the file and how its columns and timestamps are read"""
+    return (args.log, json.dumps(LogColumns(args), sort_keys=True), args.LogTimestampFormat)
+
+def PublishLogs(argList, blocks):
+    """Load and preprocess each distinct log of the experiments once and put it into shared memory, returns {log key: handle}"""
+    handles = {}
+    for cmd in argList:
+        args = argsParse(cmd, updateGlobals=False)
+        if LogKey(args) in handles:
+            continue
+        
+        try:
+            log = LoadLog(args)
+        except Exception:
+            # Not shared, the experiments on this log fail on their own and are recorded as such
+            traceback.print_exc()
+            continue
+        traces = ExtractTraces(log, 'ts', 'lc', None, None)
+        _, _, _, R = ExtractActivityResourceMapping(traces)
+        SimulatorEventDurations_Callback(R, traces)
+        handles[LogKey(args)] = sharedLog.PublishLog(log, traces[0].store, blocks)
+    return handles
+
+def SweepWorker(cmd, handles):
+    """Process of one MultiSimulation experiment"""
+    global sharedLogs
+    sharedLogs = handles
+    Run(cmd)
+
+
+
 ####################################
 #############          #############
 ##########      MAIN      ##########
@@ -223,31 +372,66 @@ def Run(args):
     if type(args) == str:
         args = argsParse(args)
 
-    log = pm4py.read_xes(args.log)
+    global logCache
+    logKey = LogKey(args)
+    if logKey in sharedLogs:
+        # Published by the parent process, the traces are built on its event store (with durations already calculated)
+        if logKey not in attachedLogs:
+            attachedLogs[logKey] = sharedLog.AttachLog(sharedLogs[logKey])
+        log, simLog = attachedLogs[logKey]
+        logCache = None
+    else:
+        log = LoadLog(args)
+        simLog = log
     
-    no_events = sum([len(trace) for trace in log])
+    no_events = len(log)
     windowNumber = 100 * math.ceil(math.sqrt(no_events))
     print(f"Number of windows: {windowNumber}")
     
-    # Convert XES-Events into dict {'act', 'ts', 'res', 'single', 'cid', 'lc'}
-    event_dict = extractor.event_dict(log, res_info=True)
-    
     # Pairs of events directly following each other, events triggering others (preceed them), events releasing others (follow them)
     # pairs, triggers, releases = extractor.trig_rel_dicts(log, method='df')
     
     print('Computing frames, partitioning events into frames')
-    windowWidth = frames.get_width_from_number(event_dict, windowNumber)
-    bucketId_borders_dict = frames.bucket_window_dict_by_width(event_dict, windowWidth)
-    eventsPerWindowDict, id_frame_mapping = frames.bucket_id_list_dict_by_width(event_dict, windowWidth) # WindowID: [List of EventIDs] , EventID: WindowID
+    windowWidth = frames.get_width_from_number(log, windowNumber)
+    windowKey = f'{args.WindowStrategy}_{windowNumber}' + (f'_{args.WindowMaxEvents}' if args.WindowStrategy == 'load' else '')
+    bucketId_borders_dict = logCache.Windows(windowKey) if logCache is not None else None
+    if bucketId_borders_dict is None:
+        if args.WindowStrategy == 'count':
+            bucketId_borders_dict = frames.bucket_window_dict_by_count(log, windowNumber)
+        elif args.WindowStrategy == 'load':
+            maxEvents = args.WindowMaxEvents if args.WindowMaxEvents is not None else math.ceil(no_events / windowNumber)
+            bucketId_borders_dict = frames.bucket_window_dict_by_load(log, windowWidth, maxEvents)
+        else:
+            bucketId_borders_dict = frames.bucket_window_dict_by_width(log, windowWidth)
+        
+        if logCache is not None:
+            logCache.StoreWindows(windowKey, bucketId_borders_dict)
+    eventsPerWindowDict, id_frame_mapping = frames.bucket_id_list_dict(log, bucketId_borders_dict) # WindowID: [List of EventIDs] , EventID: WindowID
+    print(f"Windows after partitioning ({args.WindowStrategy}): {len(bucketId_borders_dict)}")
       
     # Read the config to set up the simulator
-    simMode, optMode, schedBehaviour = ConvertArguments(args)
+    simMode, optMode, schedBehaviour, engine, solver = ConvertArguments(args)
+    
+    global solverBackend
+    global incrementalAssignment
+    solverBackend = solver
+    incrementalAssignment = Optimization.IncrementalAssignment() if solver == SolverBackends.INCREMENTAL else None
+    
+    global solverBudget
+    solverBudget = Optimization.SolverBudget(args.SolverBudget, args.verbose) if args.SolverBudget is not None else None
+    
+    global scheduleCache
+    scheduleCache = Optimization.ScheduleCache(args.ScheduleCache, args.ScheduleCacheQuantum) if args.ScheduleCache is not None else None
 
     # Simulation -> Callback at the beginning / end of each window
-    sim = Simulator(log, eventsPerWindowDict, bucketId_borders_dict, 
+    sim = Simulator(simLog, eventsPerWindowDict, bucketId_borders_dict, 
                     simulationMode      = simMode,
                     optimizationMode    = optMode,
                     schedulingBehaviour = schedBehaviour,
+                    engine              = engine,
+                    planningHorizon     = args.PlanningHorizon,
+                    replanThreshold     = args.ReplanThreshold,
+                    fastForward         = not args.NoFastForward,
                     verbose=args.verbose)
     
     global simulator
@@ -256,13 +440,48 @@ def Run(args):
     sim.Register(SIM_Callbacks.WND_START_SCHEDULING, SimulatorWindowStartScheduling_Callback)
     sim.Register(SIM_Callbacks.CALC_Fairness, SimulatorFairness_Callback)
     sim.Register(SIM_Callbacks.CALC_Congestion, SimulatorCongestion_Callback)
-    sim.Register(SIM_Callbacks.CALC_EventDurations, lambda x,y: EventDurationsByMinPossibleTime(x,y)) # Something like EventDurationsByLifecycle?
+    sim.Register(SIM_Callbacks.CALC_EventDurations, SimulatorEventDurations_Callback) # Something like EventDurationsByLifecycle?
 
     sim.Register(SIM_Callbacks.PREDICT_NEXT_ACT, SimulatorPredictionNextAct_Callback)
     sim.Register(SIM_Callbacks.PREDICT_ACT_DUR,  SimulatorPredictionActDur_Callback)
 
+    sim.Register(SIM_Callbacks.CASE_ARRIVED, SimulatorCaseArrived_Callback)
+    sim.Register(SIM_Callbacks.ACT_STARTED,  SimulatorActivityStarted_Callback)
+    sim.Register(SIM_Callbacks.ACT_ENDED,    SimulatorActivityEnded_Callback)
+
     sim.Initialize()
-    sim.Run()
+    
+    # Fairness and congestion are updated by the simulator whenever cases progress, unless the full recalculation is requested
+    global fairnessAccumulator
+    global congestionTracker
+    fairnessAccumulator = None
+    congestionTracker   = None
+    if args.Fair is not None and not args.FairnessFullScan:
+        fairnessAccumulator = Fairness.FairnessBacklogAccumulator(bucketId_borders_dict, args.FairnessBacklogN)
+    if args.Congestion is not None and not args.CongestionFullScan:
+        congestionTracker = Congestion.SegmentCongestionTracker(sim.A, bucketId_borders_dict, simMode, args.CongestionBacklogN)
+    
+    # Completed traces are written to the output right away and freed, unless the full scans still look at their history
+    keepHistory = (args.Fair is not None and args.FairnessFullScan) or (args.Congestion is not None and args.CongestionFullScan)
+    sim.StreamSimulationLog(args.out, releaseHistory=not keepHistory)
+
+    # The workers of the pool are shut down even if the simulation fails
+    global componentPool
+    componentPool = Optimization.CreateComponentPool(args.SolverWorkers) if args.SolverWorkers > 1 else None
+    try:
+        sim.Run()
+    finally:
+        if componentPool is not None:
+            componentPool.shutdown()
+            componentPool = None
+    
+    if solverBudget is not None:
+        print(solverBudget.Summary())
+    if scheduleCache is not None:
+        print(scheduleCache.Summary())
+    if logCache is not None:
+        print(logCache.Summary())
+    
     sim.ExportSimulationLog(args.out)
     #sim.ExportSimulationLog('logs/simulated_congestion_log_WAITING_TRACE_COUNT.xes')
 
@@ -297,8 +516,17 @@ def main():
                     if cmd != "":
                         argList.append(cmd)
 
-            with Pool(max(1, args.MultiSimCores)) as p:
-                p.map(Run, argList)
+            sweep = Sweep(args.SweepDir if args.SweepDir is not None else f'{args.MultiSimulation}.sweep', args.MultiSimCores, args.SweepTimeout, args.SweepMaxRSS, args.SweepRetries, args.verbose)
+            runs  = sweep.Manifest([(cmd, x.log, x.out) for cmd, x in [(cmd, argsParse(cmd, updateGlobals=False)) for cmd in argList]])
+
+            # Workers attach to the logs in shared memory instead of loading them themselves
+            blocks = []
+            try:
+                handles = PublishLogs([x['cmd'] for x in runs], blocks)
+                sweep.Execute(runs, SweepWorker, (handles,))
+            finally:
+                sharedLog.ReleaseBlocks(blocks)
+            print(sweep.Summary())
     
 
 if __name__ == '__main__':
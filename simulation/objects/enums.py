@@ -8,6 +8,9 @@ class Callbacks(Enum):
     CALC_EventDurations  = 8
     PREDICT_NEXT_ACT     = 16
     PREDICT_ACT_DUR      = 32
+    ACT_STARTED          = 64  # Notification (trace, currentWindow) after a trace started its next activity
+    ACT_ENDED            = 128 # Notification (trace, currentWindow) after a trace ended its current activity
+    CASE_ARRIVED         = 256 # Notification (trace, currentWindow) after a trace became active
     
 class TimestampModes(Enum):
     START   = 0
@@ -19,10 +22,20 @@ class SimulationModes(Enum):
     PREDICTED_FUTURE = 1
     EVENT_STREAM     = 2
     
+class SimulationEngines(Enum):
+    TIMESTEP_LOOP = 0 # Visit every active trace in each simulated timestep
+    EVENT_DRIVEN  = 1 # Only touch traces whose activity ends or which are ready to start
+
 class OptimizationModes(Enum):
     FAIRNESS   = 0
     CONGESTION = 1
     BOTH       = 2
+
+class SolverBackends(Enum):
+    NETWORK_FLOW = 0 # networkx max_flow_min_cost on the flow network
+    ASSIGNMENT   = 1 # Weighted bipartite matching on a cost matrix, used for unit capacities (falls back to NETWORK_FLOW otherwise)
+    INCREMENTAL  = 2 # Like ASSIGNMENT, but warm-started from the matching and dual prices of the previous window
+    GREEDY       = 3 # Assign edges in order of their weight, not optimal but fast
     
 class SchedulingBehaviour(Enum):
     KEEP_ASSIGNMENTS              = 0
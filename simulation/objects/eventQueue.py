@@ -0,0 +1,144 @@
+import heapq
+
+
+class EventQueue:
+    """Bookkeeping of the event-driven simulation engine.
+    Running traces are kept in a heap of activity-completion events, scheduled but waiting traces in per-resource ready queues.
+    Every trace gets a rank once it becomes active, such that all decisions can be taken in the order of the simulators active trace list."""
+
+    def __init__(self):
+        self.completions = []    # Heap [(end_ts, rank, case) ...]
+        self.pending     = []    # Heap [(start_ts, rank, case, res) ...] - Scheduled traces not yet allowed to start
+        self.ready       = {}    # {res: Heap [(rank, case) ...]}        - Scheduled traces allowed to start once res is free
+        self.dirty       = set() # Resources whose ready queue has to be checked in the current timestep
+
+        # Active traces in the order of activation, linked such that the successor of a trace can be found in O(1)
+        self.active = {}   # {case: trace}
+        self.rank   = {}   # {case: rank}
+        self.next   = {}   # {case: case}
+        self.prev   = {}   # {case: case}
+        self.tail   = None
+        self.counter = 0
+
+    def ActiveTraces(self) -> list:
+        return list(self.active.values())
+
+    def Activate(self, trace):
+        """Append a trace to the end of the active trace order"""
+        case = trace.case
+        self.active[case] = trace
+        self.rank[case] = self.counter
+        self.counter += 1
+
+        self.prev[case] = self.tail
+        self.next[case] = None
+        if self.tail is not None:
+            self.next[self.tail] = case
+        self.tail = case
+
+    def Deactivate(self, trace):
+        """Remove a trace from the active trace order, returns the case that succeeded it"""
+        case = trace.case
+        prv = self.prev.pop(case)
+        nxt = self.next.pop(case)
+
+        if prv is not None:
+            self.next[prv] = nxt
+        if nxt is not None:
+            self.prev[nxt] = prv
+        else:
+            self.tail = prv
+
+        del self.active[case]
+        del self.rank[case]
+        return nxt
+
+    ##############################################
+    #############                    #############
+    ##########    COMPLETION EVENTS     ##########
+    #############                    #############
+    ##############################################
+    def PushCompletion(self, trace):
+        heapq.heappush(self.completions, (trace.GetActivityEndTime(), self.rank[trace.case], trace.case))
+
+    def PopDueCompletions(self, time) -> list:
+        """Remove and return all traces whose activity ends until 'time', ordered like the active trace list"""
+        due = []
+        while len(self.completions) > 0 and self.completions[0][0] <= time:
+            due.append(heapq.heappop(self.completions))
+
+        return [self.active[case] for _, _, case in sorted(due, key=lambda x: x[1])]
+
+    def MinRemainingTime(self, remainingTimeFunc, skip):
+        """Smallest remaining time of all running traces which are not in 'skip', None if there is none.
+        Heap keys are the exact end timestamps, the remaining time is computed by 'remainingTimeFunc' for all traces sharing the smallest key,
+        such that the minimum is the same value the loop engine takes over all traces"""
+        held = []
+        minKey = None
+        minRemainingTime = None
+
+        while len(self.completions) > 0:
+            entry = heapq.heappop(self.completions)
+            held.append(entry)
+
+            if entry[2] in skip:
+                continue
+            if minKey is not None and entry[0] > minKey:
+                break
+
+            minKey = entry[0]
+            remainingTime = remainingTimeFunc(self.active[entry[2]])
+            if minRemainingTime is None or remainingTime < minRemainingTime:
+                minRemainingTime = remainingTime
+
+        for entry in held:
+            heapq.heappush(self.completions, entry)
+        return minRemainingTime
+
+    ##############################################
+    #############                    #############
+    ##########       READY QUEUES       ##########
+    #############                    #############
+    ##############################################
+    def SetSchedule(self, schedule):
+        """Replace the content of the ready queues by the waiting traces of a new schedule"""
+        self.pending = []
+        self.ready   = {}
+
+        for case in schedule:
+            self.Enqueue(case, schedule)
+
+    def Enqueue(self, case, schedule):
+        trace = self.active.get(case)
+        traceSched = schedule.get(case)
+
+        if trace is not None and traceSched is not None and trace.IsWaiting():
+            heapq.heappush(self.pending, (traceSched['StartTime'], self.rank[case], case, traceSched['Resource']))
+
+    def PopReadyTraces(self, time, availableResources, schedule) -> list:
+        """Remove and return [(trace, res)...] for all scheduled traces that can start at 'time', ordered like the active trace list"""
+
+        # Scheduled start times that have been reached
+        while len(self.pending) > 0 and self.pending[0][0] <= time:
+            _, rank, case, res = heapq.heappop(self.pending)
+            heapq.heappush(self.ready.setdefault(res, []), (rank, case))
+            self.dirty.add(res)
+
+        starting = []
+        for res in self.dirty:
+            if res not in availableResources:
+                continue
+
+            queue = self.ready.get(res, [])
+            while len(queue) > 0:
+                rank, case = heapq.heappop(queue)
+
+                # Only consider entries that are still part of the schedule
+                trace = self.active.get(case)
+                traceSched = schedule.get(case)
+                if trace is not None and trace.IsWaiting() and traceSched is not None and traceSched['Resource'] == res:
+                    starting.append((rank, trace, res))
+                    break
+        self.dirty.clear()
+
+        return [(trace, res) for _, trace, res in sorted(starting, key=lambda x: x[0])]
@@ -0,0 +1,145 @@
+import numpy as np
+
+
+class EventStore:
+    """Log-wide columnar storage of the events of all traces.
+    Activities, resources and lifecycle states are dictionary encoded, the events of a case are stored consecutively (rows offsets[i] to offsets[i+1])"""
+
+    def __init__(self, cases, offsets, activities, act, resources, res, ts, lifecycles=None, lc=None):
+        self.cases   = cases    # [case ...]
+        self.offsets = offsets  # int64 [len(cases) + 1]
+
+        self.activities = activities  # [name ...] - Position is the activity id
+        self.resources  = resources   # [name ...] - Position is the resource id
+        self.lifecycles = lifecycles  # [name ...] - Position is the lifecycle id, None if no lifecycle information is available
+
+        self.act = act  # int32 [n]
+        self.res = res  # int32 [n]
+        self.ts  = ts   # float64 [n]
+        self.lc  = lc   # int32 [n] or None
+
+        # Duration of the events, 1 until calculated otherwise
+        self.durations = np.ones(len(ts), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def Event(self, i) -> tuple:
+        """(a,r,ts) tuple of the event in row i"""
+        return (self.activities[self.act[i]], self.resources[self.res[i]], float(self.ts[i]))
+
+    def Activity(self, i) -> str:
+        return self.activities[self.act[i]]
+
+    def Timestamp(self, i) -> float:
+        return float(self.ts[i])
+
+    def Slice(self, start, end):
+        """Copy of the rows start to end as a single-case store, e.g. to send a trace to the predictor without the rest of the log"""
+        store = EventStore([None], np.array([0, end - start], dtype=np.int64),
+                           self.activities, self.act[start:end].copy(),
+                           self.resources, self.res[start:end].copy(),
+                           self.ts[start:end].copy(),
+                           self.lifecycles, None if self.lc is None else self.lc[start:end].copy())
+        store.durations = self.durations[start:end].copy()
+        return store
+
+
+def Encode(values):
+    """Dictionary encoding in order of first appearance, returns (names, ids)"""
+    codes = {}
+    ids = np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int32, count=len(values))
+    return list(codes.keys()), ids
+
+
+def BuildEventStore(cids, acts, ress, tss, lcs=None, sortByTimestamp=True):
+    """Build the store from per-event columns in arbitrary order.
+    Cases are ordered by their id, events of a case by timestamp (keeping the original order for equal timestamps)"""
+    caseNames, caseIds = np.unique(np.asarray(cids), return_inverse=True)
+    ts = np.asarray(tss, dtype=np.float64)
+
+    if sortByTimestamp:
+        order = np.lexsort((np.arange(len(ts)), ts, caseIds))
+    else:
+        order = np.lexsort((np.arange(len(ts)), caseIds))
+
+    activities, act = Encode(acts)
+    resources, res  = Encode(ress)
+    lifecycles, lc  = (None, None) if lcs is None else Encode(lcs)
+
+    offsets = np.zeros(len(caseNames) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(caseIds, minlength=len(caseNames)), out=offsets[1:])
+
+    return EventStore(caseNames.tolist(), offsets,
+                      activities, act[order],
+                      resources, res[order],
+                      ts[order],
+                      lifecycles, None if lc is None else lc[order])
+
+
+class EventView:
+    """Read-only sequence of the (a,r,ts) tuples in the rows first to end of a store"""
+    __slots__ = ('store', 'first', 'end')
+
+    def __init__(self, store, first, end):
+        self.store = store
+        self.first = first
+        self.end   = end
+
+    def __len__(self):
+        return max(0, self.end - self.first)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError('event index out of range')
+        return self.store.Event(self.first + i)
+
+    def __iter__(self):
+        for i in range(self.first, self.end):
+            yield self.store.Event(i)
+
+
+class ColumnView:
+    """Sequence over the rows first to end of a single store column, decoded by 'names' if given"""
+    __slots__ = ('column', 'first', 'end', 'names')
+
+    def __init__(self, column, first, end, names=None):
+        self.column = column
+        self.first  = first
+        self.end    = end
+        self.names  = names
+
+    def __len__(self):
+        if self.column is None:
+            return 0
+        return max(0, self.end - self.first)
+
+    def __Row(self, i):
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError('event index out of range')
+        return self.first + i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        value = self.column[self.__Row(i)]
+        if self.names is not None:
+            return self.names[value]
+        return value.item()
+
+    def __setitem__(self, i, value):
+        if self.names is not None:
+            raise Exception("Encoded columns are read-only!")
+        self.column[self.__Row(i)] = value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -1,38 +1,41 @@
-import pm4py
+import numpy as np
 import utils.extractor as extractor
 from simulation.objects.traceInstance import Trace
+from simulation.objects.eventStore import BuildEventStore, EventStore
 from simulation.objects.enums import TimestampModes
+from utils.logReader import ReadEventColumns, EventColumns
 
 def ExtractTraces(log, timestampAttribute, lifecycleAttribute, callback_PREDICT_NEXT_ACT, callback_PREDICT_ACT_DUR):
     if type(log) == str:
-        log = pm4py.read_xes(log)
+        log = ReadEventColumns(log)
 
-    events = extractor.event_dict(log, res_info=True)
-    eventTraces = {cid:[] for cid in set([e['cid'] for _, e in events.items()])}
+    # Columnar storage of all events, grouped by case and sorted by timestamp
+    if isinstance(log, EventStore):
+        # Already built, e.g. shared by the parent process of a MultiSimulation
+        store = log
+    elif isinstance(log, EventColumns):
+        # Already parsed into columns named like the keys of the event dict
+        store = BuildEventStore(log.cid, log.act, log.res, getattr(log, timestampAttribute), getattr(log, lifecycleAttribute) if lifecycleAttribute is not None else None)
+    else:
+        events = extractor.event_dict(log, res_info=True).values()
+        store = BuildEventStore([e['cid'] for e in events], 
+                                [e['act'] for e in events], 
+                                [e['res'] for e in events], 
+                                [e[timestampAttribute] for e in events],
+                                [e[lifecycleAttribute] for e in events] if lifecycleAttribute is not None else None)
+    
+    # Build the event traces as views on the store
     traces = []
-
-    # Build the event traces
-    for _, e in events.items():
-        eventTraces[e['cid']].append(e)            
-    
-    # Sort events in traces by timestamp
-    for cid in eventTraces.keys():
-        # Sort the events
-        eventTraces[cid].sort(key=lambda e: e[timestampAttribute])
-        
-        # Build the event trace
-        trace = Trace(str(cid), [(e['act'], e['res'], e[timestampAttribute]) for e in eventTraces[cid]], callback_PREDICT_NEXT_ACT, callback_PREDICT_ACT_DUR)
-    
-        # If there are lifecylce information, save them for later 
-        if lifecycleAttribute is not None:
-            trace.lifecycle = [e[lifecycleAttribute] for e in eventTraces[cid]]
-            
-        # Done here
-        traces.append(trace)
+    for i in range(len(store.cases)):
+        traces.append(Trace(str(store.cases[i]), range(int(store.offsets[i]), int(store.offsets[i + 1])), callback_PREDICT_NEXT_ACT, callback_PREDICT_ACT_DUR, store=store))
     return traces
     
 def ExtractActivityResourceMapping(traces):
     """ Get the mapping between Resources and Activities in order """
+    # Traces sharing one store that none of them has started yet => Read the pairs from its columns
+    if len(traces) > 0 and all([x.store is traces[0].store and x.cursor == x.start for x in traces]) and sum([x.end - x.start for x in traces]) == len(traces[0].store):
+        return ActivityResourceMappingFromStore(traces[0].store)
+    
     AtoR = {}
     RtoA = {}
     
@@ -51,4 +54,20 @@ def ExtractActivityResourceMapping(traces):
             if act not in RtoA[res]:
                 RtoA[res].append(act)
     
-    return {a: sorted(AtoR[a]) for a in AtoR}, {r: sorted(RtoA[r]) for r in RtoA}, sorted([a for a in AtoR.keys()]), sorted([r for r in RtoA.keys()])
\ No newline at end of file
+    return {a: sorted(AtoR[a]) for a in AtoR}, {r: sorted(RtoA[r]) for r in RtoA}, sorted([a for a in AtoR.keys()]), sorted([r for r in RtoA.keys()])
+
+def ActivityResourceMappingFromStore(store):
+    """Same result as 'ExtractActivityResourceMapping' for the traces of a whole store, from the distinct (activity, resource) id pairs"""
+    pairs = np.unique(store.act.astype(np.int64) * len(store.resources) + store.res)
+    
+    # Keys in order of their first appearance in the traces
+    acts, firstAct = np.unique(store.act, return_index=True)
+    ress, firstRes = np.unique(store.res, return_index=True)
+    AtoR = {store.activities[a]: [] for a in acts[np.argsort(firstAct)].tolist()}
+    RtoA = {store.resources[r]: [] for r in ress[np.argsort(firstRes)].tolist()}
+    
+    for a, r in zip((pairs // len(store.resources)).tolist(), (pairs % len(store.resources)).tolist()):
+        AtoR[store.activities[a]].append(store.resources[r])
+        RtoA[store.resources[r]].append(store.activities[a])
+    
+    return {a: sorted(AtoR[a]) for a in AtoR}, {r: sorted(RtoA[r]) for r in RtoA}, sorted([a for a in AtoR.keys()]), sorted([r for r in RtoA.keys()])
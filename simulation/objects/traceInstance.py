@@ -1,19 +1,28 @@
 import pickle
 from .enums import SimulationModes, TimestampModes
+from .eventStore import BuildEventStore, EventView, ColumnView
 
 
 class Trace:
-    def __init__(self, case, events, callback_PREDICT_NEXT_ACT, callback_PREDICT_ACT_DUR):
+    """View on the events of a single case in an EventStore, consumed events are skipped by advancing cursors instead of deleting them"""
+    __slots__ = ('case', 'store', 'start', 'end', 'cursor', 'durationCursor', 'history', 'currentAct', 'waiting',
+                 'PREDICT_NEXT_ACT', 'PREDICT_ACT_DUR', 'PRED_NextActivity', 'PRED_NextActivityDuration', 'PRED_CurrentActivityDuration')
+
+    def __init__(self, case, events, callback_PREDICT_NEXT_ACT, callback_PREDICT_ACT_DUR, store=None):
+        """'events' is either a list [(a,r,ts)...] or the range of rows of the trace in 'store'"""
         self.case = case     
         self.history = []      # [(start_ts, end_ts, res, (a,r,ts)) ...]
         
-        self.future  = events # [(a,r,ts)...]
-        
-        # Duration of the events in 'future' (in order)
-        self.durations = [1 for _ in range(len(events))]     
+        if store is None:
+            store  = BuildEventStore([case] * len(events), [e[0] for e in events], [e[1] for e in events], [e[2] for e in events], sortByTimestamp=False)
+            events = range(0, len(events))
+        self.store = store
+        self.start = events.start
+        self.end   = events.stop
         
-        # Lifecycle status of the events in 'future' (in order)
-        self.lifecycle = []
+        # Events before the cursor have been started, durations and lifecycles before the durationCursor belong to ended events
+        self.cursor         = self.start
+        self.durationCursor = self.start
                 
         self.currentAct = None # (start_ts, exec.res, (a,r,ts))
         self.waiting    = True # Not yet started, first event has still to come
@@ -22,15 +31,54 @@ class Trace:
         self.PREDICT_ACT_DUR  = callback_PREDICT_ACT_DUR
 
         # Set the initial event as known as it is the first time the case occurs and no information could be used for predictions otherwise
-        self.PRED_NextActivity            = self.future[0][0]
+        self.PRED_NextActivity            = self.store.Activity(self.start)
         self.PRED_NextActivityDuration    = 1
         self.PRED_CurrentActivityDuration = None
+
+    def __getstate__(self):
+        # Only serialize the events of this trace, not the whole store (e.g. when sent to the predictor service)
+        state = {x: getattr(self, x) for x in self.__slots__}
+        state['store']          = self.store.Slice(self.start, self.end)
+        state['start']          = 0
+        state['end']            = self.end - self.start
+        state['cursor']         = self.cursor - self.start
+        state['durationCursor'] = self.durationCursor - self.start
+        return state
+
+    def __setstate__(self, state):
+        for x, value in state.items():
+            setattr(self, x, value)
+
+    def __NextRow(self):
+        if self.cursor >= self.end:
+            raise IndexError('trace has no future events')
+        return self.cursor
+
+    def __Duration(self, i):
+        if self.durationCursor + i >= self.end:
+            raise IndexError('trace has no duration for this event')
+        return float(self.store.durations[self.durationCursor + i])
+
+    @property
+    def future(self):
+        """Events not started yet [(a,r,ts)...]"""
+        return EventView(self.store, self.cursor, self.end)
+
+    @property
+    def durations(self):
+        """Duration of the events not ended yet (in order)"""
+        return ColumnView(self.store.durations, self.durationCursor, self.end)
+
+    @property
+    def lifecycle(self):
+        """Lifecycle status of the events not ended yet (in order)"""
+        return ColumnView(self.store.lc, self.durationCursor, self.end, self.store.lifecycles)
     
     def PRED_UpdateNextActivityIfWrong(self):
         """Returns false if the next activity was correctly predicted, True otherwise"""
         act = self.GetNextActivity(SimulationModes.PREDICTED_FUTURE)
-        if act != self.future[0][0]:
-            self.PRED_NextActivity = self.future[0][0]
+        if act != self.store.Activity(self.__NextRow()):
+            self.PRED_NextActivity = self.store.Activity(self.__NextRow())
             #print(f'Wrong prediction {act} instead of {self.PRED_NextActivity}!')
             return True
         return False
@@ -42,15 +90,19 @@ class Trace:
         return self.currentAct is not None
     
     def HasEnded(self) -> bool:
-        return self.currentAct is None and len(self.future) == 0
+        return self.currentAct is None and self.cursor >= self.end
     
     def NextEventInWindow(self, windowLower, windowUpper) -> bool:
         #WARNING - PREDICTION MODE: We use the actual data of the event log to determine the starting point
-        return len(self.future) > 0 and windowLower <= self.future[0][2] <= windowUpper
+        return self.cursor < self.end and windowLower <= self.store.Timestamp(self.cursor) <= windowUpper
+    
+    def GetNextEventTime(self):
+        #WARNING - PREDICTION MODE: We use the actual data of the event log
+        return self.store.Timestamp(self.__NextRow())
     
     def GetNextActivity(self, simMode: SimulationModes) -> str:
         if simMode == SimulationModes.KNOWN_FUTURE:
-            return self.future[0][0]
+            return self.store.Activity(self.__NextRow())
         elif simMode == SimulationModes.PREDICTED_FUTURE:
             # Request the next_activity prediction, if future has a value this has already been done, do not do it again
             if self.PRED_NextActivity is None:
@@ -62,7 +114,7 @@ class Trace:
     
     def GetNextEvent(self, simMode: SimulationModes) -> str:
         if simMode == SimulationModes.KNOWN_FUTURE:
-            return self.future[0]
+            return self.store.Event(self.__NextRow())
         elif simMode == SimulationModes.PREDICTED_FUTURE:
             if self.PRED_NextActivity is None:
                 self.PRED_NextActivity = self.PREDICT_NEXT_ACT(self)
@@ -101,18 +153,22 @@ class Trace:
         #     return (self.currentAct[0] + duration) - time # Start time + duration - current time = remaining time
         else:
             timePassed = time - self.currentAct[0]
-            return self.durations[0] - timePassed
+            return self.__Duration(0) - timePassed
             # raise Exception("Illegal state!")
-    
+
+    def GetActivityEndTime(self) -> int:
+        """Timestamp at which the running activity ends according to the history data"""
+        return self.currentAct[0] + self.__Duration(0)
+
     def GetNextActivityTime(self, simMode: SimulationModes, timeMode: TimestampModes) -> int:
         if simMode == SimulationModes.KNOWN_FUTURE:
-            if len(self.future) == 0:
+            if self.cursor >= self.end:
                 return 0
             else:
                 if self.IsWaiting():
-                    return self.durations[0]
+                    return self.__Duration(0)
                 elif self.HasRunningActivity():
-                    return self.durations[1]
+                    return self.__Duration(1)
                 else:
                     raise Exception("Illegal state!")
         elif simMode == SimulationModes.PREDICTED_FUTURE:
@@ -136,16 +192,14 @@ class Trace:
         # Build (start_ts, end_ts, res, (a,r,ts))
         self.history.append((self.currentAct[0], time, self.currentAct[1], self.currentAct[2]))
         
-        if len(self.durations) > 0:
-            del self.durations[0]
-        
-        if len(self.lifecycle) > 0:
-            del self.lifecycle[0]
+        # Durations and lifecycles are consumed together
+        if self.durationCursor < self.end:
+            self.durationCursor += 1
             
         self.currentAct = None
 
         # Determine waiting status
-        if len(self.future) > 0 or simMode == SimulationModes.EVENT_STREAM:
+        if self.cursor < self.end or simMode == SimulationModes.EVENT_STREAM:
             self.waiting = True # Somewhere in the process or not officialy ended by eventstream
         else:
             self.waiting = False # All done here
@@ -159,6 +213,6 @@ class Trace:
         self.PRED_NextActivityDuration    = None
         self.PRED_NextActivity            = None
 
-        if len(self.future) > 0:
-            del self.future[0]
+        if self.cursor < self.end:
+            self.cursor += 1
         
\ No newline at end of file
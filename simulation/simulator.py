@@ -1,18 +1,22 @@
 from distutils.log import error
 import time
 from .objects.traceInstance import Trace
-from .objects.enums import Callbacks, TimestampModes, SimulationModes, SchedulingBehaviour
+from .objects.enums import Callbacks, TimestampModes, SimulationModes, SchedulingBehaviour, SimulationEngines
 from .objects.enums import EventStreamUpdates as ESU
 from datetime import datetime, timezone
 from pm4py.objects.log.exporter.xes import exporter as xes_exporter
 from pm4py.objects.conversion.log import converter as log_converter
 import pandas as pd
 import math
+import bisect
+import numpy as np
 from .objects.traceExtractor import ExtractTraces, ExtractActivityResourceMapping
+from .objects.eventQueue import EventQueue
+from utils.logWriter import OpenSink, IsColumnar
 import pickle
 
 class Simulator:
-    def __init__(self, log, eventsPerWindowDict, windows, simulationMode, optimizationMode, schedulingBehaviour, timestampMode = TimestampModes.END, timestampAttribute='ts', lifecycleAttribute='lc', verbose=False):
+    def __init__(self, log, eventsPerWindowDict, windows, simulationMode, optimizationMode, schedulingBehaviour, timestampMode = TimestampModes.END, timestampAttribute='ts', lifecycleAttribute='lc', engine = SimulationEngines.TIMESTEP_LOOP, planningHorizon=1, replanThreshold=0.25, fastForward=True, verbose=False):
         self.P_EventsPerWindowDict = eventsPerWindowDict
         self.P_Windows = windows
         self.P_WindowCount = len(windows)
@@ -20,15 +24,33 @@ class Simulator:
         self.P_SimulationMode = simulationMode
         self.P_OptimizationMode = optimizationMode
         self.P_SchedulingBehaviour = schedulingBehaviour
+        self.P_Engine = engine
+        self.P_PlanningHorizon = planningHorizon # Number of windows covered by one scheduling callback
+        self.P_ReplanThreshold = replanThreshold # Share of waiting traces the plan may miss before the scheduler is called again
+        self.P_FastForward = fastForward         # Jump over windows without waiting traces instead of calling the scheduler in each of them
         self.P_Log = log
                 
         self.completedTraces = list()
+        self.exportSink = None       # Completed traces are written to it right away, see 'StreamSimulationLog'
+        self.releaseHistory = False  # Free the history of completed traces once written
+        self.exportTimestamp = 1     # Position of the exported timestamp in the history entries, None for start and end
         self.callbacks = { x: None for x in Callbacks }
         
         self.SimulatedTimestep = 0    
         self.traceCount = 0        
         self.traces = []
+        self.arrivals = []     # Traces sorted by the timestamp of their first event
+        self.arrivalCursor = 0 # Traces in 'arrivals' before the cursor have already been looked at
+        self.missedArrivals = [] # Traces whose first event lies before the window in which they were looked at
         self.activeTraces = []
+        self.eventQueue = EventQueue()
+        self.resourceIndex = {}  # {res: position in R}
+        self.busyUntil     = None # float64 [len(R)] - Expected end of the activity running on each resource, -inf if free
+        self.planWindow  = None  # Window in which the current plan has been made
+        self.planMissing = set() # Waiting traces the current plan did not schedule when it was made
+        self.windowIds   = []    # Ids of 'P_Windows' in ascending order, windows added while running are appended
+        self.plansSolved = 0
+        self.idleWindows = 0     # Windows jumped over as no trace was waiting, arriving or ending in them
         self.LifecycleAttribute = lifecycleAttribute
 
         
@@ -55,6 +77,8 @@ class Simulator:
             'CurrentWindowLower':    self.P_Windows[currentWindow][0],
             'CurrentWindowUpper':    self.P_Windows[currentWindow][1],
             'CurrentWindowDuration': self.P_Windows[currentWindow][1] - self.P_Windows[currentWindow][0],
+            'PlanningHorizon':         self.P_PlanningHorizon,
+            'PlanningHorizonDuration': self.__HorizonDuration(currentWindow),
             'Windows': self.P_Windows,
             'Verbose': self.P_Verbose,
             'SimulationMode':      self.P_SimulationMode,
@@ -70,6 +94,58 @@ class Simulator:
             'ActiveTraces':    self.activeTraces
         }
         
+    def __HorizonDuration(self, currentWindow):
+        """Time from the lower border of 'currentWindow' to the upper border of the last window of the planning horizon.
+        Windows beyond the given ones have the width of the first window, like the ones added while running"""
+        last = currentWindow + self.P_PlanningHorizon - 1
+        if last in self.P_Windows:
+            return self.P_Windows[last][1] - self.P_Windows[currentWindow][0]
+        
+        # Windows are only added with ids above the existing ones
+        if len(self.windowIds) < len(self.P_Windows):
+            self.windowIds.extend(sorted(list(self.P_Windows)[len(self.windowIds):]))
+        lastGiven = self.windowIds[bisect.bisect_right(self.windowIds, last) - 1]
+        return self.P_Windows[lastGiven][1] - self.P_Windows[currentWindow][0] + (last - lastGiven) * (self.P_Windows[0][1] - self.P_Windows[0][0])
+    
+    def __PlanDeviation(self, schedule):
+        """Share of the waiting traces that are not scheduled, but have been waiting or were scheduled when the plan was made (new arrivals, ended activities, wrong predictions)"""
+        waiting  = [x for x in self.activeTraces if x.IsWaiting()]
+        if len(waiting) == 0:
+            return 0
+        
+        unplanned = [x for x in waiting if x.case not in self.planMissing and x.case not in schedule]
+        return len(unplanned) / len(waiting)
+    
+    def __NeedsPlanning(self, schedule, currentWindow) -> bool:
+        """Rolling horizon: A plan covers 'PlanningHorizon' windows and is only renewed early if it deviates too much from the simulated state"""
+        if self.P_PlanningHorizon <= 1 or self.planWindow is None or currentWindow >= self.planWindow + self.P_PlanningHorizon:
+            return True
+        
+        deviation = self.__PlanDeviation(schedule)
+        if deviation > self.P_ReplanThreshold:
+            self.__vPrint(f'    - Plan of window {self.planWindow} deviates by {deviation:.2f} => Replanning')
+            return True
+        return False
+    
+    def __FastForward(self, currentWindow):
+        """No trace is waiting => Simulating windows in which no trace arrives or ends would only advance the time, jump over them instead.
+        The time is advanced as stepping through the windows would do (to the upper border and one step beyond), returns the window to continue in"""
+        nextArrival    = self.arrivals[self.arrivalCursor].GetNextEventTime() if self.arrivalCursor < len(self.arrivals) else math.inf
+        nextCompletion = min([x.GetActivityEndTime() for x in self.activeTraces if x.HasRunningActivity()], default=math.inf)
+        
+        window = currentWindow
+        while window + 1 < self.P_WindowCount and self.SimulatedTimestep <= self.P_Windows[window][1] < nextCompletion:
+            self.SimulatedTimestep = self.P_Windows[window][1] + 1
+            window += 1
+            
+            # Traces arrive in the next window (or it is already passed) => It has to be started regularly
+            if nextArrival <= self.P_Windows[window][1] or self.SimulatedTimestep > self.P_Windows[window][1]:
+                window -= 1
+                break
+        
+        self.idleWindows += window - currentWindow
+        return window
+    
     def __GetLonelyResources(self):
         """Lonely resources are carrying out activities without any other resource taking part in the same activity
         They have to be treated differently for e.g. fairness calculations"""
@@ -85,14 +161,166 @@ class Simulator:
         return sorted([r for r in res if len(list(set(res[r]))) == 0])
         
     def __GetNewlyBeginningTraces(self, windowLower, windowUpper):
-        activeTracesList = [x for x in self.traces if x.NextEventInWindow(windowLower, windowUpper)]
+        """Advance the arrival cursor over all traces whose first event happens until the end of the window"""
+        activeTracesList = []
         
-        # Remove newly active traces from To-Do list
-        for x in activeTracesList:
-            self.traces.remove(x)
+        while self.arrivalCursor < len(self.arrivals) and self.arrivals[self.arrivalCursor].GetNextEventTime() <= windowUpper:
+            trace = self.arrivals[self.arrivalCursor]
+            
+            # Window borders never decrease => Traces arriving before the window are out of reach for the simulation
+            if trace.NextEventInWindow(windowLower, windowUpper):
+                activeTracesList.append(trace)
+            else:
+                self.missedArrivals.append(trace)
+            self.arrivalCursor += 1
             
         return sorted(activeTracesList, key=lambda x: x.case)
-              
+
+    def __GetNotStartedTraces(self):
+        notStarted = set([x.case for x in self.missedArrivals + self.arrivals[self.arrivalCursor:]])
+        return [x for x in self.traces if x.case in notStarted]
+
+    def __ActivateTraces(self, traces, currentWindow):
+        """Append newly beginning traces to the list of active traces"""
+        self.activeTraces = self.activeTraces + traces
+
+        for trace in traces:
+            if self.P_Engine == SimulationEngines.EVENT_DRIVEN:
+                self.eventQueue.Activate(trace)
+            self.__Notify(Callbacks.CASE_ARRIVED, (trace, currentWindow))
+
+    def __SyncActiveTraces(self):
+        """The event-driven engine does not touch the list of active traces while simulating a window, update it from the event queue"""
+        if self.P_Engine == SimulationEngines.EVENT_DRIVEN:
+            self.activeTraces = self.eventQueue.ActiveTraces()
+
+    def __EndActivity(self, trace, availableResources, currentWindow, currentWindowUpper) -> bool:
+        """End the running activity of a trace and release its resource, returns True if the trace is completed"""
+        trace.EndCurrentActivity(self.SimulatedTimestep, self.P_SimulationMode)
+        self.__Notify(Callbacks.ACT_ENDED, (trace, currentWindow))
+
+        # Return the now free resource to the resource pool (Resource actually used by newest event in history of trace)
+        availableResources[trace.history[-1][2]] = currentWindowUpper - self.SimulatedTimestep
+        self.busyUntil[self.resourceIndex[trace.history[-1][2]]] = -np.inf
+        self.__vPrint(f"    -> Trace '{trace.case}' has ended freeing res '{trace.history[-1][2]}' at simtime {self.SimulatedTimestep}")
+
+        if trace.HasEnded():
+            self.__CompleteTrace(trace)
+            return True
+        return False
+
+    def __CompleteTrace(self, trace):
+        self.completedTraces.append(trace)
+        if self.exportSink is not None:
+            self.exportSink.Write(trace.case, self.__ExportEvents(trace, None if self.exportSink.startEnd else self.exportTimestamp))
+            if self.releaseHistory:
+                trace.history = []
+
+    def __ExportTimestamp(self, exportSimulatorStartEndTimestamp):
+        """Position of the exported timestamp in the history entries, None to export start and end"""
+        if self.TimestampMode == TimestampModes.BOTH or exportSimulatorStartEndTimestamp:
+            return None
+        elif self.TimestampMode == TimestampModes.START:
+            return 0
+        return 1 # By default TimestampModes.END
+
+    def __OpenSink(self, logPath, exportSimulatorStartEndTimestamp):
+        self.exportTimestamp = self.__ExportTimestamp(exportSimulatorStartEndTimestamp)
+        return OpenSink(logPath, startEnd=self.exportTimestamp is None, timestamp={0: 'time:start', 1: 'time:end', None: None}[self.exportTimestamp])
+
+    def __ExportEvents(self, trace, ts):
+        # History entry : (start_ts, end_ts, res, (a,r,ts)
+        if ts is not None:
+            return [(x[3][0], x[2], x[ts]) for x in trace.history]
+        return [(x[3][0], x[2], x[0], x[1]) for x in trace.history]
+
+    def __StartActivity(self, trace, resource, schedule, availableResources, currentWindow):
+        """Start the next activity of a scheduled trace, returns the remaining time of the activity"""
+        self.__vPrint(f"    -> Trace '{trace.case}' about to start on res '{resource}' at simtime {self.SimulatedTimestep}")
+
+        # Assign the next activity a resource and let it run
+        trace.StartNextActivity(self.P_SimulationMode, self.SimulatedTimestep, resource)
+        self.__Notify(Callbacks.ACT_STARTED, (trace, currentWindow))
+
+        # Remove trace from current schedule
+        del availableResources[resource]
+        del schedule[trace.case]
+
+        # Expected (predicted) remaining time, the scheduler plans with it
+        remainingTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode)
+        self.busyUntil[self.resourceIndex[resource]] = self.SimulatedTimestep + remainingTime
+        return remainingTime
+
+    def __SimulateTimestep(self, schedule, availableResources, currentWindow, currentWindowUpper):
+        """Visit all active traces to end and start activities, returns the time until the next activity ends"""
+
+        # Speedup by trying to skip unimportant timesteps in the simulation
+        minRemainingTime = currentWindowUpper - self.SimulatedTimestep
+
+        # First stop all activities ending in this timestep
+        for trace in self.activeTraces:
+            if trace.HasRunningActivity():
+                remainingTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode, real=True)
+                if remainingTime <= 0:
+                    if self.__EndActivity(trace, availableResources, currentWindow, currentWindowUpper):
+                        self.activeTraces.remove(trace)
+                elif remainingTime < minRemainingTime:
+                    minRemainingTime = remainingTime
+
+        # As the previous step released new resources, now start new activities that might need them (double assigned resources)
+        for trace in self.activeTraces:
+            if trace.IsWaiting():
+                # It the trace on the schedule?
+                traceSched = schedule.get(trace.case)
+
+                if traceSched is not None and traceSched['StartTime'] <= self.SimulatedTimestep:
+                    if traceSched['Resource'] in availableResources:
+                        remainingTime = self.__StartActivity(trace, traceSched['Resource'], schedule, availableResources, currentWindow)
+
+                        # Again try to determine whether we can skip unimportant timesteps for the simulation
+                        if remainingTime < minRemainingTime:
+                            minRemainingTime = remainingTime
+
+                        # All resources busy, try again next simulation step
+                        if len(availableResources) == 0:
+                            break
+        return minRemainingTime
+
+    def __SimulateTimestepEventDriven(self, schedule, availableResources, currentWindow, currentWindowUpper):
+        """Same semantics as '__SimulateTimestep', but only touches traces whose activity ends or which are ready to start.
+        Removing a completed trace from the active list while iterating it makes the loop skip the following trace, this is reproduced such that the resulting logs are identical"""
+        eq = self.eventQueue
+        minRemainingTime = currentWindowUpper - self.SimulatedTimestep
+        skipped = set()
+
+        # First stop all activities ending in this timestep
+        for trace in eq.PopDueCompletions(self.SimulatedTimestep):
+            remainingTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode, real=True)
+            if trace.case in skipped or remainingTime > 0:
+                eq.PushCompletion(trace)
+                continue
+
+            eq.dirty.add(trace.currentAct[1])
+            if self.__EndActivity(trace, availableResources, currentWindow, currentWindowUpper):
+                successor = eq.Deactivate(trace)
+                if successor is not None:
+                    skipped.add(successor)
+            elif trace.case in schedule:
+                eq.Enqueue(trace.case, schedule)
+
+        remainingTime = eq.MinRemainingTime(lambda x: x.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode, real=True), skipped)
+        if remainingTime is not None and remainingTime < minRemainingTime:
+            minRemainingTime = remainingTime
+
+        # As the previous step released new resources, now start new activities that might need them
+        for trace, resource in eq.PopReadyTraces(self.SimulatedTimestep, availableResources, schedule):
+            remainingTime = self.__StartActivity(trace, resource, schedule, availableResources, currentWindow)
+            eq.PushCompletion(trace)
+
+            if remainingTime < minRemainingTime:
+                minRemainingTime = remainingTime
+        return minRemainingTime
+
     def __Call(self, callback, parameters):
         """ Call any registered callback with the parameters provided and measure exec-time in case verbose is on"""
         
@@ -104,10 +332,20 @@ class Simulator:
             self.__vPrint(f"    - {str(callback)} took: {time.time() - fTimeStart}s")
         return ret
     
+    def __Notify(self, callback, parameters):
+        """ Call a registered notification callback, these happen for every activity => No time measurement"""
+        cb = self.callbacks.get(callback)
+        if cb is not None:
+            cb(*parameters)
+    
     def __RunScheduler(self, currentSchedule, currentWindow, currentWindowDuration):
         state = self.__GetSimulatorState(currentWindow)
         resultSchedule = {}
         
+        # Resources are planned for the whole horizon
+        if self.P_PlanningHorizon > 1:
+            currentWindowDuration = state['PlanningHorizonDuration']
+        
         # Calculate fairness ratio
         fRatio = self.__Call(Callbacks.CALC_Fairness, [state])
         
@@ -116,11 +354,9 @@ class Simulator:
         
         # Add resources which will become free during this window to be scheduled
         schedulingReadyResources = {r: currentWindowDuration for r in self.R}
-        for trace in self.activeTraces:
-            if trace.HasRunningActivity():
-                remTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode) 
-                if remTime < currentWindowDuration:
-                    schedulingReadyResources[trace.currentAct[1]] = currentWindowDuration - remTime
+        remTime = self.busyUntil - self.SimulatedTimestep
+        for i in np.nonzero(np.isfinite(remTime) & (remTime < currentWindowDuration))[0].tolist():
+            schedulingReadyResources[self.R[i]] = currentWindowDuration - remTime[i].item()
         
         # Call to get the new schedule (most likely a MIP scheduling)
         if self.P_SchedulingBehaviour == SchedulingBehaviour.KEEP_ASSIGNMENTS:
@@ -148,7 +384,10 @@ class Simulator:
             for trace in self.activeTraces:
                 if trace.case in cidList and trace.PRED_UpdateNextActivityIfWrong():
                     del resultSchedule[trace.case]
-
+        
+        self.planWindow  = currentWindow
+        self.planMissing = set([x.case for x in self.activeTraces if x.IsWaiting() and x.case not in resultSchedule])
+        self.plansSolved += 1
         return resultSchedule
     
     def __HandleEventStreamUpdate(type):
@@ -183,9 +422,18 @@ class Simulator:
         self.traces = ExtractTraces(self.P_Log, self.TimestampAttribute, self.LifecycleAttribute, self.callbacks.get(Callbacks.PREDICT_NEXT_ACT), self.callbacks.get(Callbacks.PREDICT_ACT_DUR))
         self.traceCount = len(self.traces)
         
+        # Index of traces by arrival, such that each window only needs to look at the traces arriving in it
+        self.arrivals = sorted(self.traces, key=lambda x: x.GetNextEventTime())
+        self.arrivalCursor = 0
+        self.missedArrivals = []
+        
         # Extract information about activities and resources
         self.P_AtoR, self.P_RtoA, self.A, self.R = ExtractActivityResourceMapping(self.traces)
         
+        # Timeline of the resources, updated whenever activities start and end
+        self.resourceIndex = {r: i for i, r in enumerate(self.R)}
+        self.busyUntil     = np.full(len(self.R), -np.inf, dtype=np.float64)
+        
         # Get resources that only perform activities that no other resource can perform
         self.LonelyResources = self.__GetLonelyResources()
         
@@ -214,7 +462,7 @@ class Simulator:
         self.__vPrint(f"    Traces: {self.traceCount}")
                 
         # Create a list of initially active traces
-        self.activeTraces = self.__GetNewlyBeginningTraces(currentWindowLower, currentWindowUpper)
+        self.__ActivateTraces(self.__GetNewlyBeginningTraces(currentWindowLower, currentWindowUpper), 0)
         
         # Initially all resources are available for the full window time 
         availableResources = {r: currentWindowUpper - currentWindowLower for r in self.R}
@@ -228,6 +476,7 @@ class Simulator:
             # If a new window has begun, run the planning again
             if currentWindowUpper < self.SimulatedTimestep or currentWindow == -1:
                 currentWindow += 1
+                self.__SyncActiveTraces()
                 
                 if currentWindow < len(self.P_Windows):
                     currentWindowLower = self.P_Windows[currentWindow][0]
@@ -245,70 +494,43 @@ class Simulator:
                     print(f'\rProgress: {len(self.completedTraces) / self.traceCount * 100:3.2f}% complete - Traces (Active / Finished / Total): {len(self.activeTraces):{digits}d} / {len(self.completedTraces):{digits}d} / {self.traceCount:{digits}d}', end = '\r')
                             
                 # Start new traces that arrive in this window
-                self.activeTraces = self.activeTraces + self.__GetNewlyBeginningTraces(currentWindowLower, currentWindowUpper)
+                self.__ActivateTraces(self.__GetNewlyBeginningTraces(currentWindowLower, currentWindowUpper), currentWindow)
                 
-                # Call the scheduler
-                schedule = self.__RunScheduler(schedule, currentWindow, currentWindowUpper - currentWindowLower)
+                # Nothing to schedule, jump to the next window in which a trace arrives or ends
+                if self.P_FastForward and not any([x.IsWaiting() for x in self.activeTraces]):
+                    simulatedTimestep = self.SimulatedTimestep
+                    currentWindow = self.__FastForward(currentWindow)
+                    if self.SimulatedTimestep != simulatedTimestep:
+                        currentWindowLower = self.P_Windows[currentWindow][0]
+                        currentWindowUpper = self.P_Windows[currentWindow][1]
+                        continue
+                # Call the scheduler, unless the plan of a previous window still covers this one
+                elif self.__NeedsPlanning(schedule, currentWindow):
+                    schedule = self.__RunScheduler(schedule, currentWindow, currentWindowUpper - currentWindowLower)
+                    if self.P_Engine == SimulationEngines.EVENT_DRIVEN:
+                        self.eventQueue.SetSchedule(schedule)
                 
                             
             # Do the simulation that has to be done at each timestep (second???)
             # Apply pre-calculated schedule
             # Begin new / end old traces
-            
-            # Speedup by trying to skip unimportant timesteps in the simulation
-            minRemainingTime = currentWindowUpper - self.SimulatedTimestep
-            
-            # First stop all activities ending in this timestep
-            for trace in self.activeTraces:
-                if trace.HasRunningActivity():
-                    remainingTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode, real=True)
-                    if remainingTime <= 0:
-                        trace.EndCurrentActivity(self.SimulatedTimestep, self.P_SimulationMode)
-                            
-                        # Return the now free resource to the resource pool (Resource actually used by newest event in history of trace)
-                        availableResources[trace.history[-1][2]] = currentWindowUpper - self.SimulatedTimestep
-                        self.__vPrint(f"    -> Trace '{trace.case}' has ended freeing res '{trace.history[-1][2]}' at simtime {self.SimulatedTimestep}")
-                            
-                        if trace.HasEnded():
-                            self.activeTraces.remove(trace)
-                            self.completedTraces.append(trace)
-                    elif remainingTime < minRemainingTime:
-                        minRemainingTime = remainingTime
-                                                    
-            # As the previous step released new resources, now start new activities that might need them (double assigned resources)
-            for trace in self.activeTraces:
-                if trace.IsWaiting():
-                    # It the trace on the schedule?
-                    traceSched = schedule.get(trace.case)
-                    
-                    if traceSched is not None and traceSched['StartTime'] <= self.SimulatedTimestep:
-                        if traceSched['Resource'] in availableResources:
-                            self.__vPrint(f"    -> Trace '{trace.case}' about to start on res '{traceSched['Resource']}' at simtime {self.SimulatedTimestep}")
-                            
-                            # Assign the next activity a resource and let it run
-                            trace.StartNextActivity(self.P_SimulationMode, self.SimulatedTimestep, traceSched['Resource'])
-                                                        
-                            # Remove trace from current schedule
-                            del availableResources[traceSched['Resource']]
-                            del schedule[trace.case]
-                            
-                            # Again try to determine whether we can skip unimportant timesteps for the simulation
-                            remainingTime = trace.GetRemainingActivityTime(self.TimestampMode, self.SimulatedTimestep, self.P_SimulationMode)
-                            if remainingTime < minRemainingTime:
-                                minRemainingTime = remainingTime
-                                
-                            # All resources busy, try again next simulation step
-                            if len(availableResources) == 0:
-                                break
+            if self.P_Engine == SimulationEngines.EVENT_DRIVEN:
+                minRemainingTime = self.__SimulateTimestepEventDriven(schedule, availableResources, currentWindow, currentWindowUpper)
+            else:
+                minRemainingTime = self.__SimulateTimestep(schedule, availableResources, currentWindow, currentWindowUpper)
 
             if minRemainingTime > 0:
                 self.__vPrint(f"Timestep: {self.SimulatedTimestep} - Skipping: {minRemainingTime}")
                 self.SimulatedTimestep += minRemainingTime
             else:
                 self.SimulatedTimestep += 1
-                            
+
+        self.__SyncActiveTraces()
         print(f"\n\nTotal time for simulation {time.time() - simStart :.1f}s") 
         print(f"    -> Windows simulated {currentWindow + 1} (given: {self.P_WindowCount} / additional: {(currentWindow + 1) - self.P_WindowCount})")
+        print(f"    -> Windows jumped over without waiting traces {self.idleWindows}")
+        if self.P_PlanningHorizon > 1:
+            print(f"    -> Plans made {self.plansSolved} (horizon: {self.P_PlanningHorizon} windows / replan threshold: {self.P_ReplanThreshold})")
     
     def HandleSimulationAbort(self):
         """ As the 'ExportSimulationLog' saves the Historic data of a trace: Add abort events to show how far the process got"""
@@ -317,11 +539,12 @@ class Simulator:
         print(f" ######### SIMULATION ABORTED ######### ")
         print(f" ###################################### ")
         
+        self.__SyncActiveTraces()
         stats = {
             'RunningTraces': 0,
             'WaitingTraces': 0,
             'FinishedTraces': len(self.completedTraces),
-            'NotStartedTraces':  len(self.traces)
+            'NotStartedTraces':  len(self.__GetNotStartedTraces())
         }
         
         for trace in self.activeTraces:
@@ -333,23 +556,38 @@ class Simulator:
                 stats['WaitingTraces'] += 1
                 trace.history.append((self.SimulatedTimestep, self.SimulatedTimestep, 'SIMULATOR', ('ABORTED','SIMULATOR',self.SimulatedTimestep)))
             
-            self.completedTraces.append(trace)
+            self.__CompleteTrace(trace)
         
-        for trace in self.traces:
+        for trace in self.__GetNotStartedTraces():
             trace.history.append((self.SimulatedTimestep, self.SimulatedTimestep, 'SIMULATOR', ('ABORTED_BEFORE_START','SIMULATOR',self.SimulatedTimestep)))
-            self.completedTraces.append(trace)
+            self.__CompleteTrace(trace)
         
         print(stats)
         
+    def StreamSimulationLog(self, logPath, exportSimulatorStartEndTimestamp=False, releaseHistory=True):
+        """Write each trace to the log (XES, CSV, Parquet or Arrow IPC, see 'OpenSink') as soon as it is completed instead of exporting all of them at the end, the log is finished by 'ExportSimulationLog'.
+        With 'releaseHistory' the history of a written trace is freed, only use it if nothing looks at the history of completed traces (e.g. fairness/congestion full scans)"""
+        self.exportSink = self.__OpenSink(logPath, exportSimulatorStartEndTimestamp)
+        self.releaseHistory = releaseHistory
+
     def ExportSimulationLog(self, logPath, exportSimulatorStartEndTimestamp=False):
+        # Completed traces have already been written
+        if self.exportSink is not None:
+            self.exportSink.Close()
+            return
+
+        # Columnar formats (Parquet, Arrow IPC) are written without going through pm4py
+        if IsColumnar(logPath):
+            sink = self.__OpenSink(logPath, exportSimulatorStartEndTimestamp)
+            for trace in self.completedTraces:
+                sink.Write(trace.case, self.__ExportEvents(trace, None))
+            sink.Close()
+            return
+
         log = []
         
         # Determine which timestamps to use
-        ts = 1 # By default TimestampModes.END
-        if self.TimestampMode == TimestampModes.BOTH or exportSimulatorStartEndTimestamp:
-            ts = None
-        elif self.TimestampMode == TimestampModes.START:
-            ts = 0
+        ts = self.__ExportTimestamp(exportSimulatorStartEndTimestamp)
             
         colCase = []
         colAct  = []
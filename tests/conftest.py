@@ -0,0 +1,116 @@
+import csv
+import math
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+# The modules are imported as in main.py, relative to the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.congestion as Congestion
+import utils.fairness as Fairness
+import utils.frames as frames
+import utils.logReader as logReader
+import utils.optimization as Optimization
+from simulation.objects.enums import Callbacks as SIM_Callbacks
+from simulation.objects.enums import OptimizationModes, SchedulingBehaviour
+from simulation.objects.enums import SimulationModes as SIM_Modes
+from simulation.objects.enums import SimulationEngines as SIM_Engines
+from simulation.simulator import Simulator
+from utils.activityDuration import EventDurationsByMinPossibleTime
+
+
+# Activities with the resources able to perform them and the variants of the synthetic logs, several resources share activities such that cases queue
+ACTIVITIES = {'Start': ['Sys'], 'A': ['R1', 'R2', 'R3'], 'B': ['R2', 'R4'], 'C': ['R5', 'R6', 'R7'], 'D': ['R8'], 'E': ['R6', 'R8'], 'End': ['Sys', 'R9']}
+VARIANTS   = [['Start', 'A', 'B', 'End'], ['Start', 'C', 'D', 'End'], ['Start', 'A', 'C', 'End'], ['Start', 'B', 'C', 'A', 'End'], ['Start', 'E', 'E', 'C', 'End']]
+
+
+def WriteSyntheticLog(path, cases=60, seed=0, days=3):
+    """CSV log with the pm4py column names, cases arriving over 'days' with activities of 10 minutes to 2 hours"""
+    rng = random.Random(seed)
+    rows = []
+    for case in range(cases):
+        t = 1570000000 + rng.randint(0, days * 24) * 3600
+        for act in rng.choice(VARIANTS):
+            t += rng.randint(1, 12) * 600
+            rows.append((str(case), act, rng.choice(ACTIVITIES[act]), datetime.fromtimestamp(t, timezone.utc).isoformat()))
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['case:concept:name', 'concept:name', 'org:resource', 'time:timestamp'])
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def syntheticLog(tmp_path):
+    return WriteSyntheticLog(str(tmp_path / 'log.csv'))
+
+
+def Simulate(logPath, outPath=None, engine=SIM_Engines.TIMESTEP_LOOP, fair='W', congestion=None, fullScan=False, backlogN=50, planningHorizon=1, windowCallback=None, fastForward=True):
+    """Same setup as 'main.Run' in known future mode with the flow solver, returns the simulator after the run.
+    'windowCallback(simulatorState, fRatio, cRatio, fairness, tracker)' is called before each scheduling call with the incremental
+    accumulators (None if full scans are used)"""
+    log = logReader.ReadEventColumns(logPath)
+    windows = frames.bucket_window_dict_by_width(log, frames.get_width_from_number(log, 100 * math.ceil(math.sqrt(len(log)))))
+    eventsPerWindowDict, _ = frames.bucket_id_list_dict(log, windows)
+
+    optMode = OptimizationModes.BOTH if fair is not None and congestion is not None else (OptimizationModes.FAIRNESS if fair is not None else OptimizationModes.CONGESTION)
+    sim = Simulator(log, eventsPerWindowDict, windows, simulationMode=SIM_Modes.KNOWN_FUTURE, optimizationMode=optMode,
+                    schedulingBehaviour=SchedulingBehaviour.CLEAR_ASSIGNMENTS_EACH_WINDOW, engine=engine, planningHorizon=planningHorizon,
+                    fastForward=fastForward)
+    state = {'Fairness': None, 'Congestion': None}
+
+    def FairnessRatio(simulatorState):
+        if state['Fairness'] is not None:
+            return state['Fairness'].Fair_WORK(simulatorState) if fair == 'W' else state['Fairness'].Fair_TIME(simulatorState)
+        if fair == 'W':
+            return Fairness.FairnessBacklogFair_WORK(simulatorState, BACKLOG_N=backlogN)
+        return Fairness.FairnessBacklogFair_TIME(simulatorState, BACKLOG_N=backlogN)
+
+    def CongestionRatio(simulatorState):
+        if state['Congestion'] is not None:
+            return state['Congestion'].GetProgressByWaitingNumber(simulatorState) if congestion == 'N' else state['Congestion'].GetProgressByWaitingTime(simulatorState)
+        if congestion == 'N':
+            return Congestion.GetProgressByWaitingNumberInFrontOfActivity(simulatorState, backlogN)
+        return Congestion.GetProgressByWaitingTimeInFrontOfActivity(simulatorState, backlogN)
+
+    def Scheduling(simulatorState, availableResources, fRatio, cRatio):
+        if windowCallback is not None:
+            windowCallback(simulatorState, fRatio, cRatio, state['Fairness'], state['Congestion'])
+        return Optimization.OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio)
+
+    def Ended(trace, currentWindow):
+        if state['Fairness'] is not None:
+            state['Fairness'].ActivityEnded(trace, currentWindow)
+        if state['Congestion'] is not None:
+            state['Congestion'].ActivityEnded(trace, currentWindow)
+
+    sim.Register(SIM_Callbacks.WND_START_SCHEDULING, Scheduling)
+    sim.Register(SIM_Callbacks.CALC_Fairness, FairnessRatio)
+    sim.Register(SIM_Callbacks.CALC_Congestion, CongestionRatio)
+    sim.Register(SIM_Callbacks.CALC_EventDurations, EventDurationsByMinPossibleTime)
+    sim.Register(SIM_Callbacks.CASE_ARRIVED, lambda trace, window: state['Congestion'] is not None and state['Congestion'].CaseArrived(trace, window))
+    sim.Register(SIM_Callbacks.ACT_STARTED, lambda trace, window: state['Congestion'] is not None and state['Congestion'].ActivityStarted(trace, window))
+    sim.Register(SIM_Callbacks.ACT_ENDED, Ended)
+    sim.Initialize()
+
+    if fair is not None and not fullScan:
+        state['Fairness'] = Fairness.FairnessBacklogAccumulator(windows, backlogN)
+    if congestion is not None and not fullScan:
+        state['Congestion'] = Congestion.SegmentCongestionTracker(sim.A, windows, SIM_Modes.KNOWN_FUTURE, backlogN)
+
+    if outPath is not None:
+        sim.StreamSimulationLog(outPath, releaseHistory=False)
+    sim.Run()
+    if outPath is not None:
+        sim.ExportSimulationLog(outPath)
+    return sim
+
+
+def SimulatedHistory(sim):
+    """{case: [(activity, resource, start, end) ...]} of the completed traces"""
+    return {trace.case: [(h[3][0], h[2], h[0], h[1]) for h in trace.history] for trace in sim.completedTraces}
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pytest
+
+import utils.activityDuration as activityDuration
+from simulation.objects.traceExtractor import ExtractTraces, ExtractActivityResourceMapping
+from utils.logReader import EventColumns
+
+
+def RandomColumns(rng, cases, fractional):
+    """Events with many ties: few resources and activities, timestamps from a small range, some events repeated within a trace"""
+    cid, act, res, ts = [], [], [], []
+    for case in range(cases):
+        t = rng.randint(0, 600)
+        for _ in range(rng.randint(1, 6)):
+            if len(act) > 0 and cid[-1] == case and rng.random() < 0.15:
+                event = (act[-1], res[-1], ts[-1]) # Identical event
+            else:
+                t += rng.choice([0, 1, 3, 10, 60, 300]) + (rng.random() if fractional else 0)
+                event = (rng.choice('ABCD'), rng.choice(['R1', 'R2', 'R3']), t)
+            cid.append(case)
+            act.append(event[0])
+            res.append(event[1])
+            ts.append(float(event[2]))
+    return EventColumns(np.array(cid, dtype=np.int64), act, res, np.array(ts), [None] * len(ts), [str(x) for x in range(cases)])
+
+
+def Durations(columns, vectorized, monkeypatch):
+    traces = ExtractTraces(columns, 'ts', 'lc', None, None)
+    _, _, _, R = ExtractActivityResourceMapping(traces)
+    with monkeypatch.context() as m:
+        if not vectorized:
+            m.setattr(activityDuration, 'CoversStore', lambda traces, store: False)
+        activityDuration.EventDurationsByMinPossibleTime(R, traces)
+    return [list(trace.durations) for trace in traces]
+
+
+@pytest.mark.parametrize('fractional', [False, True])
+def test_vectorized_durations_equal_loop(monkeypatch, fractional):
+    rng = random.Random(4)
+    for _ in range(100):
+        columns = RandomColumns(rng, rng.randint(1, 25), fractional)
+        assert Durations(columns, True, monkeypatch) == Durations(columns, False, monkeypatch)
+
+
+def test_partially_started_traces_use_the_loop(monkeypatch):
+    columns = RandomColumns(random.Random(5), 10, False)
+    traces = ExtractTraces(columns, 'ts', 'lc', None, None)
+    assert activityDuration.CoversStore(traces, traces[0].store)
+    assert not activityDuration.CoversStore(traces[1:], traces[0].store)
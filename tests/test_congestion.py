@@ -0,0 +1,38 @@
+import pytest
+
+import utils.congestion as Congestion
+from conftest import Simulate, WriteSyntheticLog
+
+
+def test_history_segment_leads_from_previous_to_next_activity():
+    # (start, end, res, (act, res, ts))
+    a = (100, 200, 'R1', ('A', 'R1', 200))
+    b = (250, 400, 'R2', ('B', 'R2', 400))
+    assert Congestion.GetWindowAwareSegmentData(a, b, 0, 500) == (('A', 'B'), 200)
+    assert Congestion.GetWindowAwareSegmentData(a, b, 300, 500) == (('A', 'B'), 100)
+    assert Congestion.GetWindowAwareSegmentData(None, a, 0, 500) == ((None, 'A'), 0)
+
+
+@pytest.mark.parametrize('congestion', ['N', 'T'])
+@pytest.mark.parametrize('backlogN', [3, 50])
+def test_tracker_equals_full_scan(tmp_path, congestion, backlogN):
+    log = WriteSyntheticLog(str(tmp_path / 'log.csv'), cases=50, seed=3, days=2)
+    checked = []
+
+    def Compare(simulatorState, fRatio, cRatio, fairness, tracker):
+        assert tracker is not None
+        if congestion == 'N':
+            reference = Congestion.GetProgressByWaitingNumberInFrontOfActivity(simulatorState, backlogN)
+        else:
+            reference = Congestion.GetProgressByWaitingTimeInFrontOfActivity(simulatorState, backlogN)
+        assert cRatio.keys() == reference.keys()
+        for s in reference:
+            assert cRatio[s] == pytest.approx(reference[s], rel=1e-9, abs=1e-6)
+        checked.append(any([a is not None and a != b and reference[(a, b)] > 1 for a, b in reference]))
+
+    incremental = Simulate(log, fair=None, congestion=congestion, backlogN=backlogN, windowCallback=Compare)
+    # Segments between two different activities have been seen in the history
+    assert len(checked) > 10 and any(checked)
+
+    fullScan = Simulate(log, fair=None, congestion=congestion, backlogN=backlogN, fullScan=True)
+    assert [t.history for t in incremental.completedTraces] == [t.history for t in fullScan.completedTraces]
@@ -0,0 +1,49 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.extractor import EPOCH, TS_FORMAT, ts_to_int, ts_to_int_batch
+
+
+def RandomTimestamps(rng, n):
+    """tz-aware datetimes in several offsets with fractional seconds, including some before 1970"""
+    timestamps = []
+    for _ in range(n):
+        tz = timezone(timedelta(minutes=rng.choice([-600, -330, 0, 60, 120, 345, 780])))
+        seconds = rng.randint(-10**9, 2 * 10**9)
+        timestamps.append(datetime.fromtimestamp(seconds, tz) + timedelta(microseconds=rng.choice([0, 1, 500000, rng.randint(0, 999999)])))
+    return timestamps
+
+
+def test_batch_equals_scalar_for_aware_datetimes():
+    timestamps = RandomTimestamps(random.Random(0), 2000)
+    batch = ts_to_int_batch(timestamps)
+    assert batch.dtype == np.float64
+    assert batch.tolist() == [ts_to_int(x) for x in timestamps]
+
+    # Same values for a pandas column of the timestamps
+    assert ts_to_int_batch(pd.Series(timestamps)).tolist() == batch.tolist()
+
+
+def test_batch_equals_scalar_for_strings():
+    rng = random.Random(1)
+    strings = [datetime.fromtimestamp(rng.randint(0, 2 * 10**9), timezone.utc).strftime(TS_FORMAT) for _ in range(500)]
+    assert ts_to_int_batch(strings).tolist() == [ts_to_int(x) for x in strings]
+
+
+@pytest.mark.parametrize('unit,step', [('s', timedelta(seconds=1)), ('ms', timedelta(milliseconds=1)), ('us', timedelta(microseconds=1))])
+def test_batch_integer_units_are_floored(unit, step):
+    timestamps = RandomTimestamps(random.Random(2), 1000)
+    batch = ts_to_int_batch(timestamps, unit)
+    assert batch.dtype == np.int64
+    assert batch.tolist() == [(x - EPOCH) // step for x in timestamps]
+
+
+def test_batch_of_datetime64():
+    timestamps = RandomTimestamps(random.Random(3), 200)
+    values = np.array([x.astimezone(timezone.utc).replace(tzinfo=None) for x in timestamps], dtype='datetime64[us]')
+    assert ts_to_int_batch(values).tolist() == [ts_to_int(x) for x in timestamps]
+    assert ts_to_int_batch([]).tolist() == [] and ts_to_int_batch([], 's').dtype == np.int64
@@ -0,0 +1,29 @@
+import pytest
+
+import utils.fairness as Fairness
+from conftest import Simulate, WriteSyntheticLog
+
+
+@pytest.mark.parametrize('fair', ['W', 'T'])
+@pytest.mark.parametrize('backlogN', [3, 50])
+def test_accumulator_equals_full_scan(tmp_path, fair, backlogN):
+    log = WriteSyntheticLog(str(tmp_path / 'log.csv'), cases=50, seed=2, days=2)
+    checked = []
+
+    def Compare(simulatorState, fRatio, cRatio, fairness, tracker):
+        assert fairness is not None
+        if fair == 'W':
+            reference = Fairness.FairnessBacklogFair_WORK(simulatorState, BACKLOG_N=backlogN)
+        else:
+            reference = Fairness.FairnessBacklogFair_TIME(simulatorState, BACKLOG_N=backlogN)
+        assert fRatio.keys() == reference.keys()
+        for r in reference:
+            assert fRatio[r] == pytest.approx(reference[r], rel=1e-9, abs=1e-9)
+        checked.append(simulatorState['CurrentWindow'])
+
+    incremental = Simulate(log, fair=fair, backlogN=backlogN, windowCallback=Compare)
+    assert len(checked) > 10
+
+    # Same schedules, hence the same simulated log
+    fullScan = Simulate(log, fair=fair, backlogN=backlogN, fullScan=True)
+    assert [t.history for t in incremental.completedTraces] == [t.history for t in fullScan.completedTraces]
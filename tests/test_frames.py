@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+
+import utils.frames as frames
+from utils.logReader import EventColumns
+
+
+def RandomEvents(rng, n, ties=False):
+    """event_dict {id: {'ts'}} of events in random time order, with many events sharing a timestamp if 'ties' is set"""
+    spread = n // 4 if ties else 10**7
+    return {i: {'ts': float(1570000000 + rng.randint(0, spread))} for i in range(n)}
+
+
+def Columns(event_dict):
+    ts = np.array([event_dict[i]['ts'] for i in range(len(event_dict))], dtype=np.float64)
+    return EventColumns(np.zeros(len(ts), dtype=np.int64), ['a'] * len(ts), ['r'] * len(ts), ts, [None] * len(ts), ['c'])
+
+
+def WidthLoop(event_dict, width):
+    """Event to window mapping of the former 'bucket_id_list_dict_by_width', which walked through the windows"""
+    ids_sorted = frames.sorted_ids_by_timestamp(event_dict)
+    bucket_window_dict = frames.bucket_window_dict_by_width(event_dict, width)
+    bucket_id_list = {b: [] for b in bucket_window_dict.keys()}
+    id_bucket_mapping = {ev_id: 0 for ev_id in event_dict.keys()}
+
+    curr_bucket = 0
+    max_bucket = max(bucket_id_list.keys())
+    curr_window = bucket_window_dict[curr_bucket]
+    for ev_id in ids_sorted:
+        while event_dict[ev_id]['ts'] >= curr_window[1] and curr_bucket < max_bucket:
+            curr_bucket += 1
+            curr_window = bucket_window_dict[curr_bucket]
+        bucket_id_list[curr_bucket].append(ev_id)
+        id_bucket_mapping[ev_id] = curr_bucket
+    return bucket_id_list, id_bucket_mapping
+
+
+@pytest.mark.parametrize('ties', [False, True])
+def test_width_mapping_equals_window_loop(ties):
+    rng = random.Random(0)
+    for _ in range(20):
+        event_dict = RandomEvents(rng, rng.randint(20, 400), ties)
+        width = frames.get_width_from_number(event_dict, rng.randint(2, 30))
+
+        expected = WidthLoop(event_dict, width)
+        assert frames.bucket_id_list_dict_by_width(event_dict, width) == expected
+
+        # Event columns map their rows like the event ids of the same dict
+        columns = Columns(event_dict)
+        windows = frames.bucket_window_dict_by_width(columns, width)
+        assert windows == frames.bucket_window_dict_by_width(event_dict, width)
+        assert frames.bucket_id_list_dict(columns, windows) == expected
+
+
+def test_count_windows_hold_equal_events():
+    rng = random.Random(1)
+    for number in [1, 3, 10, 25]:
+        event_dict = RandomEvents(rng, number * rng.randint(2, 20))
+        windows = frames.bucket_window_dict_by_count(event_dict, number)
+        buckets, _ = frames.bucket_id_list_dict(event_dict, windows)
+
+        assert len(windows) == number
+        assert len(set([len(x) for x in buckets.values()])) == 1
+
+        # Any number of events: the counts differ by at most one
+        event_dict = RandomEvents(rng, rng.randint(number + 1, 500))
+        buckets, _ = frames.bucket_id_list_dict(event_dict, frames.bucket_window_dict_by_count(event_dict, number))
+        counts = [len(x) for x in buckets.values()]
+        assert max(counts) - min(counts) <= 1
+
+
+def test_count_borders_collapse_on_tied_timestamps():
+    rng = random.Random(2)
+    for _ in range(20):
+        event_dict = RandomEvents(rng, rng.randint(20, 300), ties=True)
+        number = rng.randint(2, 40)
+        windows = frames.bucket_window_dict_by_count(event_dict, number)
+        _, mapping = frames.bucket_id_list_dict(event_dict, windows)
+
+        # Borders are distinct timestamps, events of the same timestamp share a window
+        assert len(windows) <= number
+        assert all([windows[b][0] < windows[b][1] for b in windows])
+        assert all([windows[b][1] == windows[b + 1][0] for b in range(len(windows) - 1)])
+        window = {}
+        for ev_id, b in mapping.items():
+            assert window.setdefault(event_dict[ev_id]['ts'], b) == b
+
+    # All events at the same time: one window of width 1
+    assert frames.bucket_window_dict_by_count({i: {'ts': 5.0} for i in range(10)}, 4) == {0: (5.0, 6.0)}
+
+
+def test_load_splits_windows_above_max_events():
+    rng = random.Random(3)
+    for _ in range(20):
+        event_dict = RandomEvents(rng, rng.randint(50, 500))
+        width = frames.get_width_from_number(event_dict, rng.randint(2, 10))
+        maxEvents = rng.randint(5, 40)
+
+        byWidth = frames.bucket_window_dict_by_width(event_dict, width)
+        byLoad  = frames.bucket_window_dict_by_load(event_dict, width, maxEvents)
+        widthBuckets, _ = frames.bucket_id_list_dict(event_dict, byWidth)
+        loadBuckets, _  = frames.bucket_id_list_dict(event_dict, byLoad)
+
+        # Windows within the cap are kept, the others are split into windows within the cap (distinct timestamps)
+        kept  = [byWidth[b] for b in byWidth if len(widthBuckets[b]) <= maxEvents]
+        split = [byWidth[b] for b in range(len(byWidth) - 1) if len(widthBuckets[b]) > maxEvents]
+        assert all([x in byLoad.values() for x in kept])
+        # (the last window also holds the events after its right border)
+        assert all([len(loadBuckets[b]) <= maxEvents for b in range(len(byLoad) - 1)])
+        for left, right in split:
+            parts = [b for b in byLoad if left <= byLoad[b][0] and byLoad[b][1] <= right]
+            assert len(parts) > 1 and byLoad[parts[0]][0] == left and byLoad[parts[-1]][1] == right
+
+        # Same start, borders ascending without gaps (splitting the last window may cover the events after its right border)
+        assert byLoad[0][0] == byWidth[0][0] and byLoad[len(byLoad) - 1][1] >= byWidth[len(byWidth) - 1][1]
+        assert all([byLoad[b][1] == byLoad[b + 1][0] for b in range(len(byLoad) - 1)])
+
+
+def test_first_rows_match_the_buckets():
+    rng = random.Random(4)
+    for ties in [False, True]:
+        event_dict = RandomEvents(rng, 300, ties)
+        windows = frames.bucket_window_dict_by_count(event_dict, 12)
+        buckets, _ = frames.bucket_id_list_dict(event_dict, windows)
+
+        ts, _ = frames.event_timestamps(event_dict)
+        first = frames.bucket_first_rows(np.sort(ts), windows)
+        assert [first[b + 1] - first[b] for b in range(len(windows))] == [len(buckets[b]) for b in range(len(windows))]
+        assert first[-1] == len(event_dict)
@@ -0,0 +1,43 @@
+import numpy as np
+
+import utils.frames as frames
+import utils.logReader as logReader
+from utils.logCache import LogCache
+
+
+def AssertSameColumns(a, b):
+    assert a.cid.tolist() == b.cid.tolist()
+    assert a.act == b.act and a.res == b.res and a.lc == b.lc
+    assert a.ts.tolist() == b.ts.tolist()
+    assert a.caseNames == b.caseNames
+    assert a.Order().tolist() == b.Order().tolist()
+
+
+def test_columns_windows_and_durations_round_trip(syntheticLog, tmp_path):
+    log = logReader.ReadEventColumns(syntheticLog)
+    log.lc[0] = 'start' # Mixed None and names
+    cache = LogCache(str(tmp_path / 'cache'), syntheticLog)
+    assert cache.Columns() is None and cache.Windows('width_100') is None and cache.Durations('minPossibleTime') is None
+
+    windows = frames.bucket_window_dict_by_width(log, frames.get_width_from_number(log, 100))
+    durations = np.random.default_rng(0).integers(0, 10000, len(log)).astype(np.float64)
+    cache.StoreColumns(log)
+    cache.StoreWindows('width_100', windows)
+    cache.StoreDurations('minPossibleTime', durations)
+
+    cached = LogCache(str(tmp_path / 'cache'), syntheticLog)
+    AssertSameColumns(cached.Columns(), log)
+    assert cached.Windows('width_100') == windows
+    assert cached.Durations('minPossibleTime').tolist() == durations.tolist()
+    assert cached.Windows('count_100') is None
+    assert len(cached.hits) == 3 and len(cached.misses) == 1
+
+
+def test_other_content_or_variant_is_a_miss(syntheticLog, tmp_path):
+    cache = LogCache(str(tmp_path / 'cache'), syntheticLog)
+    cache.StoreColumns(logReader.ReadEventColumns(syntheticLog))
+
+    assert LogCache(str(tmp_path / 'cache'), syntheticLog, variant='["x", null]').Columns() is None
+    with open(syntheticLog, 'a') as f:
+        f.write('x,Start,Sys,2019-10-05T13:58:51+00:00\n')
+    assert LogCache(str(tmp_path / 'cache'), syntheticLog).Columns() is None
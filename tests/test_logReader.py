@@ -0,0 +1,88 @@
+import gzip
+import random
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.extractor as extractor
+import utils.logReader as logReader
+
+
+def test_csv_missing_case_id_raises(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    with open(path, 'w') as f:
+        f.write('CaseID,Activity,User,When\n'
+                '1,A,R1,2020-01-01T10:00:00\n'
+                ',B,R2,2020-01-01T10:05:00\n'
+                '1,C,R1,2020-01-01T10:10:00\n')
+    with pytest.raises(ValueError, match='without a case id'):
+        logReader.ReadEventColumns(path, {'case': 'CaseID', 'act': 'Activity', 'res': 'User', 'ts': 'When'})
+
+
+def test_csv_timestamp_format_with_spaces(tmp_path):
+    path = str(tmp_path / 'log.csv')
+    with open(path, 'w') as f:
+        f.write('CaseID,Activity,User,When\n'
+                '2,A,R1,01.01.2020 10:00:00\n'
+                '1,B,R2,01.01.2020 10:05:30\n'
+                '2,C,R1,01.01.2020 10:10:00\n')
+    log = logReader.ReadEventColumns(path, {'case': 'CaseID', 'act': 'Activity', 'res': 'User', 'ts': 'When'}, '%d.%m.%Y %H:%M:%S')
+    assert log.caseNames == ['2', '1']
+    assert log.cid.tolist() == [0, 0, 1]
+    assert log.act == ['A', 'C', 'B']
+    assert np.array_equal(log.ts - log.ts[0], [0, 600, 330])
+
+
+def WriteXES(path, rows):
+    """XES of rows (case, activity, resource, timestamp, lifecycle), the timestamps keep their offset"""
+    traces = {}
+    for row in rows:
+        traces.setdefault(row[0], []).append(row)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8" ?>\n<log xes.version="1849-2016" xmlns="http://www.xes-standard.org/">\n')
+        for case, events in traces.items():
+            f.write(f'<trace><string key="concept:name" value={quoteattr(case)} />\n')
+            for _, act, res, ts, lc in events:
+                f.write(f'<event><string key="concept:name" value={quoteattr(act)} /><string key="org:resource" value={quoteattr(res)} />'
+                        f'<date key="time:timestamp" value="{ts.isoformat()}" /><string key="lifecycle:transition" value="{lc}" /></event>\n')
+            f.write('</trace>\n')
+        f.write('</log>\n')
+
+
+def ReadPm4pyEventDict(path):
+    import pm4py
+    log = pm4py.read_xes(path)
+    if isinstance(log, pd.DataFrame):
+        log = pm4py.convert_to_event_log(log)
+    return extractor.event_dict(log, res_info=True)
+
+
+def RandomRows(rng, cases):
+    rows = []
+    for case in range(cases):
+        t = datetime(2020, 3, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randint(0, 10**6))
+        for _ in range(rng.randint(1, 5)):
+            t += timedelta(seconds=rng.randint(0, 5000), microseconds=rng.choice([0, 250000, rng.randint(0, 999999)]))
+            tz = timezone(timedelta(hours=rng.choice([-5, 0, 2])))
+            rows.append((f'case {case}', rng.choice(['A', 'B & C', '<D>', 'E "quoted"']), rng.choice(['R1', 'R2', 'Jörg']), t.astimezone(tz), rng.choice(['start', 'complete'])))
+    return rows
+
+
+def test_read_xes_equals_pm4py(tmp_path):
+    path = str(tmp_path / 'log.xes')
+    rows = RandomRows(random.Random(6), 30)
+    WriteXES(path, rows)
+    expected = ReadPm4pyEventDict(path)
+    assert [x['ts'] for x in expected.values()] == [extractor.ts_to_int(x[3]) for x in rows]
+
+    log = logReader.ReadXES(path)
+    assert log.EventDict() == expected
+    assert log.caseNames == [f'case {i}' for i in range(30)]
+
+    # Gzipped
+    with open(path, 'rb') as f, gzip.open(f'{path}.gz', 'wb') as g:
+        g.write(f.read())
+    assert logReader.ReadEventColumns(f'{path}.gz').EventDict() == expected
@@ -0,0 +1,129 @@
+import os
+import random
+
+import pytest
+
+import utils.logReader as logReader
+from conftest import Simulate
+from utils.logWriter import OpenSink
+
+
+def RandomTraces(rng, cases, startEnd):
+    """[(case, [(act, res, ts) or (act, res, start, end) ...]) ...] with microsecond timestamps"""
+    traces = []
+    for case in range(cases):
+        t = (1570000000 + rng.randint(0, 10**6)) * 10**6
+        events = []
+        for _ in range(rng.randint(1, 6)):
+            start = t + rng.randint(0, 10**9)
+            t = start + rng.randint(0, 10**10)
+            event = (rng.choice(['A', 'B & C', '<D>']), rng.choice(['R1', 'R"2"', 'Jörg']))
+            events.append(event + ((start / 1e6, t / 1e6) if startEnd else (t / 1e6,)))
+        traces.append((f'case {case}', events))
+    return traces
+
+
+def WriteTraces(path, traces, startEnd):
+    sink = OpenSink(path, startEnd)
+    for case, events in traces:
+        sink.Write(case, events)
+        assert not os.path.exists(path)
+    sink.Close()
+    assert os.path.exists(path) and not os.path.exists(f'{path}.tmp')
+    return sink
+
+
+@pytest.mark.parametrize('name', ['log.xes', 'log.xes.gz', 'log.csv', 'log.csv.gz'])
+@pytest.mark.parametrize('startEnd', [False, True])
+def test_text_sinks_round_trip(tmp_path, name, startEnd):
+    traces = RandomTraces(random.Random(7), 25, startEnd)
+    path = str(tmp_path / name)
+    sink = WriteTraces(path, traces, startEnd)
+    assert sink.traces == 25 and sink.events == sum([len(x) for _, x in traces])
+
+    log = logReader.ReadEventColumns(path)
+    assert log.caseNames == [case for case, _ in traces]
+    assert log.act == [e[0] for _, events in traces for e in events]
+    assert log.res == [e[1] for _, events in traces for e in events]
+    # The end is read as timestamp of a log with start and end
+    assert log.ts.tolist() == [e[-1] for _, events in traces for e in events]
+
+
+def test_streamed_log_equals_export(syntheticLog, tmp_path):
+    streamed = Simulate(syntheticLog, str(tmp_path / 'streamed.xes'))
+    exported = Simulate(syntheticLog)
+    exported.ExportSimulationLog(str(tmp_path / 'exported.xes'))
+
+    a = logReader.ReadXES(str(tmp_path / 'streamed.xes'))
+    b = logReader.ReadXES(str(tmp_path / 'exported.xes'))
+    assert a.EventDict() == b.EventDict() and a.caseNames == b.caseNames
+
+
+@pytest.mark.parametrize('name', ['log.parquet', 'log.feather', 'log.arrow'])
+@pytest.mark.parametrize('timestamp', ['time:end', 'time:start', None])
+@pytest.mark.parametrize('batchSize', [7, 65536])
+def test_columnar_sinks_round_trip(tmp_path, name, timestamp, batchSize):
+    pytest.importorskip('pyarrow')
+    from utils.logWriter import ColumnarSink
+
+    traces = RandomTraces(random.Random(8), 40, True)
+    path = str(tmp_path / name)
+    sink = ColumnarSink(path, timestamp, batchSize)
+    for case, events in traces:
+        sink.Write(case, events)
+    assert not os.path.exists(path)
+    sink.Close()
+    assert not os.path.exists(f'{path}.tmp')
+
+    # Record batches (row groups) written with dictionaries growing in between
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    batches = pq.ParquetFile(path).num_row_groups if name.endswith('.parquet') else pa.ipc.open_file(path).num_record_batches
+    assert (batches > 1) == (batchSize < sink.events)
+
+    # Read as a simulated log (timestamp of the metadata) and as any other table with one row per event
+    position = 2 if timestamp == 'time:start' else 3
+    for log in [logReader.ReadEventColumns(path), logReader.ReadParquet(path, {'ts': timestamp or 'time:end'})]:
+        assert log.caseNames == [case for case, _ in traces]
+        assert log.cid.tolist() == [i for i, (_, events) in enumerate(traces) for _ in events]
+        assert log.act == [e[0] for _, events in traces for e in events]
+        assert log.res == [e[1] for _, events in traces for e in events]
+        assert log.ts.tolist() == [e[position] for _, events in traces for e in events]
+
+
+@pytest.mark.parametrize('name', ['sim.parquet', 'sim.feather', 'sim.csv'])
+def test_simulated_log_in_other_formats(syntheticLog, tmp_path, name):
+    if not name.endswith('.csv'):
+        pytest.importorskip('pyarrow')
+    Simulate(syntheticLog, str(tmp_path / 'sim.xes'))
+    Simulate(syntheticLog, str(tmp_path / name))
+
+    a = logReader.ReadEventColumns(str(tmp_path / 'sim.xes'))
+    b = logReader.ReadEventColumns(str(tmp_path / name))
+    assert a.caseNames == b.caseNames and a.act == b.act and a.res == b.res and a.ts.tolist() == b.ts.tolist()
+
+
+@pytest.mark.parametrize('name', ['sim.arrow', 'sim.csv'])
+def test_visualization_on_event_columns(syntheticLog, tmp_path, name):
+    if name.endswith('.arrow'):
+        pytest.importorskip('pyarrow')
+    pm4py = pytest.importorskip('pm4py')
+    pytest.importorskip('matplotlib')
+    from utils.EL_Helper import GetActivities, GetSegments, GetTransitions, ReadLog
+    from visualization.congestion import GetActiveSegments
+    from visualization.fairness import GetActivityResourceMapping
+
+    Simulate(syntheticLog, str(tmp_path / 'sim.xes'))
+    Simulate(syntheticLog, str(tmp_path / name))
+
+    # Table logs are analysed on the event columns, without building traces of events
+    columns = ReadLog(str(tmp_path / name))
+    traces = pm4py.read_xes(str(tmp_path / 'sim.xes'), return_legacy_log_object=True)
+    assert isinstance(columns, logReader.EventColumns)
+
+    assert GetTransitions(columns) == GetTransitions(traces)
+    assert GetSegments(columns) == GetSegments(traces)
+    assert GetActivities(columns) == GetActivities(traces)
+    assert GetActiveSegments(columns) == GetActiveSegments(traces)
+    for a, b in zip(GetActivityResourceMapping(columns), GetActivityResourceMapping(traces)):
+        assert a.equals(b)
@@ -0,0 +1,343 @@
+import random
+import time
+
+import networkx as nx
+import pytest
+
+import utils.optimization as Optimization
+from simulation.objects.enums import OptimizationModes, SolverBackends
+
+
+def RandomCandidates(rng, cases, resources, density=0.5):
+    candidates = []
+    for case in range(cases):
+        edges = [(r, -rng.randint(1, 100000)) for r in range(resources) if rng.random() < density]
+        candidates.append((f'c{case}', rng.randint(1, 10), edges))
+    return candidates
+
+
+def test_budget_zero_falls_back_to_greedy():
+    rng = random.Random(0)
+    budget = Optimization.SolverBudget(0)
+    for simTime in range(5):
+        candidates = RandomCandidates(rng, 8, 5)
+        resources = list(range(5))
+        solve = lambda engine: Optimization.SolveCandidates(candidates, resources, simTime, 1, False, engine)
+
+        schedule = budget.Solve(candidates, resources, simTime, solve, SolverBackends.NETWORK_FLOW, True)
+        assert schedule == Optimization.ResolveGreedy(candidates, resources, simTime)
+        assert budget.lastFallback
+    assert all([x['Reason'] in ['predicted', 'overrun', 'busy'] for x in budget.fallbacks])
+
+
+def test_budget_decays_known_rates_only():
+    budget = Optimization.SolverBudget(0)
+    budget.rates[SolverBackends.NETWORK_FLOW] = 1.0
+    candidates = [('a', 1, [('r', -5)])]
+    budget.Solve(candidates, ['r'], 0, lambda engine: {}, SolverBackends.NETWORK_FLOW, True)
+    assert budget.rates == {SolverBackends.NETWORK_FLOW: 0.95}
+
+
+def test_budget_overrun_error_is_reported():
+    budget = Optimization.SolverBudget(0.05)
+    candidates = [('a', 1, [('r', -5)])]
+    def FailingSolve(engine):
+        time.sleep(0.3)
+        raise ValueError('infeasible network')
+
+    schedule = budget.Solve(candidates, ['r'], 7, FailingSolve, SolverBackends.NETWORK_FLOW, True)
+    assert budget.lastFallback and schedule == Optimization.ResolveGreedy(candidates, ['r'], 7)
+    budget.running.join()
+
+    record = budget.fallbacks[-1]
+    assert record['Reason'] == 'overrun' and record['Exact'] is None and isinstance(record['Error'], ValueError)
+    assert 'simtime 7 failed' in budget.Summary() and 'infeasible network' in budget.Summary()
+    # Failed solves are not learned from
+    assert budget.rates == {}
+
+
+class WaitingTrace:
+    def __init__(self, case, activity, duration=1):
+        self.case = case
+        self.activity = activity
+        self.duration = duration
+        self.history = []
+
+    def IsWaiting(self):
+        return True
+
+    def GetNextActivity(self, simulationMode):
+        return self.activity
+
+    def GetNextActivityTime(self, simulationMode, timestampMode):
+        return self.duration
+
+
+def FairnessState(rng, cases, resources):
+    activities = ['a', 'b', 'c']
+    AtoR = {a: sorted(rng.sample(resources, rng.randint(2, len(resources)))) for a in activities}
+    return {'ActiveTraces': [WaitingTrace(f'c{i}', rng.choice(activities)) for i in range(cases)], 'AtoR': AtoR,
+            'CurrentTimestep': 0, 'CurrentWindowDuration': 10, 'OptimizationMode': OptimizationModes.FAIRNESS,
+            'SimulationMode': None, 'TimestampMode': None, 'Verbose': False}
+
+
+def test_budget_overrun_leaves_warm_start_untouched(monkeypatch):
+    rng = random.Random(1)
+    resources = [f'r{i}' for i in range(5)]
+    fRatio = {r: rng.random() for r in resources}
+    warmStart = Optimization.IncrementalAssignment()
+
+    # Within the budget the warm start is taken over from the solved copy
+    budget = Optimization.SolverBudget(60)
+    Optimization.OptimizeActiveTraces(FairnessState(rng, 8, resources), resources, fRatio, None, solver=SolverBackends.INCREMENTAL, warmStart=warmStart, budget=budget)
+    assert not budget.lastFallback and len(warmStart.rowIndex) > 0
+    rowIndex, u = dict(warmStart.rowIndex), warmStart.u.copy()
+
+    solveIncremental = Optimization.IncrementalAssignment.Solve
+    def SlowSolve(self, *args):
+        time.sleep(0.3)
+        return solveIncremental(self, *args)
+    monkeypatch.setattr(Optimization.IncrementalAssignment, 'Solve', SlowSolve)
+
+    budget = Optimization.SolverBudget(0.05)
+    Optimization.OptimizeActiveTraces(FairnessState(rng, 12, resources), resources, fRatio, None, solver=SolverBackends.INCREMENTAL, warmStart=warmStart, budget=budget)
+    assert budget.lastFallback and budget.fallbacks[-1]['Reason'] == 'overrun'
+
+    # The abandoned solve finishes on its own copy
+    budget.running.join()
+    assert budget.fallbacks[-1]['Exact'] is not None
+    assert warmStart.rowIndex == rowIndex and (warmStart.u == u).all()
+
+
+def FlowObjective(candidates, resources, simTime=0):
+    network = Optimization.FlowNetwork(candidates, resources, 1, False)
+    return Optimization.ScheduleObjective(Optimization.ResolveNetwork(network, simTime), candidates)
+
+
+def test_assignment_objective_equals_flow():
+    rng = random.Random(2)
+    for _ in range(200):
+        cases, resources = rng.randint(1, 12), rng.randint(1, 8)
+        candidates = RandomCandidates(rng, cases, resources, rng.choice([0.2, 0.5, 1.0]))
+        if rng.random() < 0.5:
+            # Ties in the weights
+            candidates = [(case, d, [(r, w // 25000) for r, w in edges]) for case, d, edges in candidates]
+        # Edges to resources that are busy
+        available = sorted(rng.sample(range(resources), rng.randint(1, resources)))
+
+        assignment = Optimization.ResolveAssignment(candidates, available, 0)
+        assert Optimization.ScheduleObjective(assignment, candidates) == FlowObjective(candidates, available)
+        assert all([x['Resource'] in available for x in assignment.values()])
+        assert len(set([x['Resource'] for x in assignment.values()])) == len(assignment)
+
+
+def test_incremental_assignment_over_consecutive_windows():
+    rng = random.Random(3)
+    for _ in range(20):
+        resources = [f'r{i}' for i in range(rng.randint(2, 8))]
+        weights = {}
+        warmStart = Optimization.IncrementalAssignment()
+        cases = []
+        reused = 0
+        for window in range(15):
+            # Some cases leave, new ones arrive, the ratios of some resources change and resources become busy or free
+            cases = [case for case in cases if rng.random() < 0.7] + [f'w{window}c{i}' for i in range(rng.randint(0, 5))]
+            for case in cases:
+                if case not in weights or rng.random() < 0.2:
+                    weights[case] = {r: -rng.randint(1, 40) * 1000 for r in resources if rng.random() < 0.6}
+            if rng.random() < 0.3:
+                r = rng.choice(resources)
+                for case in cases:
+                    if r in weights[case]:
+                        weights[case][r] = -rng.randint(1, 40) * 1000
+            available = sorted(rng.sample(resources, rng.randint(1, len(resources))))
+            candidates = [(case, 0, list(weights[case].items())) for case in cases]
+            if len(candidates) == 0:
+                continue
+
+            incremental = warmStart.Solve(candidates, available, window)
+            assert incremental is not None
+            reused += warmStart.lastAugmented < len(candidates)
+            assert all([x['Resource'] in available for x in incremental.values()])
+            assert len(set([x['Resource'] for x in incremental.values()])) == len(incremental)
+
+            objective = Optimization.ScheduleObjective(incremental, candidates)
+            assert objective == Optimization.ScheduleObjective(Optimization.ResolveAssignment(candidates, available, window), candidates)
+            assert objective == FlowObjective(candidates, available, window)
+        # The warm start is used, not only a full re-optimization
+        assert reused > 0
+
+
+def FreshObjective(candidates, resources, windowDuration, timeAware):
+    network = Optimization.FlowNetwork(candidates, resources, windowDuration, timeAware)
+    return Optimization.ScheduleObjective(Optimization.ResolveNetwork(network, 0), candidates)
+
+
+def test_schedule_cache_hit_equals_fresh_solve():
+    rng = random.Random(9)
+    cache = Optimization.ScheduleCache(50)
+    # Few distinct states, such that they recur
+    states = []
+    for _ in range(6):
+        resources = list(range(rng.randint(1, 4)))
+        candidates = [(None, 0, [(r, -rng.randint(1, 3) * 1000) for r in resources if rng.random() < 0.7]) for _ in range(rng.randint(1, 5))]
+        states.append((candidates, resources))
+
+    for step in range(200):
+        candidates, resources = rng.choice(states)
+        windowDuration = rng.choice([5, 10, 40])
+        # Other case ids each time, cases with the same signature are interchangeable
+        candidates = [(f's{step}c{i}', duration, edges) for i, (_, duration, edges) in enumerate(rng.sample(candidates, len(candidates)))]
+        solve = lambda: Optimization.ResolveNetwork(Optimization.FlowNetwork(candidates, resources, windowDuration, False), 0)
+        schedule = cache.Solve(candidates, resources, step, solve)
+        assert Optimization.ScheduleObjective(schedule, candidates) == FreshObjective(candidates, resources, windowDuration, False)
+    assert cache.hits > 50
+
+
+def test_schedule_cache_skips_time_aware_networks():
+    # Three cases of duration 5 on two resources: all fit into a window of 100, only two into a window of 10
+    resources = ['r1', 'r2']
+    cache = Optimization.ScheduleCache(10)
+    for windowDuration in [100, 10, 100, 10]:
+        state = {'ActiveTraces': [WaitingTrace(f'c{i}', 'a', duration=5) for i in range(3)], 'AtoR': {'a': resources},
+                 'CurrentTimestep': 0, 'CurrentWindowDuration': windowDuration, 'OptimizationMode': OptimizationModes.FAIRNESS,
+                 'SimulationMode': None, 'TimestampMode': None, 'Verbose': False}
+        schedule = Optimization.OptimizeActiveTraces(state, {r: windowDuration for r in resources}, {'r1': 0.5, 'r2': 0.25}, None, timeAwareButNotOptimal=True, cache=cache)
+        assert len(schedule) == (3 if windowDuration == 100 else 2)
+    assert cache.hits == 0 and len(cache.entries) == 0
+
+
+def MatchingSize(candidates, resources):
+    return len([r for r in Optimization.MaximumMatching(candidates, resources) if r is not None])
+
+
+@pytest.mark.parametrize('networkx', [False, True])
+def test_pruning_keeps_the_maximum_matching(monkeypatch, networkx):
+    if networkx:
+        monkeypatch.setattr(Optimization, 'maximum_bipartite_matching', None)
+    rng = random.Random(5)
+    for _ in range(200):
+        resources = rng.randint(1, 8)
+        candidates = RandomCandidates(rng, rng.randint(1, 12), resources, rng.choice([0.2, 0.5, 1.0]))
+        available = sorted(rng.sample(range(resources), rng.randint(1, resources)))
+        k = rng.randint(1, 3)
+        pruned = Optimization.PruneCandidates(candidates, available, k)
+
+        allEdges = [(case, duration, [e for e in edges if e[0] in available]) for case, duration, edges in candidates]
+        for (case, duration, edges), (_, _, kept) in zip(allEdges, pruned):
+            # Only edges to available resources, at least the k best of them
+            assert all([e in edges for e in kept]) and all([e[0] in available for e in kept])
+            assert all([e in kept for e in sorted(edges, key=lambda x: x[1])[:k]])
+
+        matching = Optimization.MaximumMatching(allEdges, available)
+        assert all([r is None or r in [e[0] for e in edges] for r, (_, _, edges) in zip(matching, allEdges)])
+        assert len(set([r for r in matching if r is not None])) == MatchingSize(allEdges, available)
+        assert MatchingSize(pruned, available) == MatchingSize(allEdges, available)
+        assert FlowObjective(pruned, available)[0] == FlowObjective(candidates, available)[0]
+
+
+@pytest.mark.parametrize('fairnessCoefficient, congestionCoefficient, expected', [
+    (0.5, 0.5, [[('r1', -75000), ('r2', -50000)], [('r2', -75000), ('r3', -50000)]]),
+    (1, 0,     [[('r1', -100000), ('r2', -50000)], [('r2', -50000)]]),
+    (0, 1,     [[('r1', -50000), ('r2', -50000)], [('r2', -100000), ('r3', -100000)]]),
+    (0, 0,     [[], []]),
+])
+def test_combined_cost_weights(fairnessCoefficient, congestionCoefficient, expected):
+    # Normalized fairness: r1 1, r2 0.5, r3 0 / normalized congestion: a 0.5, b 1
+    fRatio = {'r1': 0.5, 'r2': 0.25, 'r3': 0}
+    cRatio = {('x', 'A'): 0.2, (None, 'B'): 0.4}
+    cases  = [('a', 3, ('x', 'A'), ['r1', 'r2']), ('b', 0, (None, 'B'), ['r2', 'r3'])]
+
+    candidates = Optimization.CombinedCostCandidates(cases, fRatio, cRatio, fairnessCoefficient, congestionCoefficient)
+    assert candidates == [('a', 3, expected[0]), ('b', 0, expected[1])]
+
+
+def test_combined_cost_without_ratios():
+    cases = [('a', 1, (None, 'A'), ['r1', 'r2'])]
+    assert Optimization.CombinedCostCandidates(cases, {'r1': 0, 'r2': 0}, {(None, 'A'): 0}, 0.5, 0.5) == [('a', 1, [])]
+    # Only one of the ratios is known, it is normalized by its own maximum
+    assert Optimization.CombinedCostCandidates(cases, {'r1': 0.1, 'r2': 0.2}, {(None, 'A'): 0}, 0.5, 0.5) == [('a', 1, [('r1', -25000), ('r2', -50000)])]
+    assert Optimization.CombinedCostCandidates([], {}, {}, 0.5, 0.5) == []
+
+
+def GroupedCandidates(rng, groups, resourcesPerGroup):
+    """Cases of several activities, each performed by its own group of resources, plus some cases of a busy resource only"""
+    candidates = []
+    for g in range(groups):
+        for case in range(rng.randint(1, 8)):
+            edges = [(f'g{g}r{r}', -rng.randint(1, 100000)) for r in range(resourcesPerGroup) if rng.random() < 0.6]
+            candidates.append((f'g{g}c{case}', 0, edges))
+    candidates.append(('busy', 0, [('busy', -5)]))
+    rng.shuffle(candidates)
+    return candidates, [f'g{g}r{r}' for g in range(groups) for r in range(resourcesPerGroup)]
+
+
+@pytest.mark.parametrize('solver', [SolverBackends.NETWORK_FLOW, SolverBackends.ASSIGNMENT])
+def test_components_objective_equals_whole_network(monkeypatch, solver):
+    rng = random.Random(6)
+    # Every component is solved in the pool
+    monkeypatch.setattr(Optimization, 'COMPONENT_POOL_MIN_CASES', 1)
+    pool = Optimization.CreateComponentPool(2)
+    try:
+        for _ in range(15):
+            candidates, resources = GroupedCandidates(rng, rng.randint(2, 5), rng.randint(1, 4))
+            components = Optimization.SplitComponents(candidates, resources)
+
+            # Disjoint components, cases without an edge to an available resource are dropped
+            compCases = [case for compCandidates, _ in components for case, _, _ in compCandidates]
+            compResources = [r for _, compResources in components for r in compResources]
+            assert len(components) > 1
+            assert sorted(compCases) == sorted([case for case, _, edges in candidates if any([r in resources for r, _ in edges])])
+            assert len(set(compResources)) == len(compResources) and set(compResources) <= set(resources)
+            for compCandidates, compResources in components:
+                assert all([r in compResources for _, _, edges in compCandidates for r, _ in edges if r in resources])
+
+            schedule = Optimization.ResolveComponents(candidates, resources, 0, 1, solver, pool)
+            assert Optimization.ScheduleObjective(schedule, candidates) == FlowObjective(candidates, resources)
+    finally:
+        pool.shutdown()
+
+
+def StringNodeNetwork(candidates, availableResources, windowDuration, timeAware):
+    """Graph of the former network construction: nodes 's', 't', 'd' (time aware only), 'c' + case and the resource names"""
+    G = nx.DiGraph()
+    for case, duration, edges in candidates:
+        G.add_edge('s', 'c' + case, capacity=windowDuration if timeAware else 1)
+        for r, weight in edges:
+            G.add_edge('c' + case, r, weight=weight, capacity=int(duration) + 1)
+    for r in availableResources:
+        G.add_edge(r, 'd' if timeAware else 't', capacity=windowDuration if timeAware else 1)
+    if timeAware:
+        G.add_edge('d', 't', capacity=sum([int(duration) + 1 for _, duration, _ in candidates]))
+    return G
+
+
+@pytest.mark.parametrize('timeAware', [False, True])
+def test_flow_network_equals_string_node_graph(timeAware):
+    rng = random.Random(7)
+    for _ in range(100):
+        resources = rng.randint(1, 8)
+        candidates = [(case, rng.randint(0, 12) if timeAware else 0, [(f'r{r}', w) for r, w in edges])
+                      for case, _, edges in RandomCandidates(rng, rng.randint(1, 12), resources, rng.choice([0.2, 0.5, 1.0]))]
+        available = [f'r{r}' for r in sorted(rng.sample(range(resources), rng.randint(1, resources)))]
+        windowDuration = rng.randint(1, 20)
+
+        network = Optimization.FlowNetwork(candidates, available, windowDuration, timeAware)
+        # CSR and COO describe the same edges, grouped by case
+        assert network.rows.tolist() == [i for i in range(len(candidates)) for _ in range(network.indptr[i + 1] - network.indptr[i])]
+        assert [(network.resources[j], w) for j, w in zip(network.cols.tolist(), network.weights.tolist())] == [e for _, _, edges in candidates for e in edges]
+
+        # Same graph up to the node names
+        old = StringNodeNetwork(candidates, available, windowDuration, timeAware)
+        names = {'s': Optimization.FlowNetwork.SOURCE, 't': Optimization.FlowNetwork.SINK, 'd': Optimization.FlowNetwork.COLLECT}
+        names.update({'c' + case: network.CaseNodes(i) for i, case in enumerate(network.cases)})
+        names.update({r: network.ResourceNodes(j) for j, r in enumerate(network.resources)})
+        G = network.ToNetworkX()
+        assert sorted([(names[u], names[v], sorted(x.items())) for u, v, x in old.edges(data=True)]) == sorted([(u, v, sorted(x.items())) for u, v, x in G.edges(data=True)])
+
+        # Same flow and cost
+        M, oldM = nx.max_flow_min_cost(G, Optimization.FlowNetwork.SOURCE, Optimization.FlowNetwork.SINK), nx.max_flow_min_cost(old, 's', 't')
+        assert sum(M[Optimization.FlowNetwork.SOURCE].values()) == sum(oldM['s'].values())
+        assert nx.cost_of_flow(G, M) == nx.cost_of_flow(old, oldM)
+        if not timeAware:
+            assert FlowObjective(candidates, available) == (sum(oldM['s'].values()), nx.cost_of_flow(old, oldM))
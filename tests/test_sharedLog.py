@@ -0,0 +1,59 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import pytest
+
+import utils.logReader as logReader
+import utils.sharedLog as sharedLog
+from simulation.objects.traceExtractor import ExtractActivityResourceMapping, ExtractTraces
+from utils.activityDuration import EventDurationsByMinPossibleTime
+
+
+def Content(columns, store):
+    """Everything a simulation reads from the published log, as plain lists"""
+    return {
+        'cid': columns.cid.tolist(), 'ts': columns.ts.tolist(), 'order': columns.Order().tolist(), 'caseNames': columns.caseNames,
+        'cases': store.cases, 'offsets': store.offsets.tolist(), 'activities': store.activities, 'act': store.act.tolist(),
+        'resources': store.resources, 'res': store.res.tolist(), 'storeTs': store.ts.tolist(), 'durations': store.durations.tolist(),
+        'events': [store.Event(i) for i in range(len(store))]
+    }
+
+
+def Worker(handle, queue):
+    columns, store = sharedLog.AttachLog(handle)
+    queue.put((Content(columns, store), [x.name for x in sharedLog.attachedBlocks], columns.ts.flags.writeable or store.durations.flags.writeable))
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_worker_reads_the_published_log(syntheticLog, method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f'{method} is not available')
+    log = logReader.ReadEventColumns(syntheticLog)
+    traces = ExtractTraces(log, 'ts', 'lc', None, None)
+    _, _, _, R = ExtractActivityResourceMapping(traces)
+    EventDurationsByMinPossibleTime(R, traces)
+    store = traces[0].store
+
+    blocks = []
+    handle = sharedLog.PublishLog(log, store, blocks)
+    try:
+        context = multiprocessing.get_context(method)
+        queue = context.Queue()
+        process = context.Process(target=Worker, args=(handle, queue))
+        process.start()
+        content, attached, writeable = queue.get(timeout=120)
+        process.join()
+        assert process.exitcode == 0
+
+        # Same columns and store as the parent (with the calculated durations), read-only views on the parent's blocks
+        assert content == Content(log, store)
+        assert sorted(attached) == sorted([x.name for x in blocks])
+        assert not writeable
+    finally:
+        sharedLog.ReleaseBlocks(blocks)
+
+    # Nothing is left to attach to once released, also after the worker ended
+    assert blocks == []
+    for name in attached:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
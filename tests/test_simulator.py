@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import Simulate, SimulatedHistory, WriteSyntheticLog
+from simulation.objects.enums import SimulationEngines as SIM_Engines
+
+
+def test_event_engine_writes_the_log_of_the_loop_engine(syntheticLog, tmp_path):
+    loop  = Simulate(syntheticLog, str(tmp_path / 'loop.xes'), SIM_Engines.TIMESTEP_LOOP)
+    event = Simulate(syntheticLog, str(tmp_path / 'event.xes'), SIM_Engines.EVENT_DRIVEN)
+
+    assert len(loop.completedTraces) == 60
+    assert SimulatedHistory(loop) == SimulatedHistory(event)
+    with open(tmp_path / 'loop.xes', 'rb') as a, open(tmp_path / 'event.xes', 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_event_engine_with_congestion(tmp_path):
+    log = WriteSyntheticLog(str(tmp_path / 'log.csv'), cases=40, seed=1, days=1)
+    loop  = Simulate(log, engine=SIM_Engines.TIMESTEP_LOOP, fair=None, congestion='T')
+    event = Simulate(log, engine=SIM_Engines.EVENT_DRIVEN, fair=None, congestion='T')
+    assert SimulatedHistory(loop) == SimulatedHistory(event)
+
+
+def test_planning_horizon(syntheticLog):
+    durations = []
+    def Horizon(simulatorState, fRatio, cRatio, fairness, tracker):
+        durations.append((simulatorState['CurrentWindow'], simulatorState['PlanningHorizonDuration']))
+
+    sim = Simulate(syntheticLog, planningHorizon=4, windowCallback=Horizon)
+    assert len(sim.completedTraces) == 60 and sim.plansSolved > 0
+
+    # The horizon covers four windows, those beyond the windows of the log have the width of the first one
+    windows = sim.P_Windows
+    width = windows[0][1] - windows[0][0]
+    for window, duration in durations:
+        last = window + 3
+        expected = windows[last][1] if last in windows else windows[len(windows) - 1][1] + (last - len(windows) + 1) * width
+        assert duration == expected - windows[window][0]
+
+    # Horizon reaching beyond the last window
+    window = len(windows) - 2
+    assert sim._Simulator__HorizonDuration(window) == windows[window + 1][1] + 2 * width - windows[window][0]
+
+
+@pytest.mark.parametrize('engine', [SIM_Engines.TIMESTEP_LOOP, SIM_Engines.EVENT_DRIVEN])
+def test_fast_forward_writes_the_log_of_stepping(tmp_path, engine):
+    log = WriteSyntheticLog(str(tmp_path / 'log.csv'), cases=40, seed=2, days=6)
+    windows = []
+    stepped = Simulate(log, str(tmp_path / 'stepped.xes'), engine, congestion='N', fastForward=False,
+                       windowCallback=lambda simulatorState, *args: windows.append(simulatorState['CurrentWindow']))
+    jumped  = Simulate(log, str(tmp_path / 'jumped.xes'), engine, congestion='N')
+
+    # Stepping calls the scheduler in every window, fast forward skips the idle ones
+    assert stepped.idleWindows == 0 and jumped.idleWindows > 0
+    assert windows == list(range(len(windows)))
+    assert SimulatedHistory(stepped) == SimulatedHistory(jumped)
+    with open(tmp_path / 'stepped.xes', 'rb') as a, open(tmp_path / 'jumped.xes', 'rb') as b:
+        assert a.read() == b.read()
@@ -0,0 +1,66 @@
+import os
+import shlex
+import time
+
+import pytest
+
+from utils.sweep import Sweep
+
+
+def Experiment(cmd):
+    """Writes the partial output like the simulator, sleeps for the seconds given by --sleep and finishes the output"""
+    args = shlex.split(cmd)
+    out = args[args.index('-o') + 1]
+    with open(f'{out}.tmp', 'w') as f:
+        f.write('partial')
+    time.sleep(float(args[args.index('--sleep') + 1]))
+    os.replace(f'{out}.tmp', out)
+
+
+def Runs(sweep, tmp_path, sleeps):
+    experiments = [(f"-o {tmp_path / f'out{i}.xes'} --sleep {s}", str(tmp_path / 'log.xes'), str(tmp_path / f'out{i}.xes')) for i, s in enumerate(sleeps)]
+    return sweep.Manifest(experiments)
+
+
+def test_resume_skips_done_and_removes_stale_tmp(tmp_path):
+    sweep = Sweep(str(tmp_path / 'sweep'), 2)
+    runs = Runs(sweep, tmp_path, [0, 0])
+    sweep.Execute(runs, Experiment)
+    assert sweep.results == {'done': 2}
+
+    # A third experiment was running when the sweep got killed
+    with open(tmp_path / 'out2.xes.tmp', 'w') as f:
+        f.write('partial')
+    sweep = Sweep(str(tmp_path / 'sweep'), 2)
+    runs = Runs(sweep, tmp_path, [0, 0, 0])
+    assert sweep.skipped == 2 and len(runs) == 1
+    assert not os.path.exists(tmp_path / 'out2.xes.tmp')
+
+
+def test_timeout_kills_the_experiment(tmp_path):
+    sweep = Sweep(str(tmp_path / 'sweep'), 2, timeout=0.5)
+    sweep.Execute(Runs(sweep, tmp_path, [60, 0]), Experiment)
+    assert sweep.results == {'timeout': 1, 'done': 1}
+    assert not os.path.exists(tmp_path / 'out0.xes.tmp') and not os.path.exists(tmp_path / 'out0.xes')
+
+
+def test_stopped_sweep_kills_running_experiments(tmp_path, monkeypatch):
+    sweep = Sweep(str(tmp_path / 'sweep'), 2)
+    started = []
+    def Failing(pid):
+        started.append(pid)
+        raise KeyboardInterrupt
+    monkeypatch.setattr(Sweep, 'PrivateRSS', staticmethod(Failing))
+
+    with pytest.raises(KeyboardInterrupt):
+        sweep.Execute(Runs(sweep, tmp_path, [60, 60]), Experiment)
+    assert len(started) == 1
+    with pytest.raises(ProcessLookupError):
+        os.kill(started[0], 0)
+    assert not os.path.exists(tmp_path / 'out0.xes.tmp') and not os.path.exists(tmp_path / 'out1.xes.tmp')
+
+
+def test_sweep_run_id_splits_like_argsParse():
+    assert Sweep.RunId('-l a.csv  -F W') == Sweep.RunId(' -l a.csv -F W ')
+    assert Sweep.RunId("--LogTimestampFormat '%d.%m.%Y %H:%M'") == Sweep.RunId('--LogTimestampFormat "%d.%m.%Y %H:%M"')
+    assert Sweep.RunId("--LogTimestampFormat '%d.%m.%Y %H:%M'") != Sweep.RunId('--LogTimestampFormat %d.%m.%Y %H:%M')
@@ -1,8 +1,39 @@
 import math 
+import numpy as np
+import pm4py
 import utils.extractor as extractor
 import utils.frames as frames
+import utils.logReader as logReader
+
+def ReadLog(path):
+    """pm4py log of a XES file. Logs in a table format (CSV, Parquet, Arrow IPC) are returned as 'logReader.EventColumns', the analysis functions
+    below work on the columns directly, such that a memory-mapped Arrow log is not copied into an event dict per event"""
+    if not logReader.IsTable(path):
+        return pm4py.read_xes(path)
+    return logReader.ReadEventColumns(path)
+
+def GetTransitions(log):
+    """(last activity, activity, resource, last timestamp, timestamp) of all events in trace order, timestamps in seconds since epoch.
+    The first event of a trace follows the activity 'None' and its own timestamp"""
+    if not isinstance(log, logReader.EventColumns):
+        return [(trace[i-1]['concept:name'] if i > 0 else 'None', event['concept:name'], event['org:resource'],
+                 extractor.ts_to_int(trace[max(i-1, 0)]['time:timestamp']), extractor.ts_to_int(event['time:timestamp']))
+                for trace in log for i, event in enumerate(trace)]
+
+    n = len(log)
+    first = np.ones(n, dtype=bool)
+    first[1:] = log.cid[1:] != log.cid[:-1]
+    prev = np.arange(n) - 1
+    prev[first] += 1
+    
+    lastAct = np.array(log.act, dtype=object)[prev]
+    lastAct[first] = 'None'
+    return list(zip(lastAct.tolist(), log.act, log.res, log.ts[prev].tolist(), log.ts.tolist()))
 
 def GetSegments(log):
+    if isinstance(log, logReader.EventColumns):
+        return list(dict.fromkeys([(lastAct, act) for lastAct, act, _, _, _ in GetTransitions(log)]))
+    
     segments = []
     
     for trace in log:
@@ -20,6 +51,9 @@ def GetSegments(log):
     return segments
 
 def GetActivities(log):
+    if isinstance(log, logReader.EventColumns):
+        return sorted(['None'] + list(set(log.act)))
+    
     activities = []
     
     for trace in log:
@@ -33,14 +67,14 @@ def GetActivities(log):
 
 
 def GetWindows(log, wndNumberCallback = None):
-    no_events = sum([len(trace) for trace in log])
+    no_events = len(log) if isinstance(log, logReader.EventColumns) else sum([len(trace) for trace in log])
     
     if wndNumberCallback is None:
         windowNumber = 1 * math.ceil(math.sqrt(no_events))
     else:
         windowNumber = wndNumberCallback(no_events)
     
-    # Convert XES-Events into dict {'act', 'ts', 'res', 'single', 'cid'}
-    event_dict = extractor.event_dict(log, res_info=True)
+    # Convert XES-Events into dict {'act', 'ts', 'res', 'single', 'cid'}, event columns are used by the frames as they are
+    event_dict = log if isinstance(log, logReader.EventColumns) else extractor.event_dict(log, res_info=True)
     windowWidth = frames.get_width_from_number(event_dict, windowNumber)
     return frames.bucket_window_dict_by_width(event_dict, windowWidth)
\ No newline at end of file
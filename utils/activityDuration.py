@@ -1,7 +1,47 @@
+import numpy as np
+
+
+def CoversStore(traces, store) -> bool:
+    """True if the traces are the unstarted views on all cases of the store, in the order of its rows"""
+    return all([x.store is store and x.cursor == x.start and x.durationCursor == x.start for x in traces]) and \
+           [x.start for x in traces] == store.offsets[:-1].tolist() and [x.end for x in traces] == store.offsets[1:].tolist()
+
+
+def MinPossibleTimeOnStore(store):
+    """Vectorized 'EventDurationsByMinPossibleTime' on the columns of an event store, returns the durations of all rows.
+    Time since the previous event on the same resource (all traces, by timestamp) and since the previous event of the trace, the smaller one, 1 for first events"""
+    n = len(store)
+    rows = np.arange(n)
+    caseIdx = np.repeat(np.arange(len(store.offsets) - 1), np.diff(store.offsets))
+
+    # Events of each resource by timestamp, ties in the order of the rows (= order of the traces, then of their events)
+    order = np.lexsort((rows, store.ts, store.res))
+    resSorted = store.res[order]
+    gaps = np.diff(store.ts[order], prepend=np.nan)
+    resBased = np.empty(n, dtype=np.float64)
+    resBased[order] = np.where(np.r_[False, resSorted[1:] == resSorted[:-1]], gaps, 1)
+
+    # Identical events (act, res, ts) of a trace all get the value of the last one on the resource
+    same = np.lexsort((rows, store.ts, store.res, store.act, caseIdx))
+    keys = (caseIdx[same], store.act[same], store.res[same], store.ts[same])
+    first = np.r_[True, np.logical_or.reduce([x[1:] != x[:-1] for x in keys])] if n > 0 else np.zeros(0, dtype=bool)
+    groupId = np.cumsum(first) - 1
+    last = np.r_[np.flatnonzero(first)[1:], n] - 1
+    resBased[same] = resBased[same[last]][groupId]
+
+    traceBased = np.diff(store.ts, prepend=np.nan)
+    traceBased[store.offsets[:-1][np.diff(store.offsets) > 0]] = 1
+
+    return np.trunc(np.minimum(resBased, traceBased))
 
 
 def EventDurationsByMinPossibleTime(R, traces):
     # Calculate activity durations properly (traces list is passed by reference, just modify it)
+    # All traces of a store that have not started yet => Calculate on its columns at once
+    if len(traces) > 0 and CoversStore(traces, traces[0].store):
+        traces[0].store.durations[:] = MinPossibleTimeOnStore(traces[0].store)
+        return
+
     resList = {r:[] for r in R}
     traceDict = {trace.case: trace for trace in traces}
     for trace in traces:
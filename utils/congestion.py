@@ -1,3 +1,7 @@
+import numpy as np
+import utils.frames as frames
+from simulation.objects.enums import SimulationModes
+
 def GetWindowAwareSegmentData(eventA, eventB, minTS, simTime): #(Earlier Event, Later Event)
     # First event in trace, no timing data available if unfinished
     if eventA is None:
@@ -13,7 +17,7 @@ def GetWindowAwareSegmentData(eventA, eventB, minTS, simTime): #(Earlier Event,
 
         bTS_Start = eventB[0] 
         bTS_End   = eventB[1] 
-        bAct      = eventA[3][0]
+        bAct      = eventB[3][0]
 
         relevantTime = aTS_End
         if aTS_End < minTS:
@@ -140,4 +144,181 @@ def GetCategorizedTraces(activeTraces, currentWindowLower, currentWindowUpper, s
         if trace.IsWaiting():
             pass
         else:
-            trace.currentAct[0]
\ No newline at end of file
+            trace.currentAct[0]
+
+
+
+
+class SegmentCongestionTracker:
+    """Incremental version of 'GetActiveSegments' (which remains as reference).
+    The simulator reports arriving cases, started and ended activities. Frequency and time of ended segments are kept per window in a ring buffer
+    covering the backlog, the segments traces currently are in are kept as counts and sums of their entry timestamps.
+    All of them are dense matrices indexed by activity id (0 is the None-activity), hence ratios are answered in O(|A|^2) without touching the traces"""
+    
+    def __init__(self, A, windows, simulationMode, BACKLOG_N = 10):
+        self.A         = A
+        self.index     = {a: i + 1 for i, a in enumerate(A)}
+        self.index[None] = 0
+        self.windows   = windows # {window: (lower, upper)} - Shared with the simulator, which adds windows once the log is exceeded
+        self.simMode   = simulationMode
+        self.BACKLOG_N = BACKLOG_N
+        n = len(A) + 1
+        
+        # Ended segments per window: backlog, current window and segments ending exactly on the lower border of the next window
+        self.size      = BACKLOG_N + 2
+        self.rowWindow = [None for _ in range(self.size)]
+        self.rowFreq   = np.zeros((self.size, n, n), dtype=np.int64)
+        self.rowTime   = np.zeros((self.size, n, n), dtype=np.float64)
+        self.histFreq  = np.zeros((n, n), dtype=np.int64)
+        self.histTime  = np.zeros((n, n), dtype=np.float64)
+        self.firstWindow = 0
+        
+        # Current segments of active traces: the time spent in them is 'simTime - entry timestamp', or zero before the first activity
+        self.curFreq     = np.zeros((n, n), dtype=np.int64)
+        self.curEntrySum = np.zeros((n, n), dtype=np.float64)
+        self.curZeroFreq = np.zeros((n, n), dtype=np.int64)
+        self.current     = {} # {case: (a, b, entry_ts or None)}
+        
+        # The next activity of waiting traces is only known when asked for in prediction mode
+        self.waitingPredicted = {} # {case: trace}
+        self.waiting = 0
+    
+    def __Expire(self, slot):
+        if self.rowWindow[slot] is not None and self.rowWindow[slot] >= self.firstWindow:
+            self.histFreq -= self.rowFreq[slot]
+            self.histTime -= self.rowTime[slot]
+        
+        self.rowWindow[slot] = None
+        self.rowFreq[slot]   = 0
+        self.rowTime[slot]   = 0
+    
+    def __Advance(self, currentWindow):
+        """Drop all windows which are not part of the backlog of 'currentWindow' anymore"""
+        firstWindow = max([0, currentWindow - self.BACKLOG_N])
+        
+        # The simulator may jump over windows, hence look at all rows instead of the windows passed
+        if firstWindow > self.firstWindow:
+            for slot in range(self.size):
+                if self.rowWindow[slot] is not None and self.rowWindow[slot] < firstWindow:
+                    self.__Expire(slot)
+        self.firstWindow = max([self.firstWindow, firstWindow])
+    
+    def __AddEnded(self, window, a, b, freq, time):
+        if window < self.firstWindow:
+            return
+        
+        slot = window % self.size
+        if self.rowWindow[slot] != window:
+            self.__Expire(slot)
+            self.rowWindow[slot] = window
+        
+        self.rowFreq[slot, a, b] += freq
+        self.rowTime[slot, a, b] += time
+        self.histFreq[a, b] += freq
+        self.histTime[a, b] += time
+    
+    def __SetCurrent(self, trace, a, b, entryTs):
+        self.__RemoveCurrent(trace)
+        self.current[trace.case] = (a, b, entryTs)
+        
+        if entryTs is None:
+            self.curZeroFreq[a, b] += 1
+        else:
+            self.curFreq[a, b]     += 1
+            self.curEntrySum[a, b] += entryTs
+    
+    def __RemoveCurrent(self, trace):
+        entry = self.current.pop(trace.case, None)
+        if entry is None:
+            return
+        
+        a, b, entryTs = entry
+        if entryTs is None:
+            self.curZeroFreq[a, b] -= 1
+        else:
+            self.curFreq[a, b]     -= 1
+            self.curEntrySum[a, b] -= entryTs
+    
+    def __SetWaiting(self, trace):
+        self.waiting += 1
+        if self.simMode == SimulationModes.PREDICTED_FUTURE:
+            self.__RemoveCurrent(trace)
+            self.waitingPredicted[trace.case] = trace
+        elif len(trace.history) == 0:
+            self.__SetCurrent(trace, 0, self.index[trace.GetNextActivity(self.simMode)], None)
+        else:
+            self.__SetCurrent(trace, self.index[trace.history[-1][3][0]], self.index[trace.GetNextActivity(self.simMode)], trace.history[-1][1])
+    
+    def CaseArrived(self, trace, currentWindow):
+        """CASE_ARRIVED callback of the simulator"""
+        self.__SetWaiting(trace)
+    
+    def ActivityStarted(self, trace, currentWindow):
+        """ACT_STARTED callback of the simulator"""
+        self.waiting -= 1
+        self.waitingPredicted.pop(trace.case, None)
+        
+        if len(trace.history) == 0:
+            self.__SetCurrent(trace, 0, self.index[trace.currentAct[2][0]], trace.currentAct[0])
+        else:
+            self.__SetCurrent(trace, self.index[trace.history[-1][3][0]], self.index[trace.currentAct[2][0]], trace.history[-1][1])
+    
+    def ActivityEnded(self, trace, currentWindow):
+        """ACT_ENDED callback of the simulator"""
+        self.__Advance(currentWindow)
+        self.__RemoveCurrent(trace)
+        
+        end = trace.history[-1][1]
+        window = frames.window_of_timestamp(self.windows, currentWindow, end)
+        
+        # Same segments as 'GetWindowAwareSegmentData' creates for history events
+        if len(trace.history) == 1:
+            self.__AddEnded(window, 0, self.index[trace.history[-1][3][0]], 1, 0)
+        else:
+            a = self.index[trace.history[-2][3][0]]
+            b = self.index[trace.history[-1][3][0]]
+            self.__AddEnded(window, a, b, 1, 0)
+            for w, time in frames.split_by_windows(self.windows, self.firstWindow, window, trace.history[-2][1], end):
+                self.__AddEnded(w, a, b, 0, time)
+        
+        if not trace.HasEnded():
+            self.__SetWaiting(trace)
+    
+    def GetActiveSegments(self, simulatorState):
+        """Same result as 'GetActiveSegments' as matrices (segmentFreq, segmentTime, waitingTraces)"""
+        simTime = simulatorState['CurrentTimestep']
+        self.__Advance(simulatorState['CurrentWindow'])
+        
+        segmentFreq = self.histFreq + self.curFreq + self.curZeroFreq
+        segmentTime = self.histTime + (self.curFreq * simTime - self.curEntrySum)
+        
+        for trace in self.waitingPredicted.values():
+            b = self.index[trace.GetNextActivity(self.simMode)]
+            if len(trace.history) == 0:
+                segmentFreq[0, b] += 1
+            else:
+                a = self.index[trace.history[-1][3][0]]
+                segmentFreq[a, b] += 1
+                segmentTime[a, b] += simTime - trace.history[-1][1]
+        
+        return segmentFreq, segmentTime, self.waiting
+    
+    def __ToRatio(self, segmentMatrix, waitingTraces):
+        A = [None] + self.A
+        ret = np.ones(segmentMatrix.shape)
+        
+        if waitingTraces > 0:
+            ret += segmentMatrix / waitingTraces
+        
+        ret = ret.tolist()
+        return {(A[i], A[j]): ret[i][j] for i in range(len(A)) for j in range(len(A))}
+    
+    def GetProgressByWaitingTime(self, simulatorState):
+        """Same result as 'GetProgressByWaitingTimeInFrontOfActivity'"""
+        _, segmentTime, waitingTraces = self.GetActiveSegments(simulatorState)
+        return self.__ToRatio(segmentTime, waitingTraces)
+    
+    def GetProgressByWaitingNumber(self, simulatorState):
+        """Same result as 'GetProgressByWaitingNumberInFrontOfActivity'"""
+        segmentFreq, _, waitingTraces = self.GetActiveSegments(simulatorState)
+        return self.__ToRatio(segmentFreq, waitingTraces)
@@ -1,6 +1,8 @@
 import datetime
 from datetime import datetime, timezone
 import itertools as it
+import numpy as np
+import pandas as pd
 import pm4py
 
 """
@@ -9,11 +11,41 @@ https://github.com/biankabakullari/hlem-framework
 High-Level-Event-Mining: A Framework (ICPM 2022) 
 """
 
+TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# single timestamp (datetime or string in TS_FORMAT, taken as UTC) to seconds since epoch, use ts_to_int_batch for whole columns
 def ts_to_int(datetime_ts):
     if isinstance(datetime_ts, str):
-        datetime_ts = datetime.strptime(datetime_ts, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-    int_ts = (datetime_ts - datetime(1970, 1, 1, tzinfo=timezone.utc)).total_seconds()
-    return int_ts
+        datetime_ts = datetime.strptime(datetime_ts, TS_FORMAT).replace(tzinfo=timezone.utc)
+    return (datetime_ts - EPOCH).total_seconds()
+
+
+# given a column of timestamps (datetimes, strings in TS_FORMAT or datetime64), converts all of them at once with datetime64 arithmetic
+# unit None returns float64 seconds since epoch (the values of ts_to_int), 's', 'ms' or 'us' returns int64 epoch values in that unit (floored)
+def ts_to_int_batch(timestamps, unit=None):
+
+    # lists are kept as objects, letting pandas infer their type first costs more than the conversion
+    if isinstance(timestamps, pd.Series):
+        series = timestamps
+    elif isinstance(timestamps, np.ndarray):
+        series = pd.Series(timestamps)
+    else:
+        series = pd.Series(list(timestamps), dtype=object)
+    if len(series) == 0:
+        return np.zeros(0, dtype=np.float64 if unit is None else np.int64)
+
+    if pd.api.types.infer_dtype(series, skipna=False) == 'string':
+        dt = pd.to_datetime(series, format=TS_FORMAT, utc=True)
+    else:
+        dt = pd.to_datetime(series, utc=True)
+
+    # Microseconds are exact in int64 and float64, dividing them once rounds like timedelta.total_seconds()
+    us = dt.to_numpy(dtype='datetime64[us]').astype(np.int64)
+    if unit is None:
+        return us.astype(np.float64) / 1e6
+    return us // {'s': 1000000, 'ms': 1000, 'us': 1}[unit]
 
 
 def int_to_ts(int_number, tz_info):
@@ -61,7 +93,8 @@ def directly_follows(trace):
         return [(trace[0])]
 
     else:
-        ts_set = set([ts_to_int(event['time:timestamp']) for event in trace])
+        # equal timestamps are equal instants, no need to convert them (directly_follows_po_trace compares them as they are as well)
+        ts_set = set([event['time:timestamp'] for event in trace])
         if len(ts_set) < n:  # trace contains less unique ts than events, so trace is partially ordered
             df_indices = directly_follows_po_trace(trace)
 
@@ -135,13 +168,16 @@ def event_dic_with_resource(log):
     event_dic = {}
     pos = 0
     traceNum = 0
+
+    # all timestamps of the log converted in one batch
+    ts_all = ts_to_int_batch([event['time:timestamp'] for trace in log for event in trace]).tolist()
     
     for trace in log:
         n = len(trace)
         for i in range(n):
             event = trace[i]
             act   = event['concept:name']
-            ts    = ts_to_int(event['time:timestamp'])
+            ts    = ts_all[pos + i]
             res   = event['org:resource']
             lc    = event.get('lifecycle:transition')
             event_dic[pos + i] = {'act': act, 'ts': ts, 'res': res, 'single': False, 'cid': traceNum, 'lc': lc}
@@ -157,13 +193,16 @@ def event_dic_wo_resource(log):
     event_dic = {}
     pos = 0
     traceNum = 0
+
+    # all timestamps of the log converted in one batch
+    ts_all = ts_to_int_batch([event['time:timestamp'] for trace in log for event in trace]).tolist()
     
     for trace in log:
         n = len(trace)
         for i in range(n):
             event = trace[i]
             act   = event['concept:name']
-            ts    = ts_to_int(event['time:timestamp'])
+            ts    = ts_all[pos + i]
             lc    = event.get('lifecycle:transition')
 
             event_dic[pos + i] = {'act': act, 'ts': ts, 'single': False, 'cid': traceNum, 'lc': lc}
@@ -1,3 +1,4 @@
+import utils.frames as frames
 
 def FairnessEqualWork(R):
     return {r: 1.0/len(R) for r in R}
@@ -79,4 +80,116 @@ def FairnessBacklogFair_WORK(simulatorState, BACKLOG_N = 5):
             if resMat_N[r] == 0:
                 resMat_N[r] = 0.001
         return resMat_N
-    
\ No newline at end of file
+    
+
+
+class FairnessBacklogAccumulator:
+    """Incremental version of 'FairnessBacklogFair_TIME' and 'FairnessBacklogFair_WORK' (which remain as reference).
+    The simulator reports each ended activity, work counts and working times are kept per window and resource in a ring buffer
+    covering the backlog, such that the ratios are answered in O(|R|) instead of rescanning the history of all traces"""
+    
+    def __init__(self, windows, BACKLOG_N = 5):
+        self.windows   = windows # {window: (lower, upper)} - Shared with the simulator, which adds windows once the log is exceeded
+        self.BACKLOG_N = BACKLOG_N
+        
+        # Backlog, current window and activities ending exactly on the lower border of the next window
+        self.size      = BACKLOG_N + 2
+        self.rowWindow = [None for _ in range(self.size)]
+        self.rowWork   = [{} for _ in range(self.size)]
+        self.rowTime   = [{} for _ in range(self.size)]
+        
+        # Sums over all rows inside the backlog
+        self.totalWork   = {}
+        self.totalTime   = {}
+        self.firstWindow = 0
+    
+    def __Expire(self, slot):
+        if self.rowWindow[slot] is not None and self.rowWindow[slot] >= self.firstWindow:
+            for r, n in self.rowWork[slot].items():
+                self.totalWork[r] -= n
+            for r, t in self.rowTime[slot].items():
+                self.totalTime[r] -= t
+        
+        self.rowWindow[slot] = None
+        self.rowWork[slot]   = {}
+        self.rowTime[slot]   = {}
+    
+    def __Advance(self, currentWindow):
+        """Drop all windows which are not part of the backlog of 'currentWindow' anymore"""
+        firstWindow = max([0, currentWindow - self.BACKLOG_N])
+        
+        # The simulator may jump over windows, hence look at all rows instead of the windows passed
+        if firstWindow > self.firstWindow:
+            for slot in range(self.size):
+                if self.rowWindow[slot] is not None and self.rowWindow[slot] < firstWindow:
+                    self.__Expire(slot)
+        self.firstWindow = max([self.firstWindow, firstWindow])
+    
+    def __Add(self, window, res, work, time):
+        if window < self.firstWindow:
+            return
+        
+        slot = window % self.size
+        if self.rowWindow[slot] != window:
+            self.__Expire(slot)
+            self.rowWindow[slot] = window
+        
+        self.rowWork[slot][res] = self.rowWork[slot].get(res, 0) + work
+        self.rowTime[slot][res] = self.rowTime[slot].get(res, 0) + time
+        self.totalWork[res] = self.totalWork.get(res, 0) + work
+        self.totalTime[res] = self.totalTime.get(res, 0) + time
+    
+    def ActivityEnded(self, trace, currentWindow):
+        """ACT_ENDED callback of the simulator"""
+        self.__Advance(currentWindow)
+        start, end, res = trace.history[-1][0], trace.history[-1][1], trace.history[-1][2]
+        
+        window = frames.window_of_timestamp(self.windows, currentWindow, end)
+        
+        # The activity is counted once, where it ends
+        self.__Add(window, res, 1, 0)
+        
+        # Working time is split on the windows the activity spans (as the backlog cuts off the time before its lower border)
+        for w, time in frames.split_by_windows(self.windows, self.firstWindow, window, start, end):
+            self.__Add(w, res, 0, time)
+    
+    def Fair_TIME(self, simulatorState):
+        """Same result as 'FairnessBacklogFair_TIME'"""
+        R = simulatorState['R']
+        self.__Advance(simulatorState['CurrentWindow'])
+        
+        resMat_TIME = {r: self.totalTime.get(r, 0) for r in R}
+        timeTotal   = sum(resMat_TIME.values())
+        
+        if timeTotal > 0:
+            for r in R:
+                resMat_TIME[r] = 1 - resMat_TIME[r] / timeTotal
+                
+                # Avoid stalling
+                if resMat_TIME[r] == 0:
+                    resMat_TIME[r] = 0.001
+            return resMat_TIME
+        else:
+            return {r: 1.0/len(R) for r in R}
+    
+    def Fair_WORK(self, simulatorState):
+        """Same result as 'FairnessBacklogFair_WORK'"""
+        R               = simulatorState['R']
+        lonelyResources = simulatorState['LonelyResources']
+        self.__Advance(simulatorState['CurrentWindow'])
+        
+        # Exclude resources that are the only ones able to perform a specific activity from this calculation
+        resMat_N = {r: self.totalWork.get(r, 0) for r in R if r not in lonelyResources}
+        nTotal   = sum(resMat_N.values())
+        
+        # Equal distribution if no traces processed so far
+        if nTotal == 0:
+            return {r: 1.0/len(R) for r in R}
+        else:
+            for r in resMat_N:
+                resMat_N[r] = 1 - (resMat_N[r] / nTotal)
+                
+                # Avoid stalling
+                if resMat_N[r] == 0:
+                    resMat_N[r] = 0.001
+            return resMat_N
@@ -1,5 +1,6 @@
 import math
 
+import numpy as np
 import pm4py
 
 """
@@ -8,10 +9,32 @@ https://github.com/biankabakullari/hlem-framework
 High-Level-Event-Mining: A Framework (ICPM 2022) 
 """
 
+# given event_dict or the event columns of utils.logReader, returns the timestamps as array and the event IDs of its rows
+# (columns already hold the timestamps as array, their event IDs are the row numbers)
+def event_timestamps(events):
+
+    if isinstance(events, dict):
+        ids = list(events.keys())
+        return np.array([events[ev_id]['ts'] for ev_id in ids], dtype=np.float64), ids
+
+    return events.ts, range(len(events.ts))
+
+
+# given event_dict or event columns and their timestamps, returns the rows sorted by timestamp (ties in the order of the events)
+# columns keep the order, such that it is sorted only once (or loaded from the log cache)
+def event_order(events, ts):
+
+    if isinstance(events, dict):
+        return np.argsort(ts, kind='stable')
+
+    return events.Order()
+
+
 # given event_dict, returns a list of the keys (event IDs) sorted by timestamp
 def sorted_ids_by_timestamp(event_dict):
 
-    ids_sorted = sorted(event_dict.keys(), key=lambda x: event_dict[x]['ts'])
+    ts, ids = event_timestamps(event_dict)
+    ids_sorted = [ids[i] for i in event_order(event_dict, ts).tolist()]
 
     return ids_sorted
 
@@ -38,9 +61,9 @@ def max_ts(event_dict, ids_sorted):
 # keys=bucket number, value=(left_border, right_border) as numbers
 def bucket_window_dict_by_width(event_dict, width):
 
-    ids_sorted = sorted_ids_by_timestamp(event_dict)
-    start_int = min_ts(event_dict, ids_sorted)
-    end_int = max_ts(event_dict, ids_sorted)
+    ts, _ = event_timestamps(event_dict)
+    start_int = ts.min().item()
+    end_int = ts.max().item()
 
     bucket_window_dict = {}
     b = 0
@@ -58,10 +81,10 @@ def bucket_window_dict_by_width(event_dict, width):
 
 def get_width_from_number(event_dict, number):
 
-    ids_sorted = sorted_ids_by_timestamp(event_dict)
+    ts, _ = event_timestamps(event_dict)
 
-    start_int = min_ts(event_dict, ids_sorted)
-    end_int = max_ts(event_dict, ids_sorted)
+    start_int = ts.min().item()
+    end_int = ts.max().item()
 
     width = math.ceil((end_int - start_int)/number)
 
@@ -72,30 +95,79 @@ def get_width_from_number(event_dict, number):
 # create dict with bucket numbers as keys and list of event IDs that happen within corresponding window as values
 def bucket_id_list_dict_by_width(event_dict, width):
 
-    ids_sorted = sorted_ids_by_timestamp(event_dict)
+    return bucket_id_list_dict(event_dict, bucket_window_dict_by_width(event_dict, width))
+
+
+# given event_dict and the number of windows, obtain a dictionary like bucket_window_dict_by_width
+# whose windows hold (about) the same number of events instead of spanning the same time
+# busy periods get narrow windows, quiet ones wide windows
+def bucket_window_dict_by_count(event_dict, number):
+
+    ts, _ = event_timestamps(event_dict)
+    ts_sorted = ts[event_order(event_dict, ts)]
+
+    # borders at the timestamps of every (n/number)-th event, events sharing a timestamp can not be split
+    positions = np.minimum(len(ts_sorted) - 1, np.round(np.arange(number + 1) * len(ts_sorted) / number).astype(np.int64))
+    borders = np.unique(ts_sorted[positions]).tolist()
+    if len(borders) == 1:
+        borders.append(borders[0] + 1)
+
+    return {b: (borders[b], borders[b + 1]) for b in range(len(borders) - 1)}
+
+
+# given event_dict, width of the windows and maximum number of events per window, obtain a dictionary like bucket_window_dict_by_width
+# windows holding more events than max_events are split into windows of equal event count
+def bucket_window_dict_by_load(event_dict, width, max_events):
+
+    ts, _ = event_timestamps(event_dict)
+    ts_sorted = ts[event_order(event_dict, ts)]
     bucket_window_dict = bucket_window_dict_by_width(event_dict, width)
+    first = bucket_first_rows(ts_sorted, bucket_window_dict)
 
-    # initially, each window bucket is empty
-    # some window buckets might remain empty
-    bucket_id_list = {b: [] for b in bucket_window_dict.keys()}
+    windows = []
+    for b in range(len(bucket_window_dict)):
+        left, right = bucket_window_dict[b]
+        count = first[b + 1] - first[b]
 
-    #assign corresponding frame to each event
-    id_bucket_mapping = {ev_id: 0 for ev_id in event_dict.keys()}
+        if count <= max_events:
+            windows.append((left, right))
+            continue
+
+        parts = math.ceil(count / max_events)
+        borders = sorted(set([left] + [ts_sorted[first[b] + p * count // parts].item() for p in range(1, parts)] + [right]))
+        windows += [(borders[i], borders[i + 1]) for i in range(len(borders) - 1)]
 
-    curr_bucket = 0
-    max_bucket = max([bucketId for bucketId in bucket_id_list.keys()])
-    curr_window = bucket_window_dict[curr_bucket]
+    return {b: windows[b] for b in range(len(windows))}
 
-    for ev_id in ids_sorted:
-        curr_ts = event_dict[ev_id]['ts']
 
-        # as long as current timestamp is higher than right border, got to next window
-        while curr_ts >= curr_window[1] and curr_bucket < max_bucket:
-            curr_bucket += 1
+# given the sorted timestamps and windows, obtain the position of the first event of each window in them (and the number of events as last entry)
+# events after the last window belong to it
+def bucket_first_rows(ts_sorted, bucket_window_dict):
 
-            curr_window = bucket_window_dict[curr_bucket]
-        bucket_id_list[curr_bucket].append(ev_id)
-        id_bucket_mapping[ev_id] = curr_bucket
+    rights = np.array([bucket_window_dict[b][1] for b in range(len(bucket_window_dict))], dtype=np.float64)
+    first = np.searchsorted(ts_sorted, rights[:-1], side='left')
+
+    return [0] + first.tolist() + [len(ts_sorted)]
+
+
+# given event dictionary and windows (bucket_window_dict)
+# create dict with bucket numbers as keys and list of event IDs that happen within corresponding window as values
+def bucket_id_list_dict(event_dict, bucket_window_dict):
+
+    ts, ids = event_timestamps(event_dict)
+    order = event_order(event_dict, ts)
+
+    # an event belongs to the first window whose right border is larger than its timestamp (or the last window)
+    # some window buckets might remain empty
+    rights = np.array([bucket_window_dict[b][1] for b in range(len(bucket_window_dict))], dtype=np.float64)
+    buckets = np.minimum(np.searchsorted(rights, ts, side='right'), len(rights) - 1)
+
+    bucket_id_list = {b: [] for b in bucket_window_dict.keys()}
+    for ev, b in zip(order.tolist(), buckets[order].tolist()):
+        bucket_id_list[b].append(ids[ev])
+
+    #assign corresponding frame to each event
+    id_bucket_mapping = dict(zip(ids, buckets.tolist()))
 
     return bucket_id_list, id_bucket_mapping
 
@@ -109,3 +181,33 @@ def decrease_window_number(p, no_windows):
     new_number = no_windows - p*no_windows
     return new_number
 
+
+
+# given the window during which something happened at ts, obtain the last window whose left border is <= ts
+# (something happening exactly on the border between two windows already belongs to the next one)
+def window_of_timestamp(bucket_window_dict, window, ts):
+
+    while window + 1 in bucket_window_dict and bucket_window_dict[window + 1][0] <= ts:
+        window += 1
+
+    return window
+
+
+# split the time between start and end (which lies in window end_window) on the windows from first_window on
+# each window owns the time from its left border to the left border of the next window
+# returns list of (window, duration), ordered from end_window backwards
+def split_by_windows(bucket_window_dict, first_window, end_window, start, end):
+
+    parts = []
+    window = end_window
+    right = end
+    while window >= first_window:
+        left = max([start, bucket_window_dict[window][0]])
+        parts.append((window, right - left))
+
+        if start >= bucket_window_dict[window][0]:
+            break
+        right = bucket_window_dict[window][0]
+        window -= 1
+
+    return parts
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+from utils.logReader import EventColumns
+
+
+class LogCache:
+    """On-disk cache of a parsed event log and the data derived from it, kept in a directory named after the hash of the log file's content.
+    Arrays are stored as .npy files and loaded memory-mapped, names (activities, resources, ...) in a JSON file.
+    Derived data is stored under a key naming the parameters it was calculated with, e.g. the windows for a number of windows and strategy"""
+
+    def __init__(self, directory, logPath, verbose=False, variant=None):
+        self.logPath   = logPath
+        self.verbose   = verbose
+        self.hash      = LogCache.ContentHash(logPath)
+        if variant is not None:
+            # The same file parsed differently (e.g. another column mapping of a CSV log)
+            self.hash = hashlib.sha256(f'{self.hash}|{variant}'.encode('utf-8')).hexdigest()
+        self.directory = os.path.join(directory, self.hash[:32])
+        self.hits      = []
+        self.misses    = []
+
+    @staticmethod
+    def ContentHash(path) -> str:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def __Path(self, name):
+        return os.path.join(self.directory, name)
+
+    def __Count(self, name, hit):
+        (self.hits if hit else self.misses).append(name)
+        if self.verbose:
+            print(f"    - Log cache {'hit' if hit else 'miss'}: {name}")
+
+    def __Write(self, name, write):
+        """Write to a temporary file first, such that parallel simulations never read a partially written file"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.__Path(f'{name}.{uuid.uuid4().hex}.tmp')
+        with open(tmp, 'wb') as f:
+            write(f)
+        os.replace(tmp, self.__Path(name))
+
+    def __LoadArray(self, name):
+        if not os.path.exists(self.__Path(f'{name}.npy')):
+            return None
+        return np.load(self.__Path(f'{name}.npy'), mmap_mode='r')
+
+    def __StoreArray(self, name, array):
+        self.__Write(f'{name}.npy', lambda f: np.save(f, np.ascontiguousarray(array)))
+
+    ##############################################
+    #############                    #############
+    ##########      EVENT COLUMNS       ##########
+    #############                    #############
+    ##############################################
+    def Columns(self):
+        """EventColumns of the log, None if not cached"""
+        if not os.path.exists(self.__Path('columns.json')):
+            self.__Count('columns', False)
+            return None
+
+        with open(self.__Path('columns.json'), 'r') as f:
+            names = json.load(f)
+
+        # String columns are dictionary encoded on disk, they are decoded in one pass
+        decode = lambda column: np.array(names[column], dtype=object)[self.__LoadArray(column)].tolist()
+        columns = EventColumns(self.__LoadArray('cid'), decode('act'), decode('res'), self.__LoadArray('ts'), decode('lc'), names['caseNames'])
+        columns.order = self.__LoadArray('order')
+        self.__Count('columns', True)
+        return columns
+
+    def StoreColumns(self, columns):
+        names = {'source': os.path.abspath(self.logPath), 'caseNames': columns.caseNames}
+        for column in ['act', 'res', 'lc']:
+            codes = {}
+            ids = np.fromiter((codes.setdefault(v, len(codes)) for v in getattr(columns, column)), dtype=np.int32, count=len(columns))
+            names[column] = list(codes.keys())
+            self.__StoreArray(column, ids)
+
+        self.__StoreArray('cid', columns.cid)
+        self.__StoreArray('ts', columns.ts)
+        self.__StoreArray('order', columns.Order())
+
+        # Written last, it marks the columns as complete
+        self.__Write('columns.json', lambda f: f.write(json.dumps(names).encode('utf-8')))
+
+    ##############################################
+    #############                    #############
+    ##########       DERIVED DATA       ##########
+    #############                    #############
+    ##############################################
+    def Windows(self, key):
+        """Window borders {window: (lower, upper)} calculated with the parameters 'key', None if not cached"""
+        borders = self.__LoadArray(f'windows_{key}')
+        self.__Count(f'windows_{key}', borders is not None)
+        if borders is None:
+            return None
+        return {b: (lower, upper) for b, (lower, upper) in enumerate(borders.tolist())}
+
+    def StoreWindows(self, key, windows):
+        self.__StoreArray(f'windows_{key}', np.array([windows[b] for b in range(len(windows))], dtype=np.float64).reshape(-1, 2))
+
+    def Durations(self, key):
+        """Event durations in the order of the event store calculated by the method 'key', None if not cached"""
+        durations = self.__LoadArray(f'durations_{key}')
+        self.__Count(f'durations_{key}', durations is not None)
+        return durations
+
+    def StoreDurations(self, key, durations):
+        self.__StoreArray(f'durations_{key}', durations)
+
+    def Summary(self) -> str:
+        return f"Log cache {self.directory}: {len(self.hits)} hits ({', '.join(self.hits)}) / {len(self.misses)} misses ({', '.join(self.misses)})"
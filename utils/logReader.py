@@ -0,0 +1,256 @@
+import gzip
+import numpy as np
+import pandas as pd
+
+try:
+    from lxml import etree
+except ImportError:
+    import xml.etree.ElementTree as etree
+
+
+class EventColumns:
+    """Events of a log as columns in file order, the row of an event is its id in 'extractor.event_dict'.
+    cid is the number of the trace the event belongs to, ts the timestamp in seconds since epoch (UTC)"""
+
+    def __init__(self, cid, act, res, ts, lc, caseNames):
+        self.cid = cid  # int64 [n]
+        self.act = act  # [name ...]
+        self.res = res  # [name ...]
+        self.ts  = ts   # float64 [n]
+        self.lc  = lc   # [name or None ...]
+        self.caseNames = caseNames # [concept:name of the trace or None ...] - Position is the cid
+        self.order = None # int64 [n] - Rows sorted by timestamp, see 'Order'
+
+    def __len__(self):
+        return len(self.ts)
+
+    def Order(self):
+        """Rows sorted by timestamp (ties in file order), computed once"""
+        if self.order is None:
+            self.order = np.argsort(self.ts, kind='stable')
+        return self.order
+
+    def __iter__(self):
+        """Events per trace [[{'act', 'ts', 'res', 'lc'} ...] ...], such that code counting the events of a pm4py log keeps working"""
+        offsets = np.searchsorted(self.cid, np.arange(len(self.caseNames) + 1))
+        for i in range(len(self.caseNames)):
+            yield [{'act': self.act[j], 'ts': float(self.ts[j]), 'res': self.res[j], 'lc': self.lc[j]} for j in range(offsets[i], offsets[i + 1])]
+
+    def EventDict(self, res_info=True):
+        """Same dict as 'extractor.event_dict' of the parsed log"""
+        counts = np.bincount(self.cid, minlength=len(self.caseNames))
+        event_dict = {}
+        for i, (cid, act, res, ts, lc) in enumerate(zip(self.cid.tolist(), self.act, self.res, self.ts.tolist(), self.lc)):
+            event_dict[i] = {'act': act, 'ts': ts, 'res': res, 'single': bool(counts[cid] == 1), 'cid': cid, 'lc': lc}
+            if not res_info:
+                del event_dict[i]['res']
+        return event_dict
+
+
+def ParseTimestamps(values, timestampFormat=None):
+    """ISO 8601 timestamps (XES date attributes) to seconds since epoch in one pass, same values as 'extractor.ts_to_int'.
+    Other formats are given as strftime format, timestamps without timezone are taken as UTC"""
+    try:
+        dt = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format=timestampFormat or 'ISO8601')
+    except (ValueError, TypeError):
+        if timestampFormat is not None:
+            raise
+        dt = pd.to_datetime(pd.Series(values, dtype=object), utc=True)
+
+    # Microseconds are exact in float64, dividing them once rounds like timedelta.total_seconds()
+    us = dt.to_numpy(dtype='datetime64[us]').astype(np.int64)
+    return us.astype(np.float64) / 1e6
+
+
+def TimestampSeconds(series, timestampFormat=None):
+    """Column of a table to seconds since epoch: numbers are taken as seconds already, datetime columns are converted and text is parsed"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        us = pd.to_datetime(series, utc=True).to_numpy(dtype='datetime64[us]').astype(np.int64)
+        return us.astype(np.float64) / 1e6
+    return ParseTimestamps(series.to_numpy(dtype=object), timestampFormat)
+
+
+def TagName(tag):
+    """Tag of an element without its namespace"""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else tag
+
+
+def ReadXES(path) -> EventColumns:
+    """Single pass over a (gzipped) XES file, events are written to columns as soon as their element is complete and the element is freed again.
+    Only the attributes concept:name, org:resource, time:timestamp (time:end if missing) and lifecycle:transition of events and the concept:name of traces are read"""
+    opener = gzip.open if path.endswith('.gz') else open
+
+    cid, act, res, tsRaw, lc = [], [], [], [], []
+    caseNames = []
+    caseName = None
+    tags = [] # Tags of the open elements
+
+    with opener(path, 'rb') as f:
+        for action, elem in etree.iterparse(f, events=('start', 'end')):
+            if action == 'start':
+                tags.append(TagName(elem.tag))
+                continue
+
+            tag = tags.pop()
+            parent = tags[-1] if len(tags) > 0 else None
+
+            if tag == 'event' and parent == 'trace':
+                attributes = {}
+                for child in elem:
+                    key = child.get('key')
+                    if key is not None:
+                        attributes[key] = child.get('value')
+
+                cid.append(len(caseNames))
+                act.append(attributes.get('concept:name'))
+                res.append(attributes.get('org:resource'))
+                tsRaw.append(attributes.get('time:timestamp', attributes.get('time:end'))) # Simulated logs exported with start and end
+                lc.append(attributes.get('lifecycle:transition'))
+                elem.clear()
+            elif tag == 'string' and parent == 'trace' and elem.get('key') == 'concept:name':
+                caseName = elem.get('value')
+            elif tag == 'trace':
+                caseNames.append(caseName)
+                caseName = None
+                elem.clear()
+
+                # Drop the already read traces from the tree (lxml only)
+                if hasattr(elem, 'getprevious'):
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+
+    return EventColumns(np.array(cid, dtype=np.int64), act, res, ParseTimestamps(tsRaw), lc, caseNames)
+
+
+def ReadColumnar(path) -> EventColumns:
+    """Simulated log written as Parquet or Arrow IPC by 'logWriter.ColumnarSink'. Arrow IPC files are memory-mapped and read without copying,
+    only the activity and resource names are decoded. ts is the column named in the schema metadata 'timestamp' (time:end if both were exported)"""
+    import pyarrow as pa
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=True)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    # Chunks of a Parquet file may use different dictionaries
+    table = table.unify_dictionaries()
+    metadata = table.schema.metadata or {}
+    timestamp = metadata.get(b'timestamp', b'').decode('utf-8') or 'time:end'
+
+    def Codes(column):
+        chunks = table.column(column).chunks
+        dictionary = chunks[0].dictionary.to_pylist() if len(chunks) > 0 else []
+        indices = np.concatenate([x.indices.to_numpy() for x in chunks]) if len(chunks) > 0 else np.zeros(0, dtype=np.int32)
+        return dictionary, indices
+
+    def Names(column):
+        dictionary, indices = Codes(column)
+        return np.array(dictionary, dtype=object)[indices].tolist()
+
+    # Traces are written one after another => a new trace starts wherever the case changes
+    cases, caseCodes = Codes('case')
+    starts = np.flatnonzero(np.r_[True, caseCodes[1:] != caseCodes[:-1]]) if len(caseCodes) > 0 else np.zeros(0, dtype=np.int64)
+    cid = np.cumsum(np.r_[False, caseCodes[1:] != caseCodes[:-1]]).astype(np.int64) if len(caseCodes) > 0 else np.zeros(0, dtype=np.int64)
+
+    us = table.column(timestamp).cast(pa.int64()).to_numpy()
+    return EventColumns(cid, Names('concept:name'), Names('org:resource'), us.astype(np.float64) / 1e6, [None] * len(us), [cases[x] for x in caseCodes[starts].tolist()])
+
+
+##############################################
+#############                    #############
+##########       TABLE FORMATS      ##########
+#############                    #############
+##############################################
+# Columns of the event attributes in CSV/Parquet logs, the first one present is used (pm4py names, then the ones written by the simulator)
+DEFAULT_COLUMNS = {'case': ['case:concept:name', 'case'], 'act': ['concept:name'], 'res': ['org:resource'], 'ts': ['time:timestamp', 'time:end'], 'lc': ['lifecycle:transition']}
+
+
+def IsTable(path) -> bool:
+    """CSV (optionally gzipped), Parquet or Arrow IPC (Feather)"""
+    name = path.lower()
+    name = name[:-3] if name.endswith('.gz') else name
+    return name.endswith(('.csv', '.parquet', '.feather', '.arrow'))
+
+
+def ColumnMapping(available, columns=None) -> dict:
+    """{attribute: column or None} for the attributes case, act, res, ts and lc. 'columns' overrides the defaults, e.g. {'case': 'CaseID', 'ts': 'Start'}"""
+    columns = columns or {}
+    unknown = [x for x in columns if x not in DEFAULT_COLUMNS]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown event attributes {unknown} in the column mapping, known are {list(DEFAULT_COLUMNS.keys())}")
+
+    mapping = {}
+    for attribute, candidates in DEFAULT_COLUMNS.items():
+        if attribute in columns:
+            if columns[attribute] not in available:
+                raise ValueError(f"Column '{columns[attribute]}' of '{attribute}' not found in the log, available are {list(available)}")
+            mapping[attribute] = columns[attribute]
+        else:
+            mapping[attribute] = next((x for x in candidates if x in available), None)
+
+    missing = [x for x in ['case', 'act', 'ts'] if mapping[x] is None]
+    if len(missing) > 0:
+        raise ValueError(f"No column found for {missing} in the log, available are {list(available)}")
+    return mapping
+
+
+def FromTable(frame, mapping, timestampFormat=None) -> EventColumns:
+    """EventColumns of a table with one row per event, the rows are grouped by case (cases in order of their first row, rows of a case keep their order)"""
+    codes, cases = pd.factorize(frame[mapping['case']].astype('string'), sort=False)
+    if (codes < 0).any():
+        rows = np.flatnonzero(codes < 0)
+        raise ValueError(f"{len(rows)} events without a case id in column '{mapping['case']}' (first at row {rows[0]})")
+    order = np.argsort(codes, kind='stable')
+
+    def Names(attribute):
+        if mapping[attribute] is None:
+            return [None] * len(order)
+        return frame[mapping[attribute]].astype('string').to_numpy(dtype=object, na_value=None)[order].tolist()
+
+    ts = TimestampSeconds(frame[mapping['ts']], timestampFormat)[order]
+    return EventColumns(codes[order].astype(np.int64), Names('act'), Names('res'), np.ascontiguousarray(ts), Names('lc'), [str(x) for x in cases])
+
+
+def ReadCSV(path, columns=None, timestampFormat=None) -> EventColumns:
+    """CSV log (gzipped if ending in .gz) with one row per event, see 'ColumnMapping' for the columns used"""
+    mapping = ColumnMapping(pd.read_csv(path, nrows=0).columns, columns)
+    names = [mapping[x] for x in ['case', 'act', 'res', 'lc'] if mapping[x] is not None]
+    frame = pd.read_csv(path, usecols=list(set(names + [mapping['ts']])), dtype={x: str for x in names})
+    return FromTable(frame, mapping, timestampFormat)
+
+
+def ReadParquet(path, columns=None, timestampFormat=None) -> EventColumns:
+    """Parquet or Arrow IPC (Feather) log with one row per event, see 'ColumnMapping' for the columns used. Only the mapped columns are read"""
+    import pyarrow as pa
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    else:
+        schema = pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+
+    # Written by the simulator => Timestamp of its export and without copying
+    metadata = schema.metadata or {}
+    if columns is None and b'timestamp' in metadata:
+        return ReadColumnar(path)
+
+    mapping = ColumnMapping(schema.names, columns)
+    used = list(set([x for x in mapping.values() if x is not None]))
+    if path.lower().endswith('.parquet'):
+        table = pq.read_table(path, columns=used, memory_map=True)
+    else:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all().select(used)
+    return FromTable(table.to_pandas(), mapping, timestampFormat)
+
+
+def ReadEventColumns(path, columns=None, timestampFormat=None) -> EventColumns:
+    """Event columns of a log in any of the supported formats: XES (optionally gzipped), CSV (optionally gzipped), Parquet or Arrow IPC.
+    The column mapping and timestamp format only apply to the table formats"""
+    if not IsTable(path):
+        return ReadXES(path)
+    name = path.lower()
+    name = name[:-3] if name.endswith('.gz') else name
+    if name.endswith('.csv'):
+        return ReadCSV(path, columns, timestampFormat)
+    return ReadParquet(path, columns, timestampFormat)
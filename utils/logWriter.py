@@ -0,0 +1,183 @@
+import csv
+import gzip
+import os
+import numpy as np
+from datetime import datetime, timezone
+from xml.sax.saxutils import quoteattr
+
+
+def FormatTimestamp(ts):
+    """Seconds since epoch (UTC) to ISO 8601, as written by the pm4py exporter"""
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class TraceSink:
+    """Writes traces to a file one at a time, such that they can be freed right after.
+    Events are (act, res, ts) or (act, res, start, end) if 'startEnd' is set. The file is written under a temporary name and
+    only gets its final name on 'Close', an interrupted simulation never leaves a log that looks complete"""
+
+    def __init__(self, path, startEnd=False):
+        self.path     = path
+        self.startEnd = startEnd
+        self.traces   = 0
+        self.events   = 0
+        self.tmpPath  = f'{path}.tmp'
+
+        directory = os.path.dirname(path)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+        self.Begin()
+
+    def Begin(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        self.file = opener(self.tmpPath, 'wt', encoding='utf-8', newline='')
+
+    def End(self):
+        pass
+
+    def Write(self, case, events):
+        self.traces += 1
+        self.events += len(events)
+
+    def Close(self):
+        if self.file is None:
+            return
+        self.End()
+        self.file.close()
+        self.file = None
+        os.replace(self.tmpPath, self.path)
+
+
+class XESSink(TraceSink):
+    """Same structure as the log exported by pm4py from the case/event table of the simulator"""
+
+    def Begin(self):
+        super().Begin()
+        self.file.write('<?xml version="1.0" encoding="utf-8" ?>\n'
+                        '<log xes.version="1849-2016" xes.features="nested-attributes" xmlns="http://www.xes-standard.org/">\n'
+                        '\t<extension name="Organizational" prefix="org" uri="http://www.xes-standard.org/org.xesext" />\n'
+                        '\t<extension name="Concept" prefix="concept" uri="http://www.xes-standard.org/concept.xesext" />\n'
+                        '\t<extension name="Time" prefix="time" uri="http://www.xes-standard.org/time.xesext" />\n')
+
+    def End(self):
+        self.file.write('</log>\n')
+
+    def Write(self, case, events):
+        super().Write(case, events)
+        case = quoteattr(str(case))
+        lines = [f'\t<trace>\n\t\t<string key="concept:name" value={case} />\n']
+        for e in events:
+            lines.append(f'\t\t<event>\n\t\t\t<string key="case" value={case} />\n\t\t\t<string key="concept:name" value={quoteattr(str(e[0]))} />\n')
+            if self.startEnd:
+                lines.append(f'\t\t\t<date key="time:start" value="{FormatTimestamp(e[2])}" />\n\t\t\t<date key="time:end" value="{FormatTimestamp(e[3])}" />\n')
+            else:
+                lines.append(f'\t\t\t<date key="time:timestamp" value="{FormatTimestamp(e[2])}" />\n')
+            lines.append(f'\t\t\t<string key="org:resource" value={quoteattr(str(e[1]))} />\n\t\t</event>\n')
+        lines.append('\t</trace>\n')
+        self.file.write(''.join(lines))
+
+
+class CSVSink(TraceSink):
+    """One row per event with the columns of the case/event table of the simulator"""
+
+    def Begin(self):
+        super().Begin()
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['case', 'concept:name', 'time:start', 'time:end', 'org:resource'] if self.startEnd else ['case', 'concept:name', 'time:timestamp', 'org:resource'])
+
+    def Write(self, case, events):
+        super().Write(case, events)
+        if self.startEnd:
+            self.writer.writerows([(case, e[0], FormatTimestamp(e[2]), FormatTimestamp(e[3]), e[1]) for e in events])
+        else:
+            self.writer.writerows([(case, e[0], FormatTimestamp(e[2]), e[1]) for e in events])
+
+
+class ColumnarSink(TraceSink):
+    """Parquet or Arrow IPC (Feather V2) file with the columns case, concept:name and org:resource (dictionary encoded, codes in order of appearance)
+    and time:start, time:end (UTC timestamps, stored as int64 microseconds since epoch). Events are written in record batches of 'batchSize'.
+    Start and end are always kept, the schema metadata 'timestamp' names the column the XES export would use as time:timestamp (both if empty)"""
+
+    def __init__(self, path, timestamp='time:end', batchSize=65536):
+        self.timestamp = timestamp
+        self.batchSize = batchSize
+        super().__init__(path, startEnd=True)
+
+    def Begin(self):
+        import pyarrow as pa
+        self.pa = pa
+        self.codes = {'case': {}, 'concept:name': {}, 'org:resource': {}}
+        self.batch = {'case': [], 'concept:name': [], 'org:resource': [], 'time:start': [], 'time:end': []}
+
+        strings = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([('case', strings), ('concept:name', strings), ('org:resource', strings), ('time:start', pa.timestamp('us', tz='UTC')), ('time:end', pa.timestamp('us', tz='UTC'))],
+                                metadata={'timestamp': self.timestamp or ''})
+
+        if IsParquet(self.path):
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(self.tmpPath, self.schema)
+        else:
+            import pyarrow.ipc as ipc
+            # Uncompressed, such that the file can be memory-mapped without copying. The dictionaries only grow, hence deltas suffice
+            self.sinkFile = pa.OSFile(self.tmpPath, 'wb')
+            self.writer = ipc.new_file(self.sinkFile, self.schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def __Encode(self, column, value):
+        codes = self.codes[column]
+        return codes.setdefault(value, len(codes))
+
+    def __Flush(self):
+        if len(self.batch['case']) == 0:
+            return
+        pa = self.pa
+        columns = []
+        for column in ['case', 'concept:name', 'org:resource']:
+            columns.append(pa.DictionaryArray.from_arrays(pa.array(self.batch[column], type=pa.int32()), pa.array(list(self.codes[column].keys()), type=pa.string())))
+        for column in ['time:start', 'time:end']:
+            us = np.round(np.array(self.batch[column], dtype=np.float64) * 1e6).astype(np.int64)
+            columns.append(pa.array(us, type=pa.int64()).cast(pa.timestamp('us', tz='UTC')))
+        self.writer.write_batch(pa.record_batch(columns, schema=self.schema))
+
+        for values in self.batch.values():
+            values.clear()
+
+    def Write(self, case, events):
+        super().Write(case, events)
+        caseCode = self.__Encode('case', str(case))
+        for e in events:
+            self.batch['case'].append(caseCode)
+            self.batch['concept:name'].append(self.__Encode('concept:name', str(e[0])))
+            self.batch['org:resource'].append(self.__Encode('org:resource', str(e[1])))
+            self.batch['time:start'].append(e[2])
+            self.batch['time:end'].append(e[3])
+        if len(self.batch['case']) >= self.batchSize:
+            self.__Flush()
+
+    def Close(self):
+        if self.writer is None:
+            return
+        self.__Flush()
+        self.writer.close()
+        self.writer = None
+        if not IsParquet(self.path):
+            self.sinkFile.close()
+        os.replace(self.tmpPath, self.path)
+
+
+def IsParquet(path) -> bool:
+    return path.lower().endswith('.parquet')
+
+def IsColumnar(path) -> bool:
+    """Parquet (.parquet) or Arrow IPC (.feather, .arrow)"""
+    return path.lower().endswith(('.parquet', '.feather', '.arrow'))
+
+
+def OpenSink(path, startEnd=False, timestamp='time:end') -> TraceSink:
+    """Sink for the format given by the file ending: .parquet, .feather/.arrow, .csv or .xes (anything else), the text formats optionally gzipped (.gz).
+    'timestamp' is the column of the exported timestamp for the columnar formats, which always keep start and end"""
+    if IsColumnar(path):
+        return ColumnarSink(path, timestamp)
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.lower().endswith('.csv'):
+        return CSVSink(path, startEnd)
+    return XESSink(path, startEnd)
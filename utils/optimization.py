@@ -1,9 +1,27 @@
 
 import time
+import copy
+import heapq
+from collections import OrderedDict
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import networkx as nx
-from simulation.objects.enums import OptimizationModes
+import numpy as np
+from simulation.objects.enums import OptimizationModes, SolverBackends
 import random
 
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import maximum_bipartite_matching
+except ImportError:
+    linear_sum_assignment = None
+    maximum_bipartite_matching = None
+
+# Components of the scheduling network with fewer cases are not worth sending to the pool
+COMPONENT_POOL_MIN_CASES = 50
+
 def SimulatorTestScheduling(simulatorState, availableResources, fRatio, cRatio):
     """Schedule exactly like in the original log to see how it's going - Test this with scheduling every single timestep, not window based!"""
     
@@ -24,7 +42,14 @@ def SimulatorTestScheduling(simulatorState, availableResources, fRatio, cRatio):
         
         
 
-def OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio, timeAwareButNotOptimal=False):
+def OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio, timeAwareButNotOptimal=False, solver=SolverBackends.NETWORK_FLOW, warmStart=None, pool=None, topK=None, budget=None, cache=None, fairnessCoefficient=0.5, congestionCoefficient=0.5):
+    """'warmStart' is the IncrementalAssignment kept between the windows when using the INCREMENTAL solver.
+    If a 'pool' is given, the independent components of the network are solved separately, large ones in the pool.
+    If 'topK' is given, only the k best edges of each case (and those needed for a maximum matching) are part of the network.
+    If a 'budget' (SolverBudget) is given, it decides on the solver and falls back to a greedy assignment if the solver overruns.
+    If a 'cache' (ScheduleCache) is given, networks that have been solved before are not solved again (unit capacities only).
+    The coefficients weight the normalized fairness and congestion ratios in OptimizationModes.BOTH.
+    If the simulator plans several windows at once ('PlanningHorizon'), resources can be assigned to as many cases as they are expected to finish in the horizon"""
     # Parameter extraction
     activeTraces     = simulatorState['ActiveTraces']
     AtoR             = simulatorState['AtoR']
@@ -33,20 +58,21 @@ def OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio, tim
     optimizationMode = simulatorState['OptimizationMode']
     simulationMode   = simulatorState['SimulationMode']
     timestampMode    = simulatorState['TimestampMode']
+    horizon          = simulatorState.get('PlanningHorizon', 1)
+    horizonDuration  = simulatorState.get('PlanningHorizonDuration', windowDuration)
+    
+    # Predicted duration of the next activity of each case, used to fill the planning horizon {case: duration}
+    # Only waiting cases are planned, their remaining time is the whole next activity. Running activities enter via the free time of their resource
+    horizonDurations = {}
     
     # These are activity-resource schedulings, where only one resource is able to perform the activity => Hence, no need to add graph nodes
     singleResponsibilitySchedule = {}
-        
-    G = nx.DiGraph()
-                        
-    skipNoTraces = True
-    skipNoResources = True
-    totalActivityDuration = 0
     
-    if timeAwareButNotOptimal:
-        startArcCapacity = windowDuration
-    else:
-        startArcCapacity = 1
+    # Cases that have a choice of resources [(case, nextActivityDuration, [(res, weight) ...]) ...]
+    candidates = []
+    
+    # Cases whose edge weights are calculated together in OptimizationModes.BOTH [(case, nextActivityDuration, segment, ableResources) ...]
+    combinedCostCases = []
         
     for trace in activeTraces:
         # Skip traces that are still processing
@@ -55,6 +81,8 @@ def OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio, tim
         
         nextActivity = trace.GetNextActivity(simulationMode)
         nextActivityDuration = trace.GetNextActivityTime(simulationMode, timestampMode)
+        if horizon > 1:
+            horizonDurations[trace.case] = min(nextActivityDuration, horizonDuration) if nextActivityDuration > 0 else windowDuration
         
         # Either the activity takes more than one window or a duration could not be determined
         if nextActivityDuration > windowDuration or nextActivityDuration == 0:
@@ -68,55 +96,750 @@ def OptimizeActiveTraces(simulatorState, availableResources, fRatio, cRatio, tim
         ableResources = AtoR[nextActivity]
         if len(ableResources) == 1:
             singleResponsibilitySchedule[trace.case] = {'StartTime': simTime, 'Resource': ableResources[0] } 
+        elif optimizationMode == OptimizationModes.BOTH:
+            s = (None, nextActivity)
+            if len(trace.history) > 0:
+                s = (trace.history[-1][3][0], nextActivity)
+            combinedCostCases.append((trace.case, nextActivityDuration, s, ableResources))
         else:
-            skipNoTraces = False
-            G.add_edge('s', 'c' + trace.case, capacity = startArcCapacity) # Factor smaller than cRatio/fRatio, only steer
-            totalActivityDuration += int(nextActivityDuration) + 1
-            
+            edges = []
             for r in ableResources:
                 if optimizationMode == OptimizationModes.FAIRNESS and fRatio[r] > 0:
                     # Multiply the weights by a large constant factor and round => Doc says floating points can cause issues: https://networkx.org/documentation/stable/reference/algorithms/generated/networkx.algorithms.flow.max_flow_min_cost.html#networkx.algorithms.flow.max_flow_min_cost
-                    G.add_edge('c' + trace.case, r, weight = -int(100000 * fRatio[r]), capacity = int(nextActivityDuration) + 1)
+                    edges.append((r, -int(100000 * fRatio[r])))
                 elif optimizationMode == OptimizationModes.CONGESTION:
                     s = (None, nextActivity)
                     if len(trace.history) > 0:
                         s = (trace.history[-1][3][0], nextActivity)
                     if cRatio[s] > 0:
-                        G.add_edge('c' + trace.case, r, weight = -int(100000 * cRatio[s]), capacity = int(nextActivityDuration) + 1)
-                elif optimizationMode == OptimizationModes.BOTH:
-                    # ??? Normalizing, Scaling and weighting cRatio and fRatio ????
-                    continue
-            
-    for r in availableResources:
-        skipNoResources = False        
-        if timeAwareButNotOptimal:
-            G.add_edge(r, 'd', capacity = windowDuration)
+                        edges.append((r, -int(100000 * cRatio[s])))
+            candidates.append((trace.case, nextActivityDuration, edges))
+    
+    if optimizationMode == OptimizationModes.BOTH:
+        candidates = CombinedCostCandidates(combinedCostCases, fRatio, cRatio, fairnessCoefficient, congestionCoefficient)
+    
+    if len(candidates) == 0 or len(availableResources) == 0:
+        return singleResponsibilitySchedule # Schedule {caseid:resource}
+    
+    # Time aware capacities already cover the horizon
+    useSlots = horizon > 1 and not timeAwareButNotOptimal
+    if useSlots:
+        candidates, availableResources = HorizonSlots(candidates, availableResources, horizonDurations)
+    
+    if topK is not None:
+        fTimeStart = time.time()
+        totalEdges = sum([len(x[2]) for x in candidates])
+        candidates = PruneCandidates(candidates, availableResources, topK)
+        if simulatorState['Verbose']:
+            print(f"    - Pruned candidate edges to top-{topK}: {sum([len(x[2]) for x in candidates])} of {totalEdges} kept, took: {time.time() - fTimeStart}s")
+    
+    # The warm start covers the whole network, time aware capacities couple all components via the collecting node
+    if pool is not None and solver != SolverBackends.INCREMENTAL and not timeAwareButNotOptimal:
+        solve = lambda engine: ResolveComponents(candidates, availableResources, simTime, windowDuration, engine, pool)
+    else:
+        solve = lambda engine: SolveCandidates(candidates, availableResources, simTime, windowDuration, timeAwareButNotOptimal, engine, warmStart)
+    
+    warmState = {}
+    if budget is not None:
+        solveWithBudget = solve
+        if warmStart is not None:
+            # An overrun solve goes on in its thread, hence it works on a copy of the warm start which is only taken over if it finished in time
+            def solveWithBudget(engine):
+                warmState['Copy'] = copy.deepcopy(warmStart)
+                return SolveCandidates(candidates, availableResources, simTime, windowDuration, timeAwareButNotOptimal, engine, warmState['Copy'])
+        solve = lambda engine: budget.Solve(candidates, availableResources, simTime, solveWithBudget, engine, not timeAwareButNotOptimal)
+    
+    # Time aware networks take their capacities from the window duration and the cases may be split over several resources when decoded,
+    # a cached decode of one window is not necessarily feasible in the next one
+    if cache is not None and not timeAwareButNotOptimal:
+        cacheable = lambda: budget is None or not budget.lastFallback
+        schedule = cache.Solve(candidates, availableResources, simTime, lambda: solve(solver), cacheable)
+    else:
+        schedule = solve(solver)
+    
+    if 'Copy' in warmState and not budget.lastFallback:
+        warmStart.Adopt(warmState['Copy'])
+    
+    if useSlots:
+        schedule = {case: {'StartTime': x['StartTime'], 'Resource': x['Resource'][0]} for case, x in schedule.items()}
+    return {**schedule, **singleResponsibilitySchedule}
+
+def CombinedCostCandidates(combinedCostCases, fRatio, cRatio, fairnessCoefficient, congestionCoefficient):
+    """Candidates of OptimizationModes.BOTH, the weights of all case-resource edges are calculated in one pass.
+    Fairness (fRatio[r]) and congestion (cRatio[(last,next)]) ratios are normalized by their maximum over all edges and weighted by the coefficients"""
+    if len(combinedCostCases) == 0:
+        return []
+    
+    counts = np.array([len(x[3]) for x in combinedCostCases], dtype=np.int64)
+    resources = [r for x in combinedCostCases for r in x[3]]
+    fairness   = np.array([fRatio[r] for r in resources], dtype=np.float64)
+    congestion = np.repeat(np.array([cRatio[x[2]] for x in combinedCostCases], dtype=np.float64), counts)
+    
+    combined = np.zeros(len(resources))
+    if len(resources) > 0 and np.abs(fairness).max() > 0:
+        combined += fairnessCoefficient * fairness / np.abs(fairness).max()
+    if len(resources) > 0 and np.abs(congestion).max() > 0:
+        combined += congestionCoefficient * congestion / np.abs(congestion).max()
+    
+    # Same scaling as the single modes, only edges with a positive ratio are added
+    weights = (-100000 * combined).astype(np.int64).tolist()
+    keep = (combined > 0).tolist()
+    
+    candidates = []
+    start = 0
+    for (case, nextActivityDuration, _, _), n in zip(combinedCostCases, counts.tolist()):
+        candidates.append((case, nextActivityDuration, [(resources[k], weights[k]) for k in range(start, start + n) if keep[k]]))
+        start += n
+    return candidates
+
+def SolveCandidates(candidates, availableResources, simTime, windowDuration, timeAwareButNotOptimal, solver, warmStart=None):
+    # Unit capacities turn the flow network into a bipartite matching
+    schedule = None
+    if solver == SolverBackends.INCREMENTAL and warmStart is not None and not timeAwareButNotOptimal:
+        schedule = warmStart.Solve(candidates, availableResources, simTime)
+    elif solver in [SolverBackends.ASSIGNMENT, SolverBackends.INCREMENTAL] and not timeAwareButNotOptimal:
+        schedule = ResolveAssignment(candidates, availableResources, simTime)
+    elif solver == SolverBackends.GREEDY:
+        schedule = ResolveGreedy(candidates, availableResources, simTime)
+    
+    if schedule is not None:
+        return schedule
+    
+    network = FlowNetwork(candidates, availableResources, windowDuration, timeAwareButNotOptimal)
+    return ResolveNetwork(network, simTime)
+
+def PruneCandidates(candidates, availableResources, k):
+    """Keep the edges to available resources only, and of those the k with the lowest weight per case.
+    The edges of one maximum matching of the unpruned graph are kept as well, hence the maximum number of assignments can still be found"""
+    available = [(case, duration, [e for e in edges if e[0] in availableResources]) for case, duration, edges in candidates]
+    pruned    = [(case, duration, heapq.nsmallest(k, edges, key=lambda x: x[1])) for case, duration, edges in available]
+    
+    if all([len(x[2]) == len(y[2]) for x, y in zip(pruned, available)]):
+        return pruned
+    
+    for (_, _, edges), (_, _, allEdges), r in zip(pruned, available, MaximumMatching(available, availableResources)):
+        if r is not None and r not in [e[0] for e in edges]:
+            edges.append(next(e for e in allEdges if e[0] == r))
+    return pruned
+
+def MaximumMatching(candidates, availableResources):
+    """Resource of each candidate in a maximum cardinality matching (ignoring the weights), None if unassigned"""
+    resources = list(availableResources)
+    
+    if maximum_bipartite_matching is not None:
+        rows, cols, _ = CandidateEdgeArrays(candidates, resources)
+        graph = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(candidates), len(resources)))
+        matching = maximum_bipartite_matching(graph, perm_type='column')
+        return [resources[j] if j >= 0 else None for j in matching]
+    
+    G = nx.Graph()
+    G.add_nodes_from([('c', i) for i in range(len(candidates))])
+    G.add_nodes_from([('r', r) for r in resources])
+    G.add_edges_from([(('c', i), ('r', r)) for i, (_, _, edges) in enumerate(candidates) for r, _ in edges])
+    matching = nx.bipartite.hopcroft_karp_matching(G, top_nodes=[('c', i) for i in range(len(candidates))])
+    return [matching[('c', i)][1] if ('c', i) in matching else None for i in range(len(candidates))]
+
+##############################################
+#############                    #############
+##########     ROLLING HORIZON      ##########
+#############                    #############
+##############################################
+def HorizonSlots(candidates, availableResources, durations):
+    """Split each available resource into slots (r, k), one for every case it is expected to finish during the planning horizon.
+    The number of slots is the free time of the resource divided by the mean predicted duration of the cases it can take (at least one, at most that number of cases).
+    The returned network still has unit capacities, hence all solvers can plan the horizon in a single solve"""
+    demand = {}
+    for case, _, edges in candidates:
+        for r, _ in edges:
+            demand.setdefault(r, []).append(durations[case])
+    
+    slots = {}
+    for r, freeTime in availableResources.items():
+        caseDurations = demand.get(r, [])
+        if len(caseDurations) == 0:
+            slots[r] = 1
         else:
-            G.add_edge(r, 't', capacity = 1)
+            meanDuration = max(1, sum(caseDurations) / len(caseDurations))
+            slots[r] = max(1, min(len(caseDurations), int(freeTime // meanDuration)))
+    
+    slotResources  = {(r, k): freeTime for r, freeTime in availableResources.items() for k in range(slots[r])}
+    slotCandidates = [(case, duration, [((r, k), weight) for r, weight in edges for k in range(slots.get(r, 1))]) for case, duration, edges in candidates]
+    return slotCandidates, slotResources
+
+##############################################
+#############                    #############
+##########      FLOW NETWORK        ##########
+#############                    #############
+##############################################
+class FlowNetwork:
+    """Scheduling network with dense integer node ids taken from index tables of the cases and resources.
+    Node ids: 0 source, 1 sink, 2 collecting node (time aware only), then the cases, then the resources.
+    The case-resource edges are arrays grouped by case (CSR: the edges of case i are indptr[i] to indptr[i+1], COO: rows/cols), the edges
+    from the source and to the sink follow from the node ranges"""
+    SOURCE  = 0
+    SINK    = 1
+    COLLECT = 2
+    
+    def __init__(self, candidates, availableResources, windowDuration, timeAwareButNotOptimal):
+        self.cases     = [case for case, _, _ in candidates]
+        self.resources = list(availableResources) # Available resources first, resources only referenced by edges (no capacity to the sink) afterwards
+        self.available = len(self.resources)
+        self.timeAware = timeAwareButNotOptimal
+        
+        resIndex = {r: j for j, r in enumerate(self.resources)}
+        rows, cols, weights = [], [], []
+        counts = np.zeros(len(candidates) + 1, dtype=np.int64)
+        for i, (_, _, edges) in enumerate(candidates):
+            counts[i + 1] = len(edges)
+            for r, weight in edges:
+                if r not in resIndex:
+                    resIndex[r] = len(self.resources)
+                    self.resources.append(r)
+                rows.append(i)
+                cols.append(resIndex[r])
+                weights.append(weight)
+        
+        self.indptr  = np.cumsum(counts)
+        self.rows    = np.array(rows, dtype=np.int64)
+        self.cols    = np.array(cols, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.int64)
+        
+        # For a MIP to be solvable as a flownetwork (LP-Relax.), the coeff. matrix needs to be TU! => Capacities are binary unless time aware
+        self.caseCapacity     = np.array([int(duration) + 1 for _, duration, _ in candidates], dtype=np.int64) # Of the edges leaving a case
+        self.sourceCapacity   = windowDuration if timeAwareButNotOptimal else 1 # Factor smaller than cRatio/fRatio, only steer
+        self.resourceCapacity = windowDuration if timeAwareButNotOptimal else 1
+        self.collectCapacity  = int(self.caseCapacity.sum())
     
-    # Collect multi-flows if not optimal
-    if timeAwareButNotOptimal:
-        G.add_edge('d', 't', capacity = totalActivityDuration)
+    def CaseNodes(self, i):
+        return 3 + i
     
-    if not skipNoTraces and not skipNoResources:
-        return {**ResolveNetwork(G, availableResources, simTime, timeAwareButNotOptimal), **singleResponsibilitySchedule}
-          
-    return singleResponsibilitySchedule # Schedule {caseid:resource}
+    def ResourceNodes(self, j):
+        return 3 + len(self.cases) + j
+    
+    def AvailableEdges(self):
+        """(rows, cols, weights) of the edges to available resources, cols index the available resources"""
+        mask = self.cols < self.available
+        return self.rows[mask], self.cols[mask], self.weights[mask]
+    
+    def ToNetworkX(self):
+        G = nx.DiGraph()
+        
+        caseNodes = self.CaseNodes(np.arange(len(self.cases))).tolist()
+        resNodes  = self.ResourceNodes(self.cols).tolist()
+        weights   = self.weights.tolist()
+        for i, c in enumerate(caseNodes):
+            G.add_edge(FlowNetwork.SOURCE, c, capacity = self.sourceCapacity)
+            capacity = int(self.caseCapacity[i])
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                G.add_edge(c, resNodes[k], weight = weights[k], capacity = capacity)
+        
+        # Collect multi-flows if not optimal
+        resourceSink = FlowNetwork.COLLECT if self.timeAware else FlowNetwork.SINK
+        for r in self.ResourceNodes(np.arange(self.available)).tolist():
+            G.add_edge(r, resourceSink, capacity = self.resourceCapacity)
+        if self.timeAware:
+            G.add_edge(FlowNetwork.COLLECT, FlowNetwork.SINK, capacity = self.collectCapacity)
+        
+        return G
+    
+    def Decode(self, edgeFlow, simTime):
+        """Schedule from the flows of the case-resource edges (same order as rows/cols)"""
+        # Exclude flows that are floating point errors, the remaining edges are still grouped by case
+        used = np.nonzero(edgeFlow > 0.1)[0]
+        cases, first, counts = np.unique(self.rows[used], return_index=True, return_counts=True)
+        resources = self.cols[used].tolist()
+        
+        # In case multiple assignments exist, we are in a time aware scenario which is not guaranteed to be optimal, hence => pick one of the assigned resources randomly
+        schedule = {}
+        for i, f, n in zip(cases.tolist(), first.tolist(), counts.tolist()):
+            j = resources[f] if n == 1 else random.choice(resources[f:f + n])
+            schedule[self.cases[i]] = {'StartTime': simTime, 'Resource': self.resources[j]}
+        return schedule
 
-def ResolveNetwork(G, availableResources, simTime, timeAwareButNotOptimal):
-    M = nx.max_flow_min_cost(G, 's', 't')
+def ResolveNetwork(network, simTime):
+    M = nx.max_flow_min_cost(network.ToNetworkX(), FlowNetwork.SOURCE, FlowNetwork.SINK)
     
-    # Remove unecessary nodes
-    del M['s']
-    del M['t']    
+    caseNodes = network.CaseNodes(network.rows).tolist()
+    resNodes  = network.ResourceNodes(network.cols).tolist()
+    edgeFlow  = np.fromiter((M[c][r] for c, r in zip(caseNodes, resNodes)), dtype=np.float64, count=len(caseNodes))
+    return network.Decode(edgeFlow, simTime)
+
+def CandidateEdgeArrays(candidates, resources):
+    """Edges of the candidates as arrays (rows, cols, weights), rows index 'candidates' and cols index 'resources'.
+    Edges to resources that are not available cannot carry flow and are dropped"""
+    return FlowNetwork(candidates, resources, 1, False).AvailableEdges()
+
+
+
+##############################################
+#############                    #############
+##########   NETWORK COMPONENTS     ##########
+#############                    #############
+##############################################
+def CreateComponentPool(workers):
+    """Processes solving the components, threads if already running inside a (daemonic) multi-simulation worker which cannot have children"""
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(workers)
+    return ProcessPoolExecutor(workers)
+
+def SplitComponents(candidates, availableResources):
+    """Connected components of the graph of cases and the available resources they have edges to [(candidates, resources) ...].
+    Cases without any of those edges cannot be assigned and are dropped"""
+    parent = {r: r for r in availableResources}
+    
+    def Find(r):
+        while parent[r] != r:
+            parent[r] = parent[parent[r]]
+            r = parent[r]
+        return r
+    
+    caseResources = []
+    for candidate in candidates:
+        resources = [r for r, _ in candidate[2] if r in parent]
+        caseResources.append(resources)
+        for r in resources[1:]:
+            parent[Find(r)] = Find(resources[0])
+    
+    components = {} # {root: ([candidate ...], [res ...])}
+    for candidate, resources in zip(candidates, caseResources):
+        if len(resources) > 0:
+            components.setdefault(Find(resources[0]), ([], []))[0].append(candidate)
     for r in availableResources:
-        del M[r]
-    if timeAwareButNotOptimal:
-        del M['d']
+        if Find(r) in components:
+            components[Find(r)][1].append(r)
+    
+    return list(components.values())
+
+def ResolveComponents(candidates, availableResources, simTime, windowDuration, solver, pool):
+    """Solve the components of the unit-capacity network separately (same objective value as solving the whole network).
+    Activities are often performed by disjoint groups of resources, the resulting components are solved inline if small and in the pool otherwise"""
+    components = SplitComponents(candidates, availableResources)
+    if len(components) == 1:
+        return SolveCandidates(components[0][0], components[0][1], simTime, windowDuration, False, solver)
+    
+    schedule = {}
+    futures  = []
+    for compCandidates, compResources in components:
+        if len(compCandidates) < COMPONENT_POOL_MIN_CASES:
+            schedule.update(SolveCandidates(compCandidates, compResources, simTime, windowDuration, False, solver))
+        else:
+            futures.append(pool.submit(SolveCandidates, compCandidates, compResources, simTime, windowDuration, False, solver))
+    
+    for future in futures:
+        schedule.update(future.result())
+    return schedule
+
+##############################################
+#############                    #############
+##########   BIPARTITE ASSIGNMENT   ##########
+#############                    #############
+##############################################
+def AssignmentPenalty(weights, k):
+    """Cost of leaving a case unassigned: larger than any weight difference of two matchings of at most k edges, such that the number of real assignments is maximized first"""
+    return k * (int(np.abs(weights).max()) + 1) + 1
+
+def ResolveAssignment(candidates, availableResources, simTime):
+    """Solve the unit-capacity network as rectangular weighted bipartite matching between cases and available resources.
+    Same objective as max_flow_min_cost: the maximum number of assignments and among those the minimum total weight.
+    Returns None if the backend is not available or the weights are too large to be solved exactly, the flow network has to be used then"""
+    if linear_sum_assignment is None:
+        return None
+    
+    resources = list(availableResources)
+    rows, cols, weights = CandidateEdgeArrays(candidates, resources)
+    if len(rows) == 0:
+        return {}
+    
+    # Dense cost matrix on the cases and resources having at least one edge
+    usedRows, rows = np.unique(rows, return_inverse=True)
+    usedCols, cols = np.unique(cols, return_inverse=True)
     
-    ## Extract the scheduled flows
-    # Use lambda to exclude assignments that are floating point errors
-    f = lambda x: [res for res, val in x.items() if val > 0.1]
+    # Missing edges are penalized like leaving the case unassigned
+    k = min(len(usedRows), len(usedCols))
+    penalty = AssignmentPenalty(weights, k)
+    if k * penalty >= 2**53:
+        return None # Not exactly representable as float64
     
-    # In case multiple assignments exist, we are in a time aware scenario which is not guaranteed to be optimal, hence => pick one of the assigned resources randomly
-    return {case[1:]: {'StartTime': simTime, 'Resource': random.choice(f(res))} for case, res in M.items() if len(f(res)) > 0}
+    cost = np.full((len(usedRows), len(usedCols)), penalty, dtype=np.float64)
+    isEdge = np.zeros(cost.shape, dtype=bool)
+    cost[rows, cols]   = weights
+    isEdge[rows, cols] = True
+    
+    rowInd, colInd = linear_sum_assignment(cost)
+    
+    return {candidates[usedRows[i]][0]: {'StartTime': simTime, 'Resource': resources[usedCols[j]]} for i, j in zip(rowInd, colInd) if isEdge[i, j]}
+
+
+
+def ResolveGreedy(candidates, availableResources, simTime):
+    """Assign the edges in order of their weight (lowest first) as long as case and resource are unassigned, not optimal but fast.
+    One resource per case, hence also a feasible (but not time aware) schedule for time aware networks"""
+    edges = sorted([(weight, i, r) for i, (_, _, caseEdges) in enumerate(candidates) for r, weight in caseEdges if r in availableResources], key=lambda x: (x[0], x[1]))
+    
+    schedule = {}
+    usedResources = set()
+    for _, i, r in edges:
+        case = candidates[i][0]
+        if case not in schedule and r not in usedResources:
+            schedule[case] = {'StartTime': simTime, 'Resource': r}
+            usedResources.add(r)
+    return schedule
+
+def ScheduleObjective(schedule, candidates):
+    """(number of assigned cases, total weight) of a schedule, the network maximizes the first and minimizes the second"""
+    weights = {(case, r): weight for case, _, edges in candidates for r, weight in edges}
+    return (len(schedule), sum([weights[(case, x['Resource'])] for case, x in schedule.items()]))
+
+
+
+##############################################
+#############                    #############
+##########   SOLVER TIME BUDGET     ##########
+#############                    #############
+##############################################
+class SolverBudget:
+    """Time budget of the scheduling solver per window.
+    The engine is chosen by the problem size and the past solve times: the configured solver, the assignment (same objective) if the network
+    solver is expected to overrun, or the greedy assignment if all are. If the solve overruns nevertheless, the greedy assignment is used as anytime
+    result, the late result of the solver is only used to record the objective gap.
+    The budget bounds the time the simulation waits for a schedule, not the time spent solving: an overrun solve can not be stopped, it keeps running in a
+    background thread (and competes for the GIL) until it is done, no other solve is started meanwhile"""
+    
+    def __init__(self, budget, verbose=False):
+        self.budget    = budget  # Seconds per window
+        self.verbose   = verbose
+        self.rates     = {}      # {engine: seconds per edge} - Moving average of past solves
+        self.running   = None    # Thread of an overrun solve, no other solve is started until it is done
+        self.lock      = threading.Lock()
+        self.fallbacks = []      # [{'Time', 'Reason', 'Engine', 'Greedy', 'Exact', 'Error'} ...] - 'Exact' is None until the overrun solve is done (or if never solved / failed)
+        self.lastFallback = False
+    
+    def __Estimate(self, engine, size):
+        rate = self.rates.get(engine)
+        return 0 if rate is None else rate * size
+    
+    def __Learn(self, engine, size, duration):
+        """Only with the lock held, overrun solves learn from their thread"""
+        rate = duration / size
+        self.rates[engine] = rate if engine not in self.rates else 0.7 * self.rates[engine] + 0.3 * rate
+    
+    def __Fallback(self, simTime, reason, engine, greedy, candidates, result=None):
+        self.lastFallback = True
+        record = {'Time': simTime, 'Reason': reason, 'Engine': engine, 'Greedy': ScheduleObjective(greedy, candidates), 'Exact': None, 'Error': None}
+        with self.lock:
+            self.fallbacks.append(record)
+            if result is not None:
+                result['Record'] = record
+                if 'Schedule' in result:
+                    record['Exact'] = ScheduleObjective(result['Schedule'], candidates)
+                record['Error'] = result.get('Error')
+        
+        if self.verbose:
+            print(f"    - Solver budget of {self.budget}s: Greedy assignment used at simtime {simTime} ({reason}, {engine})")
+        return greedy
+    
+    def Solve(self, candidates, availableResources, simTime, solve, solver, unitCapacity):
+        """'solve(engine)' returns the schedule of the candidates using the engine"""
+        fTimeStart = time.time()
+        self.lastFallback = False
+        size = sum([len(x[2]) for x in candidates]) + len(candidates)
+        greedy = ResolveGreedy(candidates, availableResources, simTime)
+        
+        engines = [solver]
+        if solver == SolverBackends.NETWORK_FLOW and unitCapacity:
+            engines.append(SolverBackends.ASSIGNMENT)
+        remaining = self.budget - (time.time() - fTimeStart)
+        engine = next((e for e in engines if self.__Estimate(e, size) <= remaining), None)
+        
+        if self.running is not None and self.running.is_alive():
+            return self.__Fallback(simTime, 'busy', solver, greedy, candidates)
+        if engine is None:
+            # Decay the estimates such that the solvers are tried again from time to time
+            with self.lock:
+                for e in engines:
+                    if e in self.rates:
+                        self.rates[e] *= 0.95
+            return self.__Fallback(simTime, 'predicted', engines[-1], greedy, candidates)
+        
+        result = {}
+        def Run():
+            start = time.time()
+            try:
+                schedule = solve(engine)
+            except Exception as e:
+                with self.lock:
+                    result['Error'] = e
+                    if 'Record' in result:
+                        result['Record']['Error'] = e
+                return
+            
+            with self.lock:
+                self.__Learn(engine, size, time.time() - start)
+                result['Schedule'] = schedule
+                if 'Record' in result:
+                    result['Record']['Exact'] = ScheduleObjective(schedule, candidates)
+        
+        thread = threading.Thread(target=Run, daemon=True)
+        thread.start()
+        thread.join(max(remaining, 0))
+        
+        if not thread.is_alive():
+            if 'Error' in result:
+                raise result['Error']
+            return result['Schedule']
+        
+        self.running = thread
+        return self.__Fallback(simTime, 'overrun', engine, greedy, candidates, result)
+    
+    def Summary(self) -> str:
+        known   = [x for x in self.fallbacks if x['Exact'] is not None]
+        failed  = [x for x in self.fallbacks if x['Error'] is not None]
+        reasons = {reason: len([x for x in self.fallbacks if x['Reason'] == reason]) for reason in ['predicted', 'overrun', 'busy']}
+        
+        lostAssignments = sum([x['Exact'][0] - x['Greedy'][0] for x in known])
+        lostWeight      = sum([x['Greedy'][1] - x['Exact'][1] for x in known])
+        return (f"Solver budget: {len(self.fallbacks)} greedy fallbacks {reasons}, "
+                f"objective gap of the {len(known)} with a late solver result: {lostAssignments} fewer assignments, {lostWeight} more weight"
+                + "".join([f"\n    - Overrun solve at simtime {x['Time']} failed: {x['Error']!r}" for x in failed]))
+
+##############################################
+#############                    #############
+##########     SCHEDULE CACHE       ##########
+#############                    #############
+##############################################
+class ScheduleCache:
+    """LRU cache of solved networks for recurring queue states.
+    Cases with the same duration and edges (same next activity, same weights) are interchangeable, the key is the multiset of these signatures
+    and the available resources. The cached value holds the resources assigned to the slots of each signature, on a hit these are mapped to the cases.
+    Weights are divided by 'quantum' for the key, with a quantum of 1 the network of a hit is identical (same objective value).
+    Only for unit capacities, where the window duration does not change the network, time aware networks are not cached"""
+    
+    def __init__(self, size, quantum=1):
+        self.size    = size
+        self.quantum = quantum
+        self.entries = OrderedDict() # {key: ((resource or None ...) per signature)}
+        
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+    
+    def __Groups(self, candidates, availableResources):
+        """Key and the cases of each signature (in order of the key)"""
+        groups = {}
+        for case, duration, edges in candidates:
+            signature = (duration, tuple([(r, weight // self.quantum) for r, weight in edges if r in availableResources]))
+            groups.setdefault(signature, []).append(case)
+        
+        signatures = sorted(groups.keys())
+        key = (tuple(sorted(availableResources)), tuple([(x, len(groups[x])) for x in signatures]))
+        return key, [groups[x] for x in signatures]
+    
+    def Solve(self, candidates, availableResources, simTime, solve, cacheable=None):
+        """'solve()' returns the schedule of the candidates if it is not cached, it is only stored if 'cacheable()' is True (e.g. not for fallbacks)"""
+        key, groups = self.__Groups(candidates, availableResources)
+        
+        slots = self.entries.get(key)
+        if slots is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return {case: {'StartTime': simTime, 'Resource': r} for cases, resources in zip(groups, slots) for case, r in zip(cases, resources) if r is not None}
+        
+        self.misses += 1
+        schedule = solve()
+        if cacheable is not None and not cacheable():
+            return schedule
+        
+        self.entries[key] = tuple([tuple([schedule[case]['Resource'] if case in schedule else None for case in cases]) for cases in groups])
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return schedule
+    
+    def HitRate(self) -> float:
+        return self.hits / max(1, self.hits + self.misses)
+    
+    def Summary(self) -> str:
+        return f"Schedule cache: {self.hits} hits, {self.misses} misses (hit rate {100 * self.HitRate():.1f}%), {self.evictions} evictions, {len(self.entries)} of {self.size} entries used"
+
+##############################################
+#############                    #############
+##########  INCREMENTAL SCHEDULING  ##########
+#############                    #############
+##############################################
+class IncrementalAssignment:
+    """Warm-started version of 'ResolveAssignment' for consecutive windows.
+    The matching and the dual prices (u of the cases, v of the resources) of the previous window are kept. Cases which arrived or whose edges changed
+    such that the duals are not feasible anymore lose their assignment, only those are re-optimized by shortest augmenting paths.
+    Dual feasibility: u[i] + v[j] <= cost[i,j] (equality if assigned), v[j] <= 0 (0 if unassigned), u[i] <= penalty (equality if unassigned)"""
+    
+    def __init__(self):
+        self.rowIndex = {}  # {case: row}
+        self.colIndex = {}  # {res: col}
+        self.cost     = np.zeros((0, 0))         # Edge weights, inf where there is no edge
+        self.u        = np.zeros(0)
+        self.v        = np.zeros(0)
+        self.col4row  = np.zeros(0, dtype=np.int64) # -1 if unassigned
+        self.row4col  = np.zeros(0, dtype=np.int64) # -1 if unassigned
+        self.penalty  = 0
+        
+        # Rows re-optimized in the last call
+        self.lastAugmented = 0
+    
+    def Reset(self):
+        self.__init__()
+    
+    def Adopt(self, other):
+        """Take over the state of another instance (e.g. a copy that was solved in a separate thread)"""
+        self.__dict__.update(other.__dict__)
+    
+    def Solve(self, candidates, availableResources, simTime):
+        """Same result as 'ResolveAssignment' (equal objective value), None if the weights are too large to be solved exactly"""
+        cases     = [case for case, _, _ in candidates]
+        resources = list(availableResources)
+        n, m = len(cases), len(resources)
+        
+        rows, cols, weights = CandidateEdgeArrays(candidates, resources)
+        cost = np.full((n, m), np.inf)
+        cost[rows, cols] = weights
+        
+        k = min(n, m)
+        if len(weights) > 0 and self.penalty < AssignmentPenalty(weights, k):
+            # Powers of two, such that the penalty (which invalidates unassigned cases) changes rarely
+            self.penalty = 2**AssignmentPenalty(weights, k).bit_length()
+        if k * self.penalty >= 2**52:
+            self.Reset()
+            return None # Not exactly representable as float64
+        P = self.penalty
+        
+        # Carry over the duals and the assignment of cases and resources that were already part of the previous window
+        oldRows = np.array([self.rowIndex.get(case, -1) for case in cases], dtype=np.int64)
+        oldCols = np.array([self.colIndex.get(res, -1) for res in resources], dtype=np.int64)
+        keptRows = np.nonzero(oldRows >= 0)[0]
+        keptCols = np.nonzero(oldCols >= 0)[0]
+        
+        u = np.zeros(n)
+        v = np.zeros(m)
+        u[keptRows] = self.u[oldRows[keptRows]]
+        v[keptCols] = self.v[oldCols[keptCols]]
+        
+        # Last entry maps the unassigned -1 to itself
+        newColOfOld = np.full(len(self.colIndex) + 1, -1, dtype=np.int64)
+        newColOfOld[oldCols[keptCols]] = keptCols
+        
+        col4row = np.full(n, -1, dtype=np.int64)
+        row4col = np.full(m, -1, dtype=np.int64)
+        prevCols = newColOfOld[self.col4row[oldRows[keptRows]]]
+        assigned = prevCols >= 0
+        assigned[assigned] = np.isfinite(cost[keptRows[assigned], prevCols[assigned]])
+        aRows, aCols = keptRows[assigned], prevCols[assigned]
+        col4row[aRows] = aCols
+        row4col[aCols] = aRows
+        
+        # Changed weights of assigned edges are absorbed either by the resource duals (weights depending on the resource, e.g. fairness)
+        # or by the case duals (weights depending on the case, e.g. congestion), whichever keeps more assignments feasible
+        delta = cost[aRows, aCols] - self.cost[oldRows[aRows], self.col4row[oldRows[aRows]]]
+        vCols = v.copy()
+        vCols[aCols] = np.minimum(v[aCols] + delta, 0)
+        uCols, uRows = u.copy(), u.copy()
+        uCols[aRows] = cost[aRows, aCols] - vCols[aCols]
+        uRows[aRows] = cost[aRows, aCols] - v[aCols]
+        if self.__Infeasible(cost, uCols, vCols, col4row, P).sum() < self.__Infeasible(cost, uRows, v, col4row, P).sum():
+            u, v = uCols, vCols
+        else:
+            u = uRows
+        
+        # Drop assignments until the duals are feasible, resources becoming unassigned need v = 0 which can make further assignments infeasible
+        while True:
+            v[(row4col < 0) & (v < 0)] = 0
+            infeasible = self.__Infeasible(cost, u, v, col4row, P)
+            if not infeasible.any():
+                break
+            row4col[col4row[infeasible]] = -1
+            col4row[infeasible] = -1
+        
+        # Unassigned cases are settled if leaving them unassigned is tight, otherwise they have to be re-optimized
+        unassigned = np.nonzero(col4row < 0)[0]
+        if m > 0:
+            u[unassigned] = np.minimum(P, (cost[unassigned] - v).min(axis=1))
+        else:
+            u[unassigned] = P
+        free = unassigned[u[unassigned] < P]
+        
+        self.rowIndex = {case: i for i, case in enumerate(cases)}
+        self.colIndex = {res: j for j, res in enumerate(resources)}
+        self.cost, self.u, self.v, self.col4row, self.row4col = cost, u, v, col4row, row4col
+        self.lastAugmented = len(free)
+        
+        for i in free:
+            self.__Augment(i)
+        
+        return {cases[i]: {'StartTime': simTime, 'Resource': resources[j]} for i, j in enumerate(self.col4row) if j >= 0}
+    
+    def __Infeasible(self, cost, u, v, col4row, P):
+        """Assigned rows violating dual feasibility"""
+        infeasible = (col4row >= 0) & (u > P)
+        if cost.shape[1] > 0:
+            infeasible |= (col4row >= 0) & ((cost - u[:, None] - v[None, :]).min(axis=1) < 0)
+        return infeasible
+    
+    def __Augment(self, i0):
+        """Shortest augmenting path from the unassigned row i0 on the reduced costs (Dijkstra). Paths end in an unassigned resource
+        or in leaving a row unassigned at the cost of the penalty"""
+        cost, u, v, col4row, row4col, P = self.cost, self.u, self.v, self.col4row, self.row4col, self.penalty
+        
+        m = cost.shape[1]
+        dist    = np.full(m, np.inf)
+        pred    = np.full(m, -1, dtype=np.int64)
+        scanned = np.zeros(m, dtype=bool)
+        scannedRows = []
+        
+        dummyDist, dummyRow = np.inf, -1
+        minVal, i, sink = 0, i0, -1
+        while True:
+            scannedRows.append(i)
+            reduced = minVal + cost[i] - u[i] - v
+            better = ~scanned & (reduced < dist)
+            dist[better] = reduced[better]
+            pred[better] = i
+            if minVal + P - u[i] < dummyDist:
+                dummyDist, dummyRow = minVal + P - u[i], i
+            
+            remaining = np.where(scanned, np.inf, dist)
+            lowest = remaining.min()
+            if lowest > dummyDist or lowest == np.inf:
+                minVal = dummyDist
+                break
+            
+            # Prefer unassigned resources on ties
+            ties = np.nonzero(remaining == lowest)[0]
+            free = ties[row4col[ties] < 0]
+            j = free[0] if len(free) > 0 else ties[0]
+            
+            minVal = lowest
+            scanned[j] = True
+            if row4col[j] < 0:
+                sink = j
+                break
+            i = row4col[j]
+        
+        # Update the duals
+        u[i0] += minVal
+        for r in scannedRows[1:]:
+            u[r] += minVal - dist[col4row[r]]
+        v[scanned] -= minVal - dist[scanned]
+        
+        # Leaving a row unassigned, its resource is the end of the path
+        if sink < 0:
+            if dummyRow == i0:
+                return
+            sink = col4row[dummyRow]
+            row4col[sink] = -1
+            col4row[dummyRow] = -1
+        
+        j = sink
+        while True:
+            r = pred[j]
+            row4col[j] = r
+            col4row[r], j = j, col4row[r]
+            if r == i0:
+                break
@@ -0,0 +1,73 @@
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from utils.logReader import EventColumns
+from simulation.objects.eventStore import EventStore
+
+# Blocks attached by this process, the arrays are only valid as long as their block is referenced
+attachedBlocks = []
+
+
+def ShareArray(array, blocks):
+    """Copy an array into a new shared memory block (appended to 'blocks'), returns the handle to attach to it"""
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    blocks.append(shm)
+    return (shm.name, array.shape, array.dtype.str)
+
+
+def AttachArray(handle):
+    """Read-only array on the shared memory block of a handle created by 'ShareArray'"""
+    name, shape, dtype = handle
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+
+        # The creating process owns the block, a resource tracker of the worker itself (not forked) would remove it once the worker ends
+        if multiprocessing.get_start_method() != 'fork':
+            resource_tracker.unregister(shm._name, 'shared_memory')
+    attachedBlocks.append(shm)
+
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    array.flags.writeable = False
+    return array
+
+
+def PublishLog(columns, store, blocks):
+    """Put the numeric columns of a parsed log (used for the windows) and its event store (used for the traces, including the calculated durations) into shared memory.
+    Returns a picklable handle for 'AttachLog', the names are small and copied to each worker"""
+    return {
+        'columns': {x: ShareArray(getattr(columns, x), blocks) for x in ['cid', 'ts']},
+        'order':      ShareArray(columns.Order(), blocks),
+        'caseNames':  columns.caseNames,
+        'store': {x: ShareArray(getattr(store, x), blocks) for x in ['offsets', 'act', 'res', 'ts', 'durations'] + ([] if store.lc is None else ['lc'])},
+        'cases':      store.cases,
+        'activities': store.activities,
+        'resources':  store.resources,
+        'lifecycles': store.lifecycles
+    }
+
+
+def AttachLog(handle):
+    """(columns, store) on the shared memory of a published log. The columns only hold the case ids and timestamps, which is all the windows need"""
+    columns = EventColumns(AttachArray(handle['columns']['cid']), None, None, AttachArray(handle['columns']['ts']), None, handle['caseNames'])
+    columns.order = AttachArray(handle['order'])
+
+    arrays = {x: AttachArray(h) for x, h in handle['store'].items()}
+    store = EventStore(handle['cases'], arrays['offsets'],
+                       handle['activities'], arrays['act'],
+                       handle['resources'], arrays['res'],
+                       arrays['ts'],
+                       handle['lifecycles'], arrays.get('lc'))
+    store.durations = arrays['durations']
+    return columns, store
+
+
+def ReleaseBlocks(blocks):
+    """Free the blocks created by this process once no worker needs them anymore"""
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+    blocks.clear()
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shlex
+import signal
+import time
+from datetime import datetime
+from multiprocessing.connection import wait
+
+
+class Sweep:
+    """Executor for the experiments of a multi-simulation config. Each experiment runs in its own process, such that it can be stopped when exceeding
+    its wall-clock or memory limit. Experiments are handed out longest-expected-first as soon as a process is free.
+    The outcome of every experiment is appended to a record file in the sweep directory, a restarted sweep skips the experiments recorded as done"""
+
+    def __init__(self, directory, cores, timeout=None, maxRSS=None, retries=0, verbose=False):
+        self.directory = directory
+        self.cores     = max(1, cores)
+        self.timeout   = timeout # Seconds per experiment
+        self.maxRSS    = maxRSS  # MB of private memory per experiment
+        self.retries   = retries # Additional attempts of experiments that crashed
+        self.verbose   = verbose
+        self.results   = {}      # {status: count} of this execution
+        self.skipped   = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def RunId(cmd) -> str:
+        """Stable id of an experiment, independent of the whitespace and quoting of its config line (split as by argsParse)"""
+        return hashlib.sha256(shlex.join(shlex.split(cmd)).encode('utf-8')).hexdigest()[:16]
+
+    def __Path(self, name):
+        return os.path.join(self.directory, name)
+
+    def Records(self):
+        """{run id: [record ...]} in the order they were written, a line cut off by a crash of the sweep is ignored"""
+        records = {}
+        if not os.path.exists(self.__Path('records.jsonl')):
+            return records
+
+        with open(self.__Path('records.jsonl'), 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records.setdefault(record['id'], []).append(record)
+        return records
+
+    def __Record(self, run, status, seconds, rss, attempt):
+        record = {'id': run['id'], 'cmd': run['cmd'], 'out': run['out'], 'status': status, 'seconds': round(seconds, 3), 'maxRSS': rss, 'attempt': attempt, 'finished': datetime.now().isoformat(timespec='seconds')}
+        with open(self.__Path('records.jsonl'), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.results[status] = self.results.get(status, 0) + 1
+        print(f"Sweep: {status} after {seconds:.1f}s ({run['cmd']})")
+
+    ##############################################
+    #############                    #############
+    ##########         MANIFEST         ##########
+    #############                    #############
+    ##############################################
+    def Manifest(self, experiments):
+        """Write the manifest of the experiments [(cmd, log path, out path) ...] and return the runs still to do, longest expected first.
+        The expected duration is the last recorded one, otherwise it is estimated from the size of the log"""
+        records = self.Records()
+        runs = []
+        for cmd, logPath, outPath in experiments:
+            runId = Sweep.RunId(cmd)
+            last  = records.get(runId, [])
+            runs.append({'id': runId, 'cmd': cmd, 'log': logPath, 'out': outPath,
+                         'size': os.path.getsize(logPath) if os.path.exists(logPath) else 0,
+                         'seconds': last[-1]['seconds'] if len(last) > 0 else None,
+                         'done': any([x['status'] == 'done' for x in last]) and os.path.exists(outPath)})
+
+        # Seconds per byte of log of the experiments already run
+        known = [x for x in runs if x['seconds'] is not None and x['size'] > 0]
+        rate  = sum([x['seconds'] for x in known]) / sum([x['size'] for x in known]) if len(known) > 0 else 1
+        for run in runs:
+            run['expected'] = run['seconds'] if run['seconds'] is not None else run['size'] * rate
+
+        tmp = self.__Path('manifest.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(runs, f, indent=1)
+        os.replace(tmp, self.__Path('manifest.json'))
+
+        # Partial output of an experiment that was stopped with the sweep (the simulator writes to '<out>.tmp' until it is done)
+        for run in runs:
+            if not run['done'] and os.path.exists(f"{run['out']}.tmp"):
+                os.remove(f"{run['out']}.tmp")
+                if self.verbose:
+                    print(f"Sweep: removed stale {run['out']}.tmp")
+
+        self.skipped = sum([x['done'] for x in runs])
+        if self.skipped > 0:
+            print(f"Sweep: skipping {self.skipped} of {len(runs)} experiments recorded as done in {self.directory}")
+        return sorted([x for x in runs if not x['done']], key=lambda x: -x['expected'])
+
+    ##############################################
+    #############                    #############
+    ##########         EXECUTION        ##########
+    #############                    #############
+    ##############################################
+    @staticmethod
+    def PrivateRSS(pid):
+        """Resident memory of a process in MB without the shared memory it mapped (e.g. the shared logs), None if unknown (no /proc)"""
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                status = {x.split(':')[0]: x.split()[1] for x in f if x.startswith(('VmRSS', 'RssShmem'))}
+        except (OSError, IndexError):
+            return None
+        if 'VmRSS' not in status:
+            return None
+        return (int(status['VmRSS']) - int(status.get('RssShmem', 0))) / 1024
+
+    @staticmethod
+    def __Stop(process, run):
+        process.kill()
+        process.join()
+        if os.path.exists(f"{run['out']}.tmp"):
+            os.remove(f"{run['out']}.tmp")
+
+    def Execute(self, runs, target, targetArgs=()):
+        """Run target(cmd, *targetArgs) for each run, at most 'cores' at the same time.
+        If the sweep itself is stopped (exception, SIGINT, SIGTERM), the running experiments are killed instead of being left behind"""
+        queue   = [(x, 1) for x in runs]
+        running = {} # {sentinel: (process, run, attempt, start, max rss)}
+
+        def Terminate(signum, frame):
+            raise SystemExit(128 + signum)
+        previousHandler = signal.signal(signal.SIGTERM, Terminate)
+        try:
+            self.__Execute(queue, running, target, targetArgs)
+        finally:
+            signal.signal(signal.SIGTERM, previousHandler)
+            for process, run, _, _, _ in running.values():
+                Sweep.__Stop(process, run)
+                print(f"Sweep: stopped {run['cmd']}")
+
+    def __Execute(self, queue, running, target, targetArgs):
+        while len(queue) > 0 or len(running) > 0:
+            # Hand out the next experiments to the free processes
+            while len(queue) > 0 and len(running) < self.cores:
+                run, attempt = queue.pop(0)
+                process = multiprocessing.Process(target=target, args=(run['cmd'],) + tuple(targetArgs))
+                process.start()
+                running[process.sentinel] = (process, run, attempt, time.time(), 0)
+                if self.verbose:
+                    print(f"Sweep: started {run['cmd']} (expected {run['expected']:.1f}, attempt {attempt})")
+
+            wait(list(running.keys()), timeout=1)
+
+            for sentinel, (process, run, attempt, start, rss) in list(running.items()):
+                seconds = time.time() - start
+                if process.is_alive():
+                    current = Sweep.PrivateRSS(process.pid)
+                    rss = max(rss, current or 0)
+                    running[sentinel] = (process, run, attempt, start, rss)
+
+                    status = 'timeout' if self.timeout is not None and seconds > self.timeout else ('memory' if self.maxRSS is not None and rss > self.maxRSS else None)
+                    if status is None:
+                        continue
+                    Sweep.__Stop(process, run)
+                else:
+                    process.join()
+                    status = 'done' if process.exitcode == 0 else 'failed'
+
+                del running[sentinel]
+                self.__Record(run, status, seconds, round(rss, 1), attempt)
+
+                # Crashes are retried, exceeding a limit would most likely happen again
+                if status == 'failed' and attempt <= self.retries:
+                    queue.insert(0, (run, attempt + 1))
+
+    def Summary(self) -> str:
+        return f"Sweep {self.directory}: {', '.join([f'{v} {k}' for k, v in self.results.items()]) or 'nothing to do'} / {self.skipped} skipped as already done"
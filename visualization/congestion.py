@@ -3,8 +3,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import math
-from utils.extractor import ts_to_int as GetIntTs
-from utils.EL_Helper import GetSegments, GetActivities, GetWindows
+from utils.EL_Helper import GetSegments, GetActivities, GetTransitions, GetWindows, ReadLog
 
 
 from time import time
@@ -52,33 +51,22 @@ def GetActiveSegments(log):
     segments = GetSegments(log)
     segmentTime = {w:{(a,b): 0 for (a,b) in segments} for w in windows}
             
-    for trace in log:
-        n = len(trace)
+    # Event columns (table logs) and pm4py logs alike
+    for lastAct, nextAct, _, lastTs, ts in GetTransitions(log):
+        w = GetWindowIndex(windows, ts)
         
-        lastAct = 'None'
-        lastTs = GetIntTs(trace[0]['time:timestamp'])
-        
-        for i in range(n):
-            event = trace[i]
-            nextAct = event['concept:name']
-            ts  = GetIntTs(event['time:timestamp'])
-            w = GetWindowIndex(windows, ts)
+        if w != -1:
+            low  = windows[w][0]
+            high = windows[w][1]
             
-            if w != -1:
-                low  = windows[w][0]
-                high = windows[w][1]
-                
-                if lastTs < low and low <= ts <= high:   # Current is in
-                    segmentTime[w][(lastAct, nextAct)] += ts - low
-                elif low <= lastTs <= high and low <= ts <= high: # Both are in
-                    segmentTime[w][(lastAct, nextAct)] += ts - lastTs
-                elif low <= lastTs <= high and high < ts: # Old is in
-                    segmentTime[w][(lastAct, nextAct)] += high - lastTs
-                elif lastTs < low and high < ts: # Both are out
-                    segmentTime[w][(lastAct, nextAct)] += high - low
-                
-            lastAct = nextAct
-            lastTs  = ts
+            if lastTs < low and low <= ts <= high:   # Current is in
+                segmentTime[w][(lastAct, nextAct)] += ts - low
+            elif low <= lastTs <= high and low <= ts <= high: # Both are in
+                segmentTime[w][(lastAct, nextAct)] += ts - lastTs
+            elif low <= lastTs <= high and high < ts: # Old is in
+                segmentTime[w][(lastAct, nextAct)] += high - lastTs
+            elif lastTs < low and high < ts: # Both are out
+                segmentTime[w][(lastAct, nextAct)] += high - low
     w = 0
     totalTime = sum([segmentTime[w][k] for k in segmentTime[w].keys() for w in windows])
     #print({w:{k:v/totalTime for k,v in segmentTime[w].items()} for w in windows })
@@ -135,8 +123,8 @@ def tMes(cb, title):
     return ret
 
 def Show(original, processed, figsize=(50,25)):
-    origLog = pm4py.read_xes(original)
-    proc = pm4py.read_xes(processed)
+    origLog = ReadLog(original)
+    proc = ReadLog(processed)
         
     A = GetActivities(origLog)
     if not A == GetActivities(proc):
@@ -2,7 +2,7 @@ import pm4py
 import matplotlib.pyplot as plt
 import pandas as pd
 
-from utils.extractor import ts_to_int as GetIntTs
+from utils.EL_Helper import GetTransitions, ReadLog
 
 def GetActivityResourceMapping(log):
     actResFrequency = {}
@@ -10,35 +10,27 @@ def GetActivityResourceMapping(log):
     resFreq = {}
     resTime = {}
     
-    for trace in log:
-        n = len(trace)
-        for i in range(n):
-            event = trace[i]
-            act = event['concept:name']
-            res = event['org:resource']
-            ts  = GetIntTs(event['time:timestamp'])
+    # Event columns (table logs) and pm4py logs alike, the first event of a trace has its own timestamp as last one
+    for _, act, res, lastTs, ts in GetTransitions(log):
+        if res in resFreq:
+            resFreq[res] += 1
+        else: 
+            resFreq[res] = 1
+            resTime[res] = 0
                         
-            if res in resFreq:
-                resFreq[res] += 1
-            else: 
-                resFreq[res] = 1
-                resTime[res] = 0
-                            
-            if act in actResFrequency:
-                if res in actResFrequency[act]:
-                    actResFrequency[act][res] += 1
-                else:
-                    actResFrequency[act][res] = 1
-                    actResTime[act][res]      = 0
+        if act in actResFrequency:
+            if res in actResFrequency[act]:
+                actResFrequency[act][res] += 1
             else:
-                actResFrequency[act] = {res: 1}
-                actResTime[act]      = {res: 0}
-                
-            if i > 0:
-                prevTS = GetIntTs(trace[i-1]['time:timestamp'])
-                duration = ts - prevTS
-                actResTime[act][res] += duration
-                resTime[res]         += duration
+                actResFrequency[act][res] = 1
+                actResTime[act][res]      = 0
+        else:
+            actResFrequency[act] = {res: 1}
+            actResTime[act]      = {res: 0}
+            
+        duration = ts - lastTs
+        actResTime[act][res] += duration
+        resTime[res]         += duration
     
     R = list(resFreq.keys())
     R.sort()
@@ -70,8 +62,8 @@ def GetActivityResourceMapping(log):
 
 
 def Show(originalLogPath, simulatedLogPath):
-    simulatedLog = pm4py.read_xes(simulatedLogPath)
-    originalLog = pm4py.read_xes(originalLogPath)
+    simulatedLog = ReadLog(simulatedLogPath)
+    originalLog = ReadLog(originalLogPath)
 
     dfOriginal, dfO2  = GetActivityResourceMapping(originalLog)
     dfSimulated, dfS2 = GetActivityResourceMapping(simulatedLog)